@@ -0,0 +1,456 @@
+# Description: This file measures the performance of the classes in
+# XiangqiGame.py. The move benchmark replays the sample game from
+# XiangqiGame.py's main function and reports how many moves are validated per
+# second, the memory benchmark keeps a number of games alive at once and
+# reports how many bytes each live game takes up, the slider benchmark
+# compares the "rays" and "bitboard" backends for the chariots' and cannons'
+# shadows on random positions, the perft benchmark counts the positions
+# reachable in a number of moves and checks the counts against published ones,
+# and the replay benchmark reports how many copies of the sample game are
+# validated per second by XiangqiGame.replay, compared with make_move. The
+# render benchmark reports how many frames of the sample game's positions are
+# rendered per second by BoardRenderer, and how many characters each takes,
+# for whole frames and for the changes since the last frame. The churn
+# benchmark reports how many short games per second are started, played, and
+# thrown away, with new games and with games reused from a GamePool.
+#
+# Usage: python XiangqiBenchmark.py moves [--seconds SECONDS]
+#        python XiangqiBenchmark.py memory [--games GAMES]
+#        python XiangqiBenchmark.py sliders [--positions POSITIONS]
+#        python XiangqiBenchmark.py perft DEPTH [--fen FEN] [--moves MOVE ...]
+#        python XiangqiBenchmark.py replay [--seconds SECONDS]
+#        python XiangqiBenchmark.py render [--seconds SECONDS]
+#        python XiangqiBenchmark.py churn [--seconds SECONDS] [--moves MOVES]
+
+import argparse
+import gc
+import io
+import random
+import time
+import tracemalloc
+
+from XiangqiGame import XiangqiGame, VerdictCache, Board, General, Advisor, \
+    Elephant, Horse, Chariot, Cannon, Soldier, LOCATION_SQUARES, \
+    BoardRenderer, GamePool, SAMPLE_GAME
+
+# The published numbers of leaf nodes from the starting position, by depth
+PERFT_NODES = {1: 44, 2: 1920, 3: 79666, 4: 3290240, 5: 133312995}
+
+
+def play_sample_game(game):
+    """
+    Take as a parameter a game in its initial state and play the sample game
+    on it. Return the game.
+    """
+    for move_from, move_to in SAMPLE_GAME:
+        game.make_move(move_from, move_to)
+    return game
+
+
+def measure_move_rate(seconds=3.0, shadow_mode="incremental",
+                      slider_backend="rays", verdict_cache=None,
+                      by_square=False):
+    """
+    Take as parameters the number of seconds to run for, the shadow mode,
+    slider backend, and verdict cache (shared by every replay) of the games,
+    and whether to make the moves with make_move_square instead of
+    make_move, and replay the sample game until the time is up. Return the
+    number of moves validated per second.
+    """
+    square_moves = [(LOCATION_SQUARES[move_from], LOCATION_SQUARES[move_to])
+                    for move_from, move_to in SAMPLE_GAME]
+    move_count = 0
+    start = time.perf_counter()
+    elapsed = 0.0
+    while elapsed < seconds:
+        game = XiangqiGame(shadow_mode, slider_backend, verdict_cache)
+        if by_square:
+            for source_square, dest_square in square_moves:
+                game.make_move_square(source_square, dest_square)
+        else:
+            play_sample_game(game)
+        move_count += len(SAMPLE_GAME)
+        elapsed = time.perf_counter() - start
+    return move_count / elapsed
+
+
+def sample_game_coords():
+    """
+    Return a list of the valid moves of the sample game, each as a tuple of
+    the coordinates (tuples) of the point moved from and the point moved to.
+    """
+    game = play_sample_game(XiangqiGame())
+    return [record[:2] for record in game.get_move_stack()]
+
+
+def measure_replay_rate(seconds=3.0, validate=True, moves=None):
+    """
+    Take as parameters the number of seconds to run for, whether replay
+    should validate the moves, and the moves to replay (by default, those of
+    sample_game_coords), and replay them on new games until the time is up.
+    Return the number of games replayed per second.
+    """
+    if moves is None:
+        moves = sample_game_coords()
+    game_count = 0
+    start = time.perf_counter()
+    elapsed = 0.0
+    while elapsed < seconds:
+        XiangqiGame().replay(moves, validate)
+        game_count += 1
+        elapsed = time.perf_counter() - start
+    return game_count / elapsed
+
+
+def sample_game_boards():
+    """
+    Return a list of Board objects, one for the starting position and one
+    for the position after each valid move of the sample game.
+    """
+    game = XiangqiGame()
+    fens = [game.to_fen()]
+    for move_from, move_to in sample_game_coords():
+        game.push_move(move_from, move_to)
+        fens.append(game.to_fen())
+    return [XiangqiGame.from_fen(fen).get_game_board() for fen in fens]
+
+
+def measure_render_rate(seconds=3.0, mode="color", changes_only=False,
+                        boards=None):
+    """
+    Take as parameters the number of seconds to run for, the render mode,
+    whether to render only the changes since the last frame, and the boards
+    to render in turn (by default, those of sample_game_boards), and write
+    frames of them to an in-memory file until the time is up. Return a tuple
+    of the number of frames rendered per second and the average number of
+    characters per frame.
+    """
+    if boards is None:
+        boards = sample_game_boards()
+    renderer = BoardRenderer(mode)
+    output = io.StringIO()
+    frame_count = 0
+    char_count = 0
+    start = time.perf_counter()
+    elapsed = 0.0
+    while elapsed < seconds:
+        renderer.forget_frame()
+        for board in boards:
+            char_count += renderer.write(board, output, changes_only)
+        output.seek(0)
+        output.truncate()
+        frame_count += len(boards)
+        elapsed = time.perf_counter() - start
+    return frame_count / elapsed, char_count / frame_count
+
+
+def measure_churn_rate(seconds=3.0, pooled=False, move_count=4):
+    """
+    Take as parameters the number of seconds to run for, whether to reuse
+    games from a GamePool instead of creating them, and the number of the
+    sample game's moves to play in each game, and start, play, and throw
+    away games until the time is up. Return the number of games per second.
+    """
+    moves = SAMPLE_GAME[:move_count]
+    pool = GamePool(1)
+    game_count = 0
+    start = time.perf_counter()
+    elapsed = 0.0
+    while elapsed < seconds:
+        if pooled:
+            game = pool.acquire()
+        else:
+            game = XiangqiGame()
+        for move_from, move_to in moves:
+            game.make_move(move_from, move_to)
+        if pooled:
+            pool.release(game)
+        game_count += 1
+        elapsed = time.perf_counter() - start
+    return game_count / elapsed
+
+
+def measure_game_memory(game_count=1000, move_count=len(SAMPLE_GAME)):
+    """
+    Take as parameters the number of games to keep alive at once and how many
+    moves of the sample game to play in each, and return the average number
+    of bytes allocated per live game, as traced by tracemalloc.
+    """
+    moves = SAMPLE_GAME[:move_count]
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        games = []
+        for _ in range(game_count):
+            game = XiangqiGame()
+            for move_from, move_to in moves:
+                game.make_move(move_from, move_to)
+            games.append(game)
+        gc.collect()
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return (after - before) / game_count
+
+
+def random_position(rng, piece_count=20):
+    """
+    Take as parameters a random number generator and a number of pieces, and
+    return a Board object on which that many pieces of random types and
+    colors have been put on random points (regardless of the rules), along
+    with a list of its chariots and cannons.
+    """
+    board = Board()
+    points = board.get_board()
+    for coord in points:
+        points[coord].set_contains(None)
+
+    sliders = []
+    for col, row in rng.sample(sorted(points), piece_count):
+        piece_class = rng.choice((General, Advisor, Elephant, Horse, Chariot,
+                                  Cannon, Soldier))
+        piece = piece_class(rng.choice(("red", "black")), col, row)
+        points[(col, row)].set_contains(piece)
+        if piece_class in (Chariot, Cannon):
+            sliders.append(piece)
+    return board, sliders
+
+
+def compare_slider_backends(position_count=1000, repeat=5, seed=0):
+    """
+    Take as parameters the number of random positions, how many times to
+    time each backend, and a random seed. Check that both slider backends
+    give the same shadows on every position, raising a RuntimeError if not,
+    and return a dictionary of each backend's best time (in seconds) to
+    compute the shadows of every chariot and cannon.
+    """
+    rng = random.Random(seed)
+    positions = [random_position(rng) for _ in range(position_count)]
+
+    # Check that the backends agree
+    for board, sliders in positions:
+        for piece in sliders:
+            board.set_slider_backend("rays")
+            piece.update_shadows(board)
+            expected = piece.get_shadows()[:]
+            board.set_slider_backend("bitboard")
+            piece.update_shadows(board)
+            if piece.get_shadows() != expected:
+                raise RuntimeError(
+                    "The slider backends disagree on the " +
+                    piece.get_color() + " " + piece.get_type_id() +
+                    " at " + str((piece.get_col(), piece.get_row())))
+
+    timings = {}
+    for slider_backend in ("rays", "bitboard"):
+        for board, _ in positions:
+            board.set_slider_backend(slider_backend)
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for board, sliders in positions:
+                for piece in sliders:
+                    piece.update_shadows(board)
+            elapsed = time.perf_counter() - start
+            if best is None or elapsed < best:
+                best = elapsed
+        timings[slider_backend] = best
+    return timings
+
+
+def perft(game, depth, breakdown=None, ply=1):
+    """
+    Take as parameters a game and a depth, and return the number of leaf
+    nodes of the tree of legal moves that many moves deep, starting with the
+    player whose turn it is. If a breakdown dictionary is given, the number
+    of nodes, captures, and checks at each ply (from 1 to the depth) is
+    added to it, as a dictionary with the keys "nodes", "captures", and
+    "checks". The game is left as it was. A depth of 0 has the one node of
+    the game's own position. Raise a ValueError if the depth is negative.
+    """
+    if depth < 0:
+        raise ValueError("Negative perft depth: " + str(depth))
+    if depth == 0:
+        return 1
+
+    board = game.get_game_board()
+    squares = board.get_squares()
+    player_color = game.get_whose_turn()
+    if player_color == "red":
+        opponent_color = "black"
+    else:
+        opponent_color = "red"
+
+    if breakdown is not None and ply not in breakdown:
+        breakdown[ply] = {"nodes": 0, "captures": 0, "checks": 0}
+
+    nodes = 0
+    for piece in board.get_pieces(player_color)[:]:
+        source_coord = (piece.get_col(), piece.get_row())
+        for dest_coord in piece.get_shadows()[:]:
+            is_capture = squares[dest_coord[1] * 9 + dest_coord[0] - 10] != 0
+
+            # A move that leaves the player's own general in check is skipped
+            if game.push_move(source_coord, dest_coord):
+                game.pop_move()
+                continue
+
+            if breakdown is not None:
+                counts = breakdown[ply]
+                counts["nodes"] += 1
+                if is_capture:
+                    counts["captures"] += 1
+                if game.is_in_check(opponent_color):
+                    counts["checks"] += 1
+
+            if depth > 1:
+                nodes += perft(game, depth - 1, breakdown, ply + 1)
+            else:
+                nodes += 1
+            game.pop_move()
+    return nodes
+
+
+def main():
+    """
+    Run the benchmark named on the command line and print its result.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark XiangqiGame.")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    moves_parser = subparsers.add_parser(
+        "moves", help="moves validated per second")
+    moves_parser.add_argument("--seconds", type=float, default=3.0)
+    moves_parser.add_argument(
+        "--shadow-mode", default="incremental",
+        choices=("incremental", "full", "differential"))
+    moves_parser.add_argument("--slider-backend", default="rays",
+                              choices=("rays", "bitboard"))
+    moves_parser.add_argument("--verdict-cache", type=int, default=0,
+                              metavar="MAX_ENTRIES",
+                              help="share a verdict cache between replays")
+    moves_parser.add_argument("--by-square", action="store_true",
+                              help="make moves by square index instead of "
+                                   "by string")
+
+    memory_parser = subparsers.add_parser(
+        "memory", help="bytes per live game")
+    memory_parser.add_argument("--games", type=int, default=1000)
+    memory_parser.add_argument("--moves", type=int, default=len(SAMPLE_GAME))
+
+    sliders_parser = subparsers.add_parser(
+        "sliders", help="chariot and cannon backends on random positions")
+    sliders_parser.add_argument("--positions", type=int, default=1000)
+
+    replay_parser = subparsers.add_parser(
+        "replay", help="games validated per second by replay")
+    replay_parser.add_argument("--seconds", type=float, default=3.0)
+
+    render_parser = subparsers.add_parser(
+        "render", help="frames rendered per second")
+    render_parser.add_argument("--seconds", type=float, default=3.0)
+
+    churn_parser = subparsers.add_parser(
+        "churn", help="short games per second, new and pooled")
+    churn_parser.add_argument("--seconds", type=float, default=3.0)
+    churn_parser.add_argument("--moves", type=int, default=4)
+
+    perft_parser = subparsers.add_parser(
+        "perft", help="leaf nodes of the tree of legal moves")
+    perft_parser.add_argument("depth", type=int)
+    perft_parser.add_argument("--moves", nargs="*", default=[],
+                              metavar="MOVE",
+                              help="moves such as c4-c5 to play first")
+    perft_parser.add_argument("--fen", help="position to start from")
+
+    args = parser.parse_args()
+
+    if args.benchmark == "moves":
+        verdict_cache = None
+        if args.verdict_cache > 0:
+            verdict_cache = VerdictCache(args.verdict_cache)
+        rate = measure_move_rate(args.seconds, args.shadow_mode,
+                                 args.slider_backend, verdict_cache,
+                                 args.by_square)
+        print("%.1f moves validated per second" % rate)
+        if verdict_cache is not None:
+            print("verdict cache: %d hits, %d misses, %d positions"
+                  % (verdict_cache.get_hits(), verdict_cache.get_misses(),
+                     verdict_cache.get_size()))
+    elif args.benchmark == "memory":
+        per_game = measure_game_memory(args.games, args.moves)
+        print("%d games with %d moves each: %.0f bytes per live game"
+              % (args.games, min(args.moves, len(SAMPLE_GAME)), per_game))
+    elif args.benchmark == "replay":
+        moves = sample_game_coords()
+        make_move_rate = (measure_move_rate(args.seconds) /
+                          len(SAMPLE_GAME))
+        replay_rate = measure_replay_rate(args.seconds, True, moves)
+        trusted_rate = measure_replay_rate(args.seconds, False, moves)
+        print("make_move          %.1f games per second" % make_move_rate)
+        print("replay             %.1f games per second" % replay_rate)
+        print("replay (trusted)   %.1f games per second" % trusted_rate)
+        print("speedup  %.2fx" % (replay_rate / make_move_rate))
+    elif args.benchmark == "render":
+        boards = sample_game_boards()
+        for mode in BoardRenderer.MODES:
+            for changes_only in (False, True):
+                rate, size = measure_render_rate(args.seconds, mode,
+                                                 changes_only, boards)
+                print("%-5s %-7s %10.1f frames per second, %6.0f "
+                      "characters per frame"
+                      % (mode, "changes" if changes_only else "whole",
+                         rate, size))
+    elif args.benchmark == "churn":
+        new_rate = measure_churn_rate(args.seconds, False, args.moves)
+        pooled_rate = measure_churn_rate(args.seconds, True, args.moves)
+        print("new games      %.1f games per second" % new_rate)
+        print("pooled games   %.1f games per second" % pooled_rate)
+        print("speedup  %.2fx" % (pooled_rate / new_rate))
+    elif args.benchmark == "perft":
+        if args.depth < 0:
+            parser.error("depth must not be negative")
+        if args.fen is None:
+            game = XiangqiGame()
+        else:
+            try:
+                game = XiangqiGame.from_fen(args.fen)
+            except ValueError as error:
+                parser.error(str(error))
+        for move in args.moves:
+            move_from, move_to = move.split("-")
+            if not game.make_move(move_from, move_to):
+                parser.error("illegal move: " + move)
+
+        breakdown = {}
+        start = time.perf_counter()
+        nodes = perft(game, args.depth, breakdown)
+        elapsed = time.perf_counter() - start
+
+        print("%5s %12s %10s %10s" % ("depth", "nodes", "captures",
+                                      "checks"))
+        for ply in sorted(breakdown):
+            counts = breakdown[ply]
+            print("%5d %12d %10d %10d" % (ply, counts["nodes"],
+                                          counts["captures"],
+                                          counts["checks"]))
+        print("%d nodes in %.2f s: %.1f nodes per second"
+              % (nodes, elapsed, nodes / elapsed if elapsed else 0.0))
+        if not args.moves and args.fen is None and args.depth in PERFT_NODES:
+            if nodes == PERFT_NODES[args.depth]:
+                print("matches the published count")
+            else:
+                print("MISMATCH: the published count is %d"
+                      % PERFT_NODES[args.depth])
+                raise SystemExit(1)
+    else:
+        timings = compare_slider_backends(args.positions)
+        for slider_backend in timings:
+            print("%-8s %.2f ms" % (slider_backend,
+                                    timings[slider_backend] * 1000))
+        print("speedup  %.2fx" % (timings["rays"] / timings["bitboard"]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+# Description: This test file tests the benchmarks in XiangqiBenchmark.py.
+
+import unittest
+from XiangqiGame import XiangqiGame, VerdictCache, SAMPLE_GAME
+from XiangqiBenchmark import play_sample_game, \
+    measure_move_rate, measure_game_memory, compare_slider_backends, \
+    PERFT_NODES, perft, sample_game_coords, measure_replay_rate, \
+    sample_game_boards, measure_render_rate, measure_churn_rate
+
+
+class TestXiangqiBenchmark(unittest.TestCase):
+    """
+    Test the benchmarks in XiangqiBenchmark.py.
+    """
+    def test_1(self):
+        """
+        Test whether the sample game ends with the red general in checkmate.
+        """
+        game = play_sample_game(XiangqiGame())
+        self.assertEqual(game.get_game_state(), "BLACK_WON")
+        self.assertEqual(len(SAMPLE_GAME), 42)
+
+    def test_2(self):
+        """
+        Test whether the move benchmark reports a positive rate.
+        """
+        self.assertGreater(measure_move_rate(0.01), 0)
+
+    def test_3(self):
+        """
+        Test whether the memory benchmark reports a plausible number of bytes
+        per live game, and whether games that have moved take up more.
+        """
+        initial = measure_game_memory(20, 0)
+        played = measure_game_memory(20)
+        self.assertGreater(initial, 1000)
+        self.assertGreater(played, initial)
+
+    def test_4(self):
+        """
+        Test whether the slider backends agree on random positions, and
+        whether both are timed.
+        """
+        timings = compare_slider_backends(200, repeat=1, seed=7)
+        self.assertEqual(sorted(timings), ["bitboard", "rays"])
+        self.assertGreater(timings["rays"], 0)
+        self.assertGreater(timings["bitboard"], 0)
+
+    def test_5(self):
+        """
+        Test whether replaying the sample game with a shared verdict cache
+        still ends in checkmate, with every verdict of the replay found in
+        the cache.
+        """
+        cache = VerdictCache()
+        play_sample_game(XiangqiGame(verdict_cache=cache))
+        misses = cache.get_misses()
+        game = play_sample_game(XiangqiGame(verdict_cache=cache))
+        self.assertEqual(game.get_game_state(), "BLACK_WON")
+        self.assertEqual(cache.get_misses(), misses)
+        self.assertGreater(cache.get_hits(), 0)
+        self.assertTrue(game.is_in_checkmate("red"))
+
+    def test_6(self):
+        """
+        Test whether perft matches the published counts from the starting
+        position, agrees with legal_moves elsewhere, and leaves the game as
+        it was.
+        """
+        game = XiangqiGame()
+        initial_hash = game.get_position_hash()
+        breakdown = {}
+        self.assertEqual(perft(game, 2, breakdown), PERFT_NODES[2])
+        self.assertEqual(breakdown[1], {"nodes": PERFT_NODES[1],
+                                        "captures": 2, "checks": 0})
+        self.assertEqual(breakdown[2]["nodes"], PERFT_NODES[2])
+        self.assertEqual(game.get_position_hash(), initial_hash)
+        self.assertEqual(game.get_move_stack(), [])
+
+        for move_from, move_to in (('h3', 'e3'), ('b8', 'e8'), ('e3', 'e7')):
+            self.assertTrue(game.make_move(move_from, move_to))
+        self.assertEqual(perft(game, 1), len(game.get_legal_moves()))
+        self.assertEqual(perft(game, 0), 1)
+        with self.assertRaises(ValueError):
+            perft(game, -3)
+
+    def test_7(self):
+        """
+        Test whether the valid moves of the sample game replay to the same
+        checkmate, and whether the replay benchmark reports a positive rate.
+        """
+        moves = sample_game_coords()
+        self.assertEqual(len(moves), 36)
+        self.assertEqual(XiangqiGame().replay(moves), (None, "BLACK_WON"))
+        self.assertGreater(measure_replay_rate(0.01, True, moves), 0)
+
+    def test_8(self):
+        """
+        Test whether the render benchmark reports a positive rate, and
+        whether rendering only the changes takes fewer characters than
+        rendering whole frames.
+        """
+        boards = sample_game_boards()
+        self.assertEqual(len(boards), len(sample_game_coords()) + 1)
+        rate, whole_size = measure_render_rate(0.01, boards=boards)
+        self.assertGreater(rate, 0)
+        rate, changes_size = measure_render_rate(0.01, "plain", True,
+                                                 boards)
+        self.assertGreater(rate, 0)
+        self.assertLess(changes_size, whole_size)
+
+    def test_9(self):
+        """
+        Test whether the churn benchmark reports positive rates for new and
+        pooled games.
+        """
+        self.assertGreater(measure_churn_rate(0.01), 0)
+        self.assertGreater(measure_churn_rate(0.01, pooled=True), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
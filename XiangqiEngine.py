@@ -0,0 +1,589 @@
+# Description: This file defines a computer opponent for the XiangqiGame class
+# in XiangqiGame.py. The Engine class searches the tree of legal moves with
+# iterative deepening negamax and alpha-beta pruning, within a time budget
+# per move, and reports the principal variation (the line of best play it
+# found), the depth reached, and how many nodes it searched per second. Moves
+# are made and reversed on the game itself with push_move and pop_move, so
+# the game's own rules decide which moves are legal.
+#
+# Scores are in hundredths of a soldier, from the point of view of the player
+# whose turn it is. A player with no legal move has lost (whether in
+# checkmate or stalemate), which is scored as -MATE_SCORE plus the number of
+# moves played since the root, so that quicker wins score higher.
+#
+# For machines with several cores, search_parallel splits the root moves
+# between the processes of a pool, one depth at a time. Each process searches
+# one root move at a time with its own Engine, needing only to beat the best
+# score already returned for another move, and the results are merged by
+# taking the best score, so a fixed-depth search gives the same score as a
+# single process. Once a move is found to give mate in one, which no other
+# move can beat, no more moves are searched, and as in a single process, no
+# deeper search is made once a forced win or loss is found.
+#
+# Usage: python XiangqiEngine.py bench [--depth DEPTH] [--workers WORKERS]
+#        python XiangqiEngine.py go [--time-ms TIME_MS] [--fen FEN]
+#            [--moves MOVE ...]
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from XiangqiGame import XiangqiGame, SQUARE_LOCATIONS, COORD_SQUARES, \
+    PIECE_VALUES
+
+MATE_SCORE = 100000
+
+# How often (in nodes) the search checks whether its time is up
+_TIME_CHECK_INTERVAL = 1024
+
+# The fixed positions of the benchmark suite, each given by a name and the
+# moves that reach it from the starting position
+BENCH_POSITIONS = (
+    ("start", ()),
+    ("central cannon", ("h3-e3", "h10-g8", "h1-g3", "i10-h10")),
+    ("open files", ("c4-c5", "c7-c6", "c5-c6", "g7-g6", "b1-c3", "h10-g8",
+                    "a1-a2", "i10-i9")),
+    ("mate in one", ("c4-c5", "e7-e6", "c5-c6", "e6-e5", "c6-d6", "e5-e4",
+                     "d6-d7", "f10-e9", "b1-c3", "h8-h1", "c3-d5", "h1-f1",
+                     "d5-c7", "f1-d1", "d7-d8", "d1-a1", "e1-e2", "i10-i8",
+                     "d8-e8", "i8-f8", "e8-e9", "d10-e9", "i1-i2", "a10-a9",
+                     "i2-f2", "a9-d9", "f2-f1", "d9-d3", "f1-e1", "f8-f3",
+                     "c1-a3", "a1-g1", "b3-b5", "g7-g6", "h3-h5")),
+)
+
+
+class _SearchTimeout(Exception):
+    """
+    Raised inside the search when its time is up, to unwind it.
+    """
+
+
+class SearchResult:
+    """
+    Represent the result of a search: the best move found, its score, the
+    principal variation, the depth of the last completed iteration, and the
+    number of nodes searched and time taken. Has getter methods for each.
+    Moves are tuples of the coordinates (tuples) of the point moved from and
+    the point moved to, as generated by XiangqiGame.legal_moves.
+    """
+    __slots__ = ("_best_move", "_score", "_pv", "_depth", "_nodes",
+                 "_elapsed")
+
+    def __init__(self, best_move, score, pv, depth, nodes, elapsed):
+        """
+        Take as parameters the best move (or None if there is no legal
+        move), its score, the principal variation (a list of moves), the
+        depth reached, the number of nodes searched, and the time taken in
+        seconds, and create a SearchResult object.
+        """
+        self._best_move = best_move
+        self._score = score
+        self._pv = pv
+        self._depth = depth
+        self._nodes = nodes
+        self._elapsed = elapsed
+
+    def get_best_move(self):
+        """
+        Return the best move found, or None if there is no legal move.
+        """
+        return self._best_move
+
+    def get_score(self):
+        """
+        Return the score of the best move, from the point of view of the
+        player whose turn it is.
+        """
+        return self._score
+
+    def get_pv(self):
+        """
+        Return the principal variation, a list of moves starting with the
+        best move.
+        """
+        return self._pv
+
+    def get_depth(self):
+        """
+        Return the depth of the last completed iteration.
+        """
+        return self._depth
+
+    def get_nodes(self):
+        """
+        Return the number of nodes searched.
+        """
+        return self._nodes
+
+    def get_elapsed(self):
+        """
+        Return the time taken by the search, in seconds.
+        """
+        return self._elapsed
+
+    def get_nodes_per_second(self):
+        """
+        Return the number of nodes searched per second.
+        """
+        if self._elapsed <= 0:
+            return 0.0
+        return self._nodes / self._elapsed
+
+
+class Engine:
+    """
+    Represent a search engine for XiangqiGame positions. The search method
+    runs iterative deepening negamax with alpha-beta pruning and a capture-
+    only quiescence search, trying the previous iteration's principal
+    variation first and captures of the most valuable pieces next. The game
+    being searched is left as it was.
+    """
+    def __init__(self, max_depth=64):
+        """
+        Take as an optional parameter the greatest depth to search to, and
+        create an Engine object.
+        """
+        self._max_depth = max_depth
+        self._nodes = 0
+        self._deadline = None
+        self._pv_moves = []     # Principal variation of the last iteration
+        self._root_moves = None  # The only moves to search at the root
+
+    def get_max_depth(self):
+        """
+        Return the greatest depth that the engine searches to.
+        """
+        return self._max_depth
+
+    def set_max_depth(self, max_depth):
+        """
+        Update the greatest depth that the engine searches to.
+        """
+        self._max_depth = max_depth
+
+    def search(self, game, time_ms=None, depth=None, root_moves=None,
+               pv=None, alpha=None, first_depth=1):
+        """
+        Take as parameters a game, an optional time budget in milliseconds,
+        an optional depth (by default, the engine's maximum depth), an
+        optional list of the only moves to consider making (by default, all
+        of them), an optional principal variation to try first, an optional
+        score that a move must beat at the last depth, and the first depth to
+        search (by default, 1), and search the position for the player whose
+        turn it is, one depth at a time until the time is up or the depth is
+        reached. The first depth is always completed. Return a SearchResult
+        for the last completed depth. If no move beats the given score, the
+        result's score is no more than that score, but is not exact.
+        """
+        if depth is None:
+            depth = self._max_depth
+        start = time.perf_counter()
+        self._nodes = 0
+        self._deadline = None
+        self._pv_moves = list(pv) if pv is not None else []
+        self._root_moves = root_moves
+
+        if game.get_game_state() != "UNFINISHED" or depth < 1:
+            return SearchResult(None, 0, [], 0, 0, 0.0)
+
+        result = SearchResult(None, -MATE_SCORE, [], 0, 0, 0.0)
+        for current_depth in range(min(first_depth, depth), depth + 1):
+            # The score to beat holds only for the last depth
+            window_alpha = -MATE_SCORE - 1
+            if alpha is not None and current_depth == depth:
+                window_alpha = alpha
+            try:
+                score, pv = self._negamax(game, current_depth, window_alpha,
+                                          MATE_SCORE + 1, 0)
+            except _SearchTimeout:
+                break
+
+            self._pv_moves = pv
+            result = SearchResult(pv[0] if pv else None, score, pv,
+                                  current_depth, self._nodes,
+                                  time.perf_counter() - start)
+
+            # Later depths are timed once there is a move to fall back on,
+            # and a forced win or loss that has been found will not change
+            if time_ms is not None:
+                self._deadline = start + time_ms / 1000
+                if time.perf_counter() >= self._deadline:
+                    break
+            if not pv or abs(score) >= MATE_SCORE - current_depth:
+                break
+
+        return SearchResult(result.get_best_move(), result.get_score(),
+                            result.get_pv(), result.get_depth(), self._nodes,
+                            time.perf_counter() - start)
+
+    def ordered_legal_moves(self, game):
+        """
+        Take as a parameter a game and return a list of the legal moves of
+        the player whose turn it is, in the order that the engine tries them
+        when it has no principal variation to go on.
+        """
+        legal_moves = set(game.legal_moves())
+        return [move for move in self._ordered_moves(game, None, False)
+                if move in legal_moves]
+
+    def evaluate(self, game):
+        """
+        Take as a parameter a game and return its material and positional
+        score from the point of view of the player whose turn it is, which
+        the game keeps up to date as moves are made and reversed.
+        """
+        return game.evaluate()
+
+    def _negamax(self, game, depth, alpha, beta, ply):
+        """
+        Take as parameters a game, the remaining depth, the alpha-beta window,
+        and the number of moves played since the root, and return the score
+        of the position for the player whose turn it is along with its
+        principal variation.
+        """
+        if depth <= 0:
+            return self._quiesce(game, alpha, beta), []
+        self._count_node()
+
+        best_score = -MATE_SCORE - 1
+        best_pv = []
+        has_legal_move = False
+        pv_move = None
+        if ply < len(self._pv_moves):
+            pv_move = self._pv_moves[ply]
+
+        moves = self._ordered_moves(game, pv_move, False)
+        if ply == 0 and self._root_moves is not None:
+            moves = [move for move in moves if move in self._root_moves]
+
+        for move in moves:
+            if game.push_move(move[0], move[1]):
+                game.pop_move()
+                continue
+            has_legal_move = True
+            try:
+                score, pv = self._negamax(game, depth - 1, -beta, -alpha,
+                                          ply + 1)
+            finally:
+                game.pop_move()
+            score = -score
+
+            if score > best_score:
+                best_score = score
+                best_pv = [move] + pv
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+
+            # Only the first move of the principal variation is tried first
+            pv_move = None
+
+        if not has_legal_move:
+            return -MATE_SCORE + ply, []
+        return best_score, best_pv
+
+    def _quiesce(self, game, alpha, beta):
+        """
+        Take as parameters a game and an alpha-beta window, and return the
+        score of the position for the player whose turn it is once no
+        capture is worth making.
+        """
+        self._count_node()
+        stand_pat = self.evaluate(game)
+        if stand_pat >= beta:
+            return stand_pat
+        if stand_pat > alpha:
+            alpha = stand_pat
+
+        for move in self._ordered_moves(game, None, True):
+            if game.push_move(move[0], move[1]):
+                game.pop_move()
+                continue
+            try:
+                score = -self._quiesce(game, -beta, -alpha)
+            finally:
+                game.pop_move()
+            if score > alpha:
+                alpha = score
+                if alpha >= beta:
+                    break
+        return alpha
+
+    def _ordered_moves(self, game, pv_move, captures_only):
+        """
+        Take as parameters a game, the move to try first (or None), and
+        whether to generate only captures, and return a list of the moves of
+        the player whose turn it is into a point that the moving piece
+        shadows. The move to try first comes first, then captures of the most
+        valuable pieces by the least valuable ones, then all other moves.
+        """
+        board = game.get_game_board()
+        squares = board.get_squares()
+        scored_moves = []
+        for piece in board.get_pieces(game.get_whose_turn()):
+            source_coord = (piece.get_col(), piece.get_row())
+            attacker_value = PIECE_VALUES[piece.get_code() & 7]
+            for dest_coord in piece.get_shadows():
+                victim_code = squares[dest_coord[1] * 9 + dest_coord[0] - 10]
+                if victim_code:
+                    order = (PIECE_VALUES[victim_code & 7] * 16 -
+                             attacker_value + MATE_SCORE)
+                elif captures_only:
+                    continue
+                else:
+                    order = 0
+                scored_moves.append((order, (source_coord, dest_coord)))
+
+        scored_moves.sort(key=lambda scored_move: -scored_move[0])
+        moves = [scored_move[1] for scored_move in scored_moves]
+        if pv_move is not None and pv_move in moves:
+            moves.remove(pv_move)
+            moves.insert(0, pv_move)
+        return moves
+
+    def _count_node(self):
+        """
+        Count a node, and raise _SearchTimeout if the time is up.
+        """
+        self._nodes += 1
+        if (self._deadline is not None and
+                self._nodes % _TIME_CHECK_INTERVAL == 0 and
+                time.perf_counter() >= self._deadline):
+            raise _SearchTimeout()
+
+
+def _search_root_move(game, depth, pv, alpha):
+    """
+    Take as parameters a game, a depth, a principal variation whose first
+    move is the only root move to search (and whose later moves are tried
+    first), and a score to beat (or None), and search that move to that
+    depth alone. If the move does not beat the score, the result's score is
+    no more than that score, but is not exact. Run in a worker process by
+    search_parallel. Return the SearchResult.
+    """
+    return Engine().search(game, None, depth, pv[:1], pv, alpha, depth)
+
+
+def search_parallel(game, depth, workers=None, executor=None):
+    """
+    Take as parameters a game, a depth, the number of worker processes (by
+    default, the number of cores), and an optional ProcessPoolExecutor to
+    reuse, and search the position to that depth with the legal moves split
+    between the workers. As in Engine.search, the position is searched one
+    depth at a time, with the moves that scored best at one depth searched
+    first at the next, until the depth is reached or a forced win or loss is
+    found. Return a SearchResult with the best score found by any worker,
+    the total number of nodes searched, and the time taken.
+    """
+    start = time.perf_counter()
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    # Start with the moves in the engine's order, each as a principal
+    # variation of one move
+    pvs = [[move] for move in Engine().ordered_legal_moves(game)]
+    if not pvs or depth < 1:
+        return Engine().search(game, None, depth)
+    workers = min(workers, len(pvs))
+
+    own_executor = executor is None
+    if own_executor:
+        executor = ProcessPoolExecutor(workers)
+    nodes = 0
+    try:
+        for current_depth in range(1, depth + 1):
+            results = _search_root_moves(game, current_depth, pvs, workers,
+                                         executor)
+            nodes += sum(result.get_nodes() for result in results)
+
+            # A move that failed to beat the score it was given scores no
+            # more than that score, so the first move with the best score
+            # is exact
+            best = results[0]
+            for result in results[1:]:
+                if result.get_score() > best.get_score():
+                    best = result
+            if abs(best.get_score()) >= MATE_SCORE - current_depth:
+                break
+
+            # Search the best moves first at the next depth, each trying its
+            # own principal variation first
+            order = sorted(range(len(results)),
+                           key=lambda index: -results[index].get_score())
+            pvs = [results[index].get_pv() for index in order]
+    finally:
+        if own_executor:
+            executor.shutdown()
+
+    return SearchResult(best.get_best_move(), best.get_score(),
+                        best.get_pv(), best.get_depth(), nodes,
+                        time.perf_counter() - start)
+
+
+def _search_root_moves(game, depth, pvs, workers, executor):
+    """
+    Take as parameters a game, a depth, a list of principal variations (one
+    for each root move, starting with it), the number of worker processes,
+    and a ProcessPoolExecutor, and search each root move on its own to that
+    depth, keeping every worker busy. Each move is handed out
+    needing only to beat the best score of the moves already searched, and
+    no more moves are handed out once one gives mate in one, which no other
+    move can beat. Return a list of the SearchResult of each move searched,
+    in the order of the moves.
+    """
+    results = {}    # Index of the move -> SearchResult
+    best_score = None
+    pending = {}    # Future -> index of the move
+    next_index = 0
+    try:
+        while True:
+            while (len(pending) < workers and next_index < len(pvs) and
+                   (best_score is None or best_score < MATE_SCORE - 1)):
+                future = executor.submit(_search_root_move, game, depth,
+                                         pvs[next_index], best_score)
+                pending[future] = next_index
+                next_index += 1
+            if not pending:
+                break
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                results[pending.pop(future)] = result
+                if best_score is None or result.get_score() > best_score:
+                    best_score = result.get_score()
+    finally:
+        for future in pending:
+            future.cancel()
+    return [results[index] for index in sorted(results)]
+
+
+def best_move(game, time_ms=1000):
+    """
+    Take as parameters a game and a time budget in milliseconds, and return
+    the best move found for the player whose turn it is (as a tuple of the
+    coordinates of the point moved from and the point moved to), or None if
+    that player has no legal move.
+    """
+    return Engine().search(game, time_ms).get_best_move()
+
+
+def format_move(move):
+    """
+    Take as a parameter a move as a tuple of coordinates and return it in
+    algebraic notation (e.g. 'h3-e3').
+    """
+    return "-".join(SQUARE_LOCATIONS[COORD_SQUARES[coord]] for coord in move)
+
+
+def play_moves(moves, fen=None):
+    """
+    Take as parameters a sequence of moves in algebraic notation (e.g.
+    'h3-e3') and an optional position in FEN to start from (by default, the
+    starting position), and return a game in which the moves have been made,
+    raising a ValueError if one of them is not legal.
+    """
+    if fen is None:
+        game = XiangqiGame()
+    else:
+        game = XiangqiGame.from_fen(fen)
+    for move in moves:
+        move_from, move_to = move.split("-")
+        if not game.make_move(move_from, move_to):
+            raise ValueError("Illegal move: " + move)
+    return game
+
+
+def run_bench(depth=3, workers=None):
+    """
+    Take as parameters a depth and an optional number of worker processes,
+    and search each position of the benchmark suite to that depth, in this
+    process or (if a number of workers is given) with search_parallel.
+    Return a list of (name, SearchResult) tuples.
+    """
+    results = []
+    if workers is None:
+        for name, moves in BENCH_POSITIONS:
+            results.append((name, Engine().search(play_moves(moves), None,
+                                                  depth)))
+        return results
+
+    with ProcessPoolExecutor(workers) as executor:
+        for name, moves in BENCH_POSITIONS:
+            results.append((name, search_parallel(play_moves(moves), depth,
+                                                  workers, executor)))
+    return results
+
+
+def print_bench(results):
+    """
+    Take as a parameter the results of run_bench, print a line for each
+    position and a total, and return the total time taken in seconds.
+    """
+    total_nodes = 0
+    total_elapsed = 0.0
+    for name, result in results:
+        total_nodes += result.get_nodes()
+        total_elapsed += result.get_elapsed()
+        print("%-16s depth %d  score %7d  nodes %8d  %8.1f nps  pv %s"
+              % (name, result.get_depth(), result.get_score(),
+                 result.get_nodes(), result.get_nodes_per_second(),
+                 " ".join(format_move(move) for move in result.get_pv())))
+    print("%d nodes in %.2f s: %.1f nodes per second"
+          % (total_nodes, total_elapsed,
+             total_nodes / total_elapsed if total_elapsed else 0.0))
+    return total_elapsed
+
+
+def main():
+    """
+    Run the engine command named on the command line and print its result.
+    """
+    parser = argparse.ArgumentParser(description="Search XiangqiGame "
+                                                 "positions.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    bench_parser = subparsers.add_parser(
+        "bench", help="fixed-depth search of the benchmark positions")
+    bench_parser.add_argument("--depth", type=int, default=3)
+    bench_parser.add_argument("--workers", type=int, default=0,
+                              help="also search with this many processes "
+                                   "and report the speedup")
+
+    go_parser = subparsers.add_parser(
+        "go", help="timed search of one position")
+    go_parser.add_argument("--time-ms", type=int, default=1000)
+    go_parser.add_argument("--moves", nargs="*", default=[], metavar="MOVE",
+                           help="moves such as c4-c5 to play first")
+    go_parser.add_argument("--fen", help="position to start from")
+
+    args = parser.parse_args()
+
+    if args.command == "bench":
+        serial_elapsed = print_bench(run_bench(args.depth))
+        if args.workers > 0:
+            print("with %d worker processes:" % args.workers)
+            parallel_elapsed = print_bench(run_bench(args.depth,
+                                                     args.workers))
+            print("speedup  %.2fx" % (serial_elapsed / parallel_elapsed))
+    else:
+        try:
+            game = play_moves(args.moves, args.fen)
+        except ValueError as error:
+            parser.error(str(error))
+        result = Engine().search(game, args.time_ms)
+        if result.get_best_move() is None:
+            print("no legal move")
+        else:
+            print("best move %s  score %d  depth %d  %.1f nps  pv %s"
+                  % (format_move(result.get_best_move()),
+                     result.get_score(), result.get_depth(),
+                     result.get_nodes_per_second(),
+                     " ".join(format_move(move)
+                              for move in result.get_pv())))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+# Description: This test file tests the search engine in XiangqiEngine.py.
+
+import time
+import unittest
+from XiangqiGame import XiangqiGame
+from XiangqiEngine import MATE_SCORE, BENCH_POSITIONS, Engine, best_move, \
+    format_move, play_moves, run_bench, search_parallel
+
+
+class TestXiangqiEngine(unittest.TestCase):
+    """
+    Test the search engine in XiangqiEngine.py.
+    """
+    def test_1(self):
+        """
+        Test whether the engine finds a mate in one, and whether the move
+        ends the game when made.
+        """
+        game = play_moves(BENCH_POSITIONS[-1][1])
+        result = Engine().search(game, depth=3)
+        self.assertEqual(format_move(result.get_best_move()), "e4-e3")
+        self.assertEqual(result.get_score(), MATE_SCORE - 1)
+        self.assertEqual(result.get_pv(), [result.get_best_move()])
+
+        self.assertTrue(game.make_move('e4', 'e3'))
+        self.assertEqual(game.get_game_state(), "BLACK_WON")
+        self.assertIsNone(best_move(game, 10))
+
+    def test_2(self):
+        """
+        Test whether a search leaves the game as it was, and whether its
+        principal variation is made of legal moves.
+        """
+        game = play_moves(("h3-e3", "h10-g8"))
+        position_hash = game.get_position_hash()
+        result = Engine().search(game, depth=2)
+        self.assertEqual(game.get_position_hash(), position_hash)
+        self.assertEqual(len(game.get_move_stack()), 2)
+        self.assertEqual(result.get_depth(), 2)
+        self.assertEqual(len(result.get_pv()), 2)
+        self.assertGreater(result.get_nodes(), 0)
+
+        for move in result.get_pv():
+            self.assertIn(move, game.get_legal_moves())
+            game.push_move(move[0], move[1])
+
+    def test_3(self):
+        """
+        Test whether a timed search stops close to its time budget with a
+        legal move, and whether a piece that has just captured is taken back.
+        """
+        game = XiangqiGame()
+        start = time.perf_counter()
+        move = best_move(game, 200)
+        self.assertLess(time.perf_counter() - start, 2.0)
+        self.assertIn(move, game.get_legal_moves())
+
+        # The black chariot takes back the red cannon that took its horse
+        game = play_moves(("h3-h10",))
+        result = Engine().search(game, depth=2)
+        self.assertEqual(format_move(result.get_best_move()), "i10-h10")
+
+    def test_4(self):
+        """
+        Test whether the benchmark suite searches every position to the
+        requested depth.
+        """
+        results = run_bench(1)
+        self.assertEqual([name for name, _ in results],
+                         [name for name, _ in BENCH_POSITIONS])
+        for name, result in results:
+            self.assertEqual(result.get_depth(), 1)
+            self.assertIsNotNone(result.get_best_move())
+
+    def test_5(self):
+        """
+        Test whether a search restricted to some root moves only plays one
+        of them, and whether a parallel search finds the same score as a
+        search in one process.
+        """
+        game = play_moves(("c4-c5", "c7-c6", "c5-c6"))
+        root_moves = [((2, 10), (3, 8)), ((1, 10), (1, 9))]
+        result = Engine().search(game, depth=2, root_moves=root_moves)
+        self.assertIn(result.get_best_move(), root_moves)
+
+        serial = Engine().search(game, depth=2)
+        parallel = search_parallel(game, 2, workers=2)
+        self.assertEqual(parallel.get_score(), serial.get_score())
+        self.assertEqual(parallel.get_depth(), 2)
+        self.assertIn(parallel.get_best_move(), game.get_legal_moves())
+        self.assertGreater(parallel.get_nodes(), 0)
+
+    def test_6(self):
+        """
+        Test whether a parallel search stops once a move gives mate in one,
+        searching about as many nodes as a search in one process, and
+        whether it finds the same scores as a search in one process.
+        """
+        moves = dict(BENCH_POSITIONS)["mate in one"]
+        game = play_moves(moves)
+        serial = Engine().search(game, depth=4)
+        parallel = search_parallel(game, 4, workers=4)
+        self.assertEqual(parallel.get_score(), MATE_SCORE - 1)
+        self.assertEqual(parallel.get_best_move(), serial.get_best_move())
+        self.assertEqual(parallel.get_depth(), serial.get_depth())
+        self.assertLess(parallel.get_nodes(), 2 * serial.get_nodes())
+
+        for moves in (("h3-e3", "h10-g8"), ("c4-c5", "c7-c6", "c5-c6")):
+            game = play_moves(moves)
+            serial = Engine().search(game, depth=3)
+            parallel = search_parallel(game, 3, workers=3)
+            self.assertEqual(parallel.get_score(), serial.get_score())
+            self.assertEqual(parallel.get_depth(), 3)
+            self.assertIn(parallel.get_pv()[0], game.get_legal_moves())
+
+    def test_7(self):
+        """
+        Test whether a search given a principal variation, a score to beat,
+        and a first depth finds the same best score as a plain search, and
+        scores no more than the score to beat when no move beats it.
+        """
+        game = play_moves(("h3-e3", "h10-g8"))
+        engine = Engine()
+        moves = engine.ordered_legal_moves(game)
+        self.assertEqual(sorted(moves), sorted(game.get_legal_moves()))
+
+        serial = engine.search(game, depth=3)
+        result = engine.search(game, None, 3, pv=serial.get_pv(),
+                               first_depth=3)
+        self.assertEqual(result.get_score(), serial.get_score())
+        self.assertEqual(result.get_depth(), 3)
+        self.assertLess(result.get_nodes(), serial.get_nodes())
+
+        bounded = engine.search(game, None, 3, alpha=serial.get_score() + 1)
+        self.assertLessEqual(bounded.get_score(), serial.get_score() + 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
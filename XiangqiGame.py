@@ -5,9 +5,10 @@
 # and black) move pieces on a board with the objective of checkmating the
 # opponent's "general" piece. The class is implemented based on the "Board",
 # "Rules", and "Pieces" sections of the following Wikipedia page:
-# https://en.wikipedia.org/wiki/Xiangqi. Other classes include Board, Point,
-# Piece, General, Advisor, Elephant, Horse, Chariot, Cannon, and Soldier. All
-# class data members are private.
+# https://en.wikipedia.org/wiki/Xiangqi. Other classes include GamePool,
+# MoveResult, BoardRenderer, VerdictCache, Board, Point, Piece, General,
+# Advisor, Elephant, Horse, Chariot, Cannon, and Soldier. All class data
+# members are private.
 #
 # Rules regarding perpetual check or chasing are not implemented, but the
 # class is designed to correctly handle a stalemate, as well as all piece-
@@ -22,6 +23,483 @@
 # piece can legally move into the point in the player's next turn. Legal moves
 # include those where a player's own general is put or left in check, since the
 # current implementation reverses such moves.
+#
+# Besides the dictionary of points, the board keeps a flat array of piece
+# codes with one byte per point, listed row by row starting from a1 (i.e. the
+# point (col, row) has the index row * 9 + col - 10). A point's code is 0 if
+# it is empty, or else the piece's type code, plus _BLACK_CODE if the piece is
+# black. The shadows of the pieces are computed from this array. Each side's
+# pieces are also kept in a list, so that they can be found without scanning
+# the board.
+#
+# A position is identified by a 64-bit Zobrist hash: the exclusive or of a
+# random key for the piece code on each occupied point, and of one more key
+# if it is black's turn. The board updates its part of the hash whenever a
+# point's contents change.
+#
+# In the same way, the board keeps a material score and a positional (piece-
+# square) score, each as red's total minus black's, in hundredths of a
+# soldier. Evaluating a position therefore costs nothing more than adding
+# the two scores.
+#
+# Positions can be read and written in the WXF/UCCI form of FEN, which lists
+# the rows from row 10 down to row 1, separated by "/", with each piece as a
+# letter (upper case for red, lower case for black: K general, A advisor, B
+# elephant, N horse, R chariot, C cannon, P soldier) and each run of empty
+# points as a digit. The rows are followed by whose turn it is ("w" for red
+# or "b" for black), two unused fields, and the move counters.
+#
+# Every board set up in the starting position has the same shadows, so they
+# are computed only for the first one and copied for the rest. A game can
+# also be put back in the starting position in place with reset, which
+# reuses its points and pieces, and a GamePool keeps reset games for reuse.
+
+import random
+import sys
+import threading
+from collections import OrderedDict
+
+_BLACK_CODE = 8                                 # Added to black pieces' codes
+_COLOR_CODES = {"red": 0, "black": _BLACK_CODE}
+
+# Lookup tables between the three ways of naming a point: its location in
+# algebraic notation (e.g. 'c4'), its coordinates as a (col, row) tuple, and
+# its index in the flat array of piece codes (its "square")
+SQUARE_COORDS = tuple((col, row) for row in range(1, 11)
+                      for col in range(1, 10))
+SQUARE_LOCATIONS = tuple("abcdefghi"[col - 1] + str(row)
+                         for col, row in SQUARE_COORDS)
+COORD_SQUARES = {coord: index for index, coord in enumerate(SQUARE_COORDS)}
+LOCATION_SQUARES = {location: index
+                    for index, location in enumerate(SQUARE_LOCATIONS)}
+LOCATION_COORDS = dict(zip(SQUARE_LOCATIONS, SQUARE_COORDS))
+
+# The Zobrist keys of each piece code on each point (all 0 for an empty
+# point), and the key for black's turn. A fixed seed keeps the hashes the
+# same from one run (or process) to the next.
+_zobrist_random = random.Random(20200310)
+_ZOBRIST_KEYS = ((0,) * 90,) + tuple(
+    tuple(_zobrist_random.getrandbits(64) for _ in range(90))
+    for _ in range(1, 16))
+_ZOBRIST_BLACK_TO_MOVE = _zobrist_random.getrandbits(64)
+del _zobrist_random
+
+STARTING_FEN = ("rnbakabnr/9/1c5c1/p1p1p1p1p/9/9/P1P1P1P1P/1C5C1/9/RNBAKABNR "
+                "w - - 0 1")
+
+# The FEN letter of each type code, and the type code of each FEN letter
+# (including the alternative letters E for elephant and H for horse)
+_FEN_LETTERS = " kabnrcp"
+_FEN_TYPE_CODES = {"k": 1, "a": 2, "b": 3, "e": 3, "n": 4, "h": 4, "r": 5,
+                   "c": 6, "p": 7}
+
+# The type ID of each type code, as shown on the printed board
+_TYPE_IDS = " GAEHCNS"
+
+
+def _build_frame_parts(mode):
+    """
+    Take as a parameter a render mode ("color" or "plain") and return a
+    dictionary of the cached pieces of text that BoardRenderer builds frames
+    from: the header and footer, the start and end of each row, the river's
+    line, and the text of a point holding each piece code.
+    """
+    def paint(color_code, text):
+        # Put text in the given ANSI colors, unless in plain mode
+        if mode == "plain":
+            return text
+        return "\033[" + color_code + "m" + text
+
+    # The palace's columns (d-f) are labeled in gray
+    label_colors = ("0;30;47",) * 3 + ("0;90;47",) * 3 + ("0;30;47",) * 3
+    letters = ""
+    numbers = ""
+    for col in range(1, 10):
+        lead = "    " if col == 1 else ""
+        trail = "    " if col == 9 else "  "
+        letters += paint(label_colors[col - 1],
+                         lead + "abcdefghi"[col - 1] + trail)
+        numbers += paint(label_colors[col - 1], lead + str(col) + trail)
+    end = paint("0;97;30", "") + "\n"
+
+    cells = [paint("0;29;48", "[") + paint("0;29;48", " ]")] * 16
+    for code in range(1, 16):
+        if code & 7 == 0:
+            continue
+        type_id = _TYPE_IDS[code & 7]
+        if code & _BLACK_CODE:
+            if mode == "plain":
+                type_id = type_id.lower()
+            piece_text = paint("0;36;48", type_id)     # Teal for black
+        else:
+            piece_text = paint("0;31;48", type_id)     # Red for red
+        cells[code] = (paint("0;29;48", "[") + piece_text +
+                       paint("0;29;48", "]"))
+
+    row_suffixes = tuple(paint("0;30;47", " %d " % row) +
+                         paint("0;29;48", "") + "\n" for row in range(1, 10))
+    row_suffixes += (paint("0;30;47", " 10") + paint("0;29;48", "") + "\n",)
+
+    return {"header": letters + end + numbers + end,
+            "footer": numbers + end + letters + end,
+            "row_prefixes": tuple(paint("0;30;47", "%2d " % row)
+                                  for row in range(1, 11)),
+            "row_suffixes": row_suffixes,
+            "river": paint("0;30;44", " " * 33) + paint("0;29;48", "") +
+                     "\n",
+            "cells": tuple(cells)}
+
+
+# The pieces of text of each render mode's frames
+_FRAME_PARTS = {mode: _build_frame_parts(mode) for mode in ("color", "plain")}
+
+# The material value of each type code (the general is never captured)
+PIECE_VALUES = (0, 0, 200, 200, 400, 900, 450, 100)
+
+# The positional value of a red piece of each type code on each point, listed
+# row by row from row 10 (the black side) down to row 1. A black piece has
+# the value of the point mirrored across the river.
+_PIECE_SQUARE_TABLES = {
+    1: ((0, 0, 0, 0, 0, 0, 0, 0, 0),) * 7 + (
+        (0, 0, 0, -20, -20, -20, 0, 0, 0),
+        (0, 0, 0, -10, -5, -10, 0, 0, 0),
+        (0, 0, 0, 0, 10, 0, 0, 0, 0)),
+    2: ((0, 0, 0, 0, 0, 0, 0, 0, 0),) * 8 + (
+        (0, 0, 0, 0, 10, 0, 0, 0, 0),
+        (0, 0, 0, 0, 0, 0, 0, 0, 0)),
+    3: ((0, 0, 0, 0, 0, 0, 0, 0, 0),) * 5 + (
+        (0, 0, -5, 0, 0, 0, -5, 0, 0),
+        (0, 0, 0, 0, 0, 0, 0, 0, 0),
+        (-5, 0, 0, 0, 10, 0, 0, 0, -5),
+        (0, 0, 0, 0, 0, 0, 0, 0, 0),
+        (0, 0, 0, 0, 0, 0, 0, 0, 0)),
+    4: ((0, 0, 0, 5, 0, 5, 0, 0, 0),
+        (0, 10, 30, 20, 5, 20, 30, 10, 0),
+        (10, 20, 30, 40, 30, 40, 30, 20, 10),
+        (10, 30, 40, 40, 40, 40, 40, 30, 10),
+        (5, 20, 30, 35, 35, 35, 30, 20, 5),
+        (5, 15, 25, 30, 30, 30, 25, 15, 5),
+        (0, 10, 20, 20, 20, 20, 20, 10, 0),
+        (0, 5, 15, 10, 15, 10, 15, 5, 0),
+        (-5, 0, 5, 0, -10, 0, 5, 0, -5),
+        (-10, -5, 0, -5, -10, -5, 0, -5, -10)),
+    5: ((20, 20, 20, 30, 30, 30, 20, 20, 20),
+        (20, 30, 30, 40, 40, 40, 30, 30, 20),
+        (10, 20, 20, 30, 30, 30, 20, 20, 10),
+        (10, 20, 20, 30, 30, 30, 20, 20, 10),
+        (10, 20, 20, 30, 30, 30, 20, 20, 10),
+        (10, 20, 20, 30, 30, 30, 20, 20, 10),
+        (0, 10, 10, 20, 20, 20, 10, 10, 0),
+        (-5, 10, 5, 10, 10, 10, 5, 10, -5),
+        (0, 5, 0, 10, 0, 10, 0, 5, 0),
+        (-10, 5, 0, 10, 0, 10, 0, 5, -10)),
+    6: ((10, 10, 0, -5, -10, -5, 0, 10, 10),
+        (5, 5, 0, -5, -10, -5, 0, 5, 5),
+        (5, 5, 0, -5, 0, -5, 0, 5, 5),
+        (0, 5, 5, 5, 10, 5, 5, 5, 0),
+        (0, 0, 0, 0, 10, 0, 0, 0, 0),
+        (0, 5, 5, 5, 10, 5, 5, 5, 0),
+        (0, 0, 0, 0, 10, 0, 0, 0, 0),
+        (5, 5, 10, 10, 20, 10, 10, 5, 5),
+        (0, 5, 5, 5, 5, 5, 5, 5, 0),
+        (0, 0, 5, 10, 10, 10, 5, 0, 0)),
+    7: ((0, 0, 0, 10, 20, 10, 0, 0, 0),
+        (60, 80, 100, 130, 140, 130, 100, 80, 60),
+        (60, 80, 100, 120, 130, 120, 100, 80, 60),
+        (60, 70, 90, 100, 110, 100, 90, 70, 60),
+        (40, 50, 70, 80, 80, 80, 70, 50, 40),
+        (0, 0, 0, 0, 10, 0, 0, 0, 0),
+        (0, 0, 0, 0, 10, 0, 0, 0, 0),
+        (0, 0, 0, 0, 0, 0, 0, 0, 0),
+        (0, 0, 0, 0, 0, 0, 0, 0, 0),
+        (0, 0, 0, 0, 0, 0, 0, 0, 0)),
+}
+
+
+def _build_piece_square_scores():
+    """
+    Return a list, indexed by piece code, of tuples that give for each index
+    of the flat array of piece codes what a piece of that code on that point
+    adds to the positional score (positive for red pieces, negative for
+    black ones). The entry for an empty point is all 0.
+    """
+    scores = [(0,) * 90] * 16
+    for type_code in _PIECE_SQUARE_TABLES:
+        table = _PIECE_SQUARE_TABLES[type_code]
+        scores[type_code] = tuple(table[10 - row][col - 1]
+                                  for col, row in SQUARE_COORDS)
+        scores[type_code + _BLACK_CODE] = tuple(-table[row - 1][col - 1]
+                                                for col, row in SQUARE_COORDS)
+    return scores
+
+
+_PIECE_SQUARE_SCORES = _build_piece_square_scores()
+
+# What a piece of each code adds to the material score
+_MATERIAL_SCORES = tuple(PIECE_VALUES[code & 7] if code < _BLACK_CODE
+                         else -PIECE_VALUES[code & 7] for code in range(16))
+
+# The points whose contents can change the shadows of a piece, as column and
+# row offsets from the piece, for each type code (the chariot and cannon are
+# also affected by their whole column and row, and the general by its whole
+# column)
+_INFLUENCE_OFFSETS = {
+    1: ((0, -1), (1, 0), (0, 1), (-1, 0)),
+    2: ((1, -1), (1, 1), (-1, 1), (-1, -1)),
+    3: ((1, -1), (1, 1), (-1, 1), (-1, -1),
+        (2, -2), (2, 2), (-2, 2), (-2, -2)),
+    4: ((0, -1), (1, 0), (0, 1), (-1, 0),
+        (-1, -2), (1, -2), (2, -1), (2, 1),
+        (1, 2), (-1, 2), (-2, 1), (-2, -1)),
+    7: ((0, -1), (1, 0), (0, 1), (-1, 0)),
+}
+
+
+def _build_influence_masks():
+    """
+    Return a list, indexed by type code, of tuples that give for each index
+    of the flat array of piece codes the bitmask of the indices whose
+    contents can change the shadows of a piece of that type on that point.
+    The piece's own point is included.
+    """
+    masks = [None] * 8
+    masks[0] = ((1 << 90) - 1,) * 90
+    for type_code in (5, 6):
+        masks[type_code] = tuple(
+            sum(1 << index for index in range(90)
+                if SQUARE_COORDS[index][0] == col or
+                SQUARE_COORDS[index][1] == row)
+            for col, row in SQUARE_COORDS)
+    for type_code in _INFLUENCE_OFFSETS:
+        type_masks = []
+        for col, row in SQUARE_COORDS:
+            mask = 1 << (row * 9 + col - 10)
+            if type_code == 1:
+                # The general's column decides the "flying general" condition
+                for index in range(col - 1, 90, 9):
+                    mask |= 1 << index
+            for col_step, row_step in _INFLUENCE_OFFSETS[type_code]:
+                if 1 <= col + col_step <= 9 and 1 <= row + row_step <= 10:
+                    mask |= 1 << ((row + row_step) * 9 + col + col_step - 10)
+            type_masks.append(mask)
+        masks[type_code] = tuple(type_masks)
+    return masks
+
+
+_INFLUENCE_MASKS = _build_influence_masks()
+
+# The horse's "legs" (column and row offsets) and, for each leg, the offsets
+# of the two points beyond it, in the order N-NW, N-NE, E-NE, E-SE, S-SE,
+# S-SW, W-SW, W-NW
+_HORSE_MOVES = ((0, -1, ((-1, -2), (1, -2))),
+                (1, 0, ((2, -1), (2, 1))),
+                (0, 1, ((1, 2), (-1, 2))),
+                (-1, 0, ((-2, 1), (-2, -1))))
+
+
+def _leaper_moves(type_code, color, col, row):
+    """
+    Take as parameters the type code of a general, advisor, elephant, horse,
+    or soldier, a player color, and the column and row of a point, and return
+    a tuple of the moves of such a piece from that point, ignoring the other
+    pieces. Each move is a tuple of the index of the point moved to and the
+    index of the point that must be empty for the move to be possible (the
+    elephant's "eye" or the horse's "leg"), or None. The moves are in the
+    order in which the piece's shadows are listed.
+    """
+    moves = []
+
+    # Get the rows of the palace and the rows on the player's side of the
+    # river, and which way is forward for a soldier
+    if color == "red":
+        min_palace_row, max_palace_row = 1, 3
+        min_side_row, max_side_row = 1, 5
+        river_crossed = row >= 6
+        forward_row = row + 1
+    else:
+        min_palace_row, max_palace_row = 8, 10
+        min_side_row, max_side_row = 6, 10
+        river_crossed = row <= 5
+        forward_row = row - 1
+
+    if type_code == 1:
+        # The general moves north, south, east, and west. It stays within the
+        # palace's rows when moving north or south, and within its columns
+        # when moving east or west.
+        for col_step, row_step in ((0, -1), (0, 1), (1, 0), (-1, 0)):
+            new_col = col + col_step
+            new_row = row + row_step
+            if row_step != 0 and not (min_palace_row <= new_row <=
+                                      max_palace_row):
+                continue
+            if col_step != 0 and not (4 <= new_col <= 6):
+                continue
+            moves.append((new_row * 9 + new_col - 10, None))
+
+    elif type_code == 2:
+        # The advisor moves diagonally within the palace
+        for col_step, row_step in ((1, -1), (1, 1), (-1, 1), (-1, -1)):
+            new_col = col + col_step
+            new_row = row + row_step
+            if ((4 <= new_col <= 6) and
+                    (min_palace_row <= new_row <= max_palace_row)):
+                moves.append((new_row * 9 + new_col - 10, None))
+
+    elif type_code == 3:
+        # The elephant moves two points diagonally on its side of the river,
+        # past its "eye"
+        for col_step, row_step in ((1, -1), (1, 1), (-1, 1), (-1, -1)):
+            eye_col = col + col_step
+            eye_row = row + row_step
+            if not ((1 <= eye_col <= 9) and
+                    (min_side_row <= eye_row <= max_side_row)):
+                continue
+            new_col = eye_col + col_step
+            new_row = eye_row + row_step
+            if ((1 <= new_col <= 9) and
+                    (min_side_row <= new_row <= max_side_row)):
+                moves.append((new_row * 9 + new_col - 10,
+                              eye_row * 9 + eye_col - 10))
+
+    elif type_code == 4:
+        # The horse moves one point orthogonally (past its "leg") and then
+        # one point diagonally, in the order N-NW, N-NE, E-NE, E-SE, S-SE,
+        # S-SW, W-SW, W-NW
+        for leg_col, leg_row, targets in _HORSE_MOVES:
+            if not ((1 <= col + leg_col <= 9) and (1 <= row + leg_row <= 10)):
+                continue
+            for col_step, row_step in targets:
+                new_col = col + col_step
+                new_row = row + row_step
+                if (1 <= new_col <= 9) and (1 <= new_row <= 10):
+                    moves.append((new_row * 9 + new_col - 10,
+                                  (row + leg_row) * 9 + col + leg_col - 10))
+
+    elif type_code == 7:
+        # Once across the river, the soldier moves east and west as well as
+        # forward
+        if river_crossed:
+            targets = ((col + 1, row), (col - 1, row), (col, forward_row))
+        else:
+            targets = ((col, forward_row),)
+        for new_col, new_row in targets:
+            if (1 <= new_col <= 9) and (1 <= new_row <= 10):
+                moves.append((new_row * 9 + new_col - 10, None))
+
+    return tuple(moves)
+
+
+# The moves of the general, advisor, elephant, horse, and soldier from every
+# point, as given by _leaper_moves, indexed by piece code and then by the
+# index of the point moved from
+_LEAPER_MOVES = {
+    type_code + _COLOR_CODES[color]: tuple(
+        _leaper_moves(type_code, color, col, row)
+        for col, row in SQUARE_COORDS)
+    for type_code in (1, 2, 3, 4, 7) for color in ("red", "black")
+}
+
+# The indices in the flat array, and the coordinates, of the points of each
+# column (listed by row) and of each row (listed by column)
+_FILE_INDICES = tuple(tuple(row * 9 + col - 10 for row in range(1, 11))
+                      for col in range(1, 10))
+_RANK_INDICES = tuple(tuple(row * 9 + col - 10 for col in range(1, 10))
+                      for row in range(1, 11))
+_FILE_COORDS = tuple(tuple(SQUARE_COORDS[index] for index in indices)
+                     for indices in _FILE_INDICES)
+_RANK_COORDS = tuple(tuple(SQUARE_COORDS[index] for index in indices)
+                     for indices in _RANK_INDICES)
+
+# The lookup tables of the "bitboard" backend for the chariot's and cannon's
+# shadows, keyed by the length of a row (9) or column (10). They are built by
+# _get_slider_table when first needed.
+_SLIDER_TABLES = {}
+
+# The starting position's pieces and shadows, recorded by the first Board
+# object set up in the starting position, so that later ones (and
+# Board.reset) can copy the shadows instead of computing them. Keyed by
+# "pieces", a tuple of each piece's class, color, coordinates, and shadows
+# (in the order of the board's lists of pieces, red's first), "red_count",
+# the number of red pieces, and "shadowed_by", a tuple of the coordinates of
+# the pieces shadowing each point (indexed by square). None until the record
+# is complete: it is built in full and then published with one assignment,
+# under _starting_shadows_lock, so that boards built in other threads never
+# see part of it.
+_starting_shadows = None
+_starting_shadows_lock = threading.Lock()
+
+
+def _slide(position, occupancy, step, length):
+    """
+    Take as parameters a position along a row or column, a bitmask of the
+    occupied positions along it, the step (-1 or 1) to move by, and the length
+    of the row or column. Return a tuple of a slice of the empty positions
+    passed over before the first piece (in the order they are passed over),
+    the position of that first piece (or None), and the position of the next
+    piece beyond it (or None).
+    """
+    empties = []
+    blocker = None
+    target = None
+    position += step
+    while 0 <= position < length:
+        if occupancy >> position & 1:
+            if blocker is not None:
+                target = position
+                break
+            blocker = position
+        elif blocker is None:
+            empties.append(position)
+        position += step
+
+    if not empties:
+        empty_slice = slice(0, 0)
+    elif empties[-1] + step < 0:
+        empty_slice = slice(empties[0], None, step)
+    else:
+        empty_slice = slice(empties[0], empties[-1] + step, step)
+    return empty_slice, blocker, target
+
+
+def _get_slider_table(length):
+    """
+    Take as a parameter the length of a row or column and return its lookup
+    table, which gives for each position and each bitmask of the occupied
+    positions a tuple of what _slide returns toward lower positions and
+    toward higher positions.
+    """
+    table = _SLIDER_TABLES.get(length)
+    if table is None:
+        table = tuple(
+            tuple((_slide(position, occupancy, -1, length),
+                   _slide(position, occupancy, 1, length))
+                  for occupancy in range(1 << length))
+            for position in range(length))
+        _SLIDER_TABLES[length] = table
+    return table
+
+
+def _slider_rays(col, row, occupancy):
+    """
+    Take as parameters the column and row of a chariot or cannon and the
+    board's occupancy of each row and column, and look up the piece's rays in
+    the order N, S, E, W. Return a tuple of a tuple for each ray, made up of
+    what _slide returns for the ray, and the coordinates and the indices in
+    the flat array of the points of the ray's row or column.
+    """
+    rank_occupancy, file_occupancy = occupancy
+    lower_file, upper_file = _SLIDER_TABLES[10][row - 1][
+        file_occupancy[col - 1]]
+    lower_rank, upper_rank = _SLIDER_TABLES[9][col - 1][
+        rank_occupancy[row - 1]]
+    file_coords = _FILE_COORDS[col - 1]
+    file_indices = _FILE_INDICES[col - 1]
+    rank_coords = _RANK_COORDS[row - 1]
+    rank_indices = _RANK_INDICES[row - 1]
+    return ((lower_file, file_coords, file_indices),
+            (upper_file, file_coords, file_indices),
+            (upper_rank, rank_coords, rank_indices),
+            (lower_rank, rank_coords, rank_indices))
 
 
 class XiangqiGame:
@@ -35,17 +513,32 @@ class XiangqiGame:
     on the console, and quantify_location converts a letter-number formatted
     string into a number-number formatted tuple.
     """
-    def __init__(self):
+    def __init__(self, shadow_mode="incremental", slider_backend="rays",
+                 verdict_cache=None, board=None):
         """
         Create a XiangqiGame object. The data members are initialized and
         include a board, the game state, whether either of the players is in
-        check, and whose turn it is.
-        """
-        self._board = Board()
+        check, and whose turn it is. The optional shadow_mode ("incremental",
+        "full", or "differential") is passed on to the board and controls how
+        shadows are updated after each move, and the optional slider_backend
+        ("rays" or "bitboard") controls how the chariots' and cannons'
+        shadows are computed. The optional verdict_cache is a VerdictCache
+        object (which may be shared with other games) that remembers whether
+        each player has a legal move in the positions seen so far. The
+        optional board is a Board object to play on instead of a new one in
+        the starting position (its own shadow mode and slider backend are
+        kept).
+        """
+        if board is None:
+            board = Board(shadow_mode, slider_backend)
+        self._board = board
         self._game_state = "UNFINISHED"
         self._red_in_check = False
         self._black_in_check = False
         self._whose_turn = "red"        # Red player starts the game
+        self._move_stack = []           # Records for reversing moves
+        self._verdict_cache = verdict_cache
+        self._ply_offset = 0    # Moves made before the first position
 
     def get_game_board(self):
         """
@@ -53,6 +546,20 @@ class XiangqiGame:
         """
         return self._board
 
+    def reset(self):
+        """
+        Put the game back in the starting position with red to move, reusing
+        its board (see Board.reset). The move stack is emptied, and the
+        verdict cache (if any) is kept.
+        """
+        self._board.reset()
+        self._game_state = "UNFINISHED"
+        self._red_in_check = False
+        self._black_in_check = False
+        self._whose_turn = "red"
+        self._move_stack.clear()
+        self._ply_offset = 0
+
     def get_game_state(self):
         """
         Return the current game state, which can be "UNFINISHED", "RED_WON",
@@ -93,344 +600,427 @@ class XiangqiGame:
         """
         self._whose_turn = player_color
 
+    def get_position_hash(self):
+        """
+        Return the 64-bit Zobrist hash of the current position, which covers
+        the piece on every point and whose turn it is. The board keeps its
+        part of the hash up to date as pieces move, so this costs nothing
+        more than an exclusive or.
+        """
+        if self._whose_turn == "black":
+            return (self._board.get_position_hash() ^
+                    _ZOBRIST_BLACK_TO_MOVE)
+        return self._board.get_position_hash()
+
+    @classmethod
+    def from_fen(cls, fen, shadow_mode="incremental", slider_backend="rays",
+                 verdict_cache=None):
+        """
+        Take as a parameter a position in FEN (and optionally the shadow
+        mode, slider backend, and verdict cache of the game), and return a
+        XiangqiGame object in that position. The board and its shadows are
+        set up directly, and whether either player is in check and whether
+        the game has been won are worked out from the position. Raise a
+        ValueError if the FEN cannot be read or a player has no general or
+        more than one.
+        """
+        fields = fen.split()
+        if not fields:
+            raise ValueError("Empty FEN")
+        rows = fields[0].split("/")
+        if len(rows) != 10:
+            raise ValueError("FEN must have 10 rows: " + fen)
+
+        piece_classes = {1: General, 2: Advisor, 3: Elephant, 4: Horse,
+                         5: Chariot, 6: Cannon, 7: Soldier}
+        pieces = []
+        general_counts = {"red": 0, "black": 0}
+        for row, row_str in zip(range(10, 0, -1), rows):
+            col = 1
+            for char in row_str:
+                if char.isdigit():
+                    col += int(char)
+                    continue
+                type_code = _FEN_TYPE_CODES.get(char.lower())
+                if type_code is None or col > 9:
+                    raise ValueError("Bad row in FEN: " + row_str)
+                if char.isupper():
+                    color = "red"
+                else:
+                    color = "black"
+                if type_code == 1:
+                    general_counts[color] += 1
+                pieces.append(piece_classes[type_code](color, col, row))
+                col += 1
+            if col != 10:
+                raise ValueError("FEN row must have 9 points: " + row_str)
+        if general_counts != {"red": 1, "black": 1}:
+            raise ValueError("Each player must have one general: " + fen)
+
+        game = cls(verdict_cache=verdict_cache,
+                   board=Board(shadow_mode, slider_backend, pieces))
+
+        if len(fields) > 1:
+            if fields[1] in ("w", "r"):
+                game._whose_turn = "red"
+            elif fields[1] == "b":
+                game._whose_turn = "black"
+            else:
+                raise ValueError("Bad turn in FEN: " + fields[1])
+        move_number = 1
+        if len(fields) > 5:
+            if not fields[5].isdigit():
+                raise ValueError("Bad move number in FEN: " + fields[5])
+            move_number = max(int(fields[5]), 1)
+        game._ply_offset = 2 * (move_number - 1)
+        if game._whose_turn == "black":
+            game._ply_offset += 1
+
+        game._red_in_check = bool(game.is_in_check("red"))
+        game._black_in_check = bool(game.is_in_check("black"))
+        if not game.has_any_legal_move(game._whose_turn):
+            if game._whose_turn == "red":
+                game._game_state = "BLACK_WON"
+            else:
+                game._game_state = "RED_WON"
+        return game
+
+    def to_fen(self):
+        """
+        Return the current position in FEN. The halfmove clock is not kept,
+        so it is always 0, and the move number counts the moves made since
+        the game started (or since the position it was read from).
+        """
+        squares = self._board.get_squares()
+        rows = []
+        for row in range(10, 0, -1):
+            row_str = ""
+            empty_count = 0
+            for index in range(row * 9 - 9, row * 9):
+                code = squares[index]
+                if code == 0:
+                    empty_count += 1
+                    continue
+                if empty_count:
+                    row_str += str(empty_count)
+                    empty_count = 0
+                letter = _FEN_LETTERS[code & 7]
+                if code & _BLACK_CODE:
+                    row_str += letter
+                else:
+                    row_str += letter.upper()
+            if empty_count:
+                row_str += str(empty_count)
+            rows.append(row_str)
+
+        if self._whose_turn == "red":
+            turn = "w"
+        else:
+            turn = "b"
+
+        # A move number counts one move by each player, starting with red
+        move_number = (self._ply_offset + len(self._move_stack)) // 2 + 1
+        return "/".join(rows) + " " + turn + " - - 0 " + str(move_number)
+
+    def evaluate(self):
+        """
+        Return the score of the current position (material plus positional,
+        in hundredths of a soldier) from the point of view of the player
+        whose turn it is. The board keeps both scores up to date as pieces
+        move, so this takes constant time.
+        """
+        score = (self._board.get_material_score() +
+                 self._board.get_positional_score())
+        if self._whose_turn == "black":
+            return -score
+        return score
+
     def make_move(self, move_from, move_to):
         """
         Take as parameters two strings that represent the point moved from and
-        the point moved to. If the point being moved from is empty or does not
-        contain a piece belonging to the player whose turn it is, or if the
-        point moved to has a piece owned by the player whose turn it is, or if
-        the game has already been won, or if the indicated move is not legal,
-        return False. Otherwise, among other actions, make the indicated move,
-        remove any captured piece, update the game state if necessary,
-        update whose turn it is, and return True.
+        the point moved to. If either string is not a location on the board,
+        or if the point being moved from is empty or does not contain a piece
+        belonging to the player whose turn it is, or if the point moved to has
+        a piece owned by the player whose turn it is, or if the game has
+        already been won, or if the indicated move is not legal, return False.
+        Otherwise, among other actions, make the indicated move, remove any
+        captured piece, update the game state if necessary, update whose turn
+        it is, and return True.
         """
         # Convert the letter-number strings to number-number tuples
         source_coord = self.quantify_location(move_from)
         dest_coord = self.quantify_location(move_to)
+        if source_coord is None or dest_coord is None:
+            return False
+        return self._make_move_coords(source_coord, dest_coord) is None
+
+    def make_move_ex(self, move_from, move_to):
+        """
+        Take as parameters the point moved from and the point moved to (as
+        strings in algebraic notation, coordinate tuples, or square indices),
+        and make the move as make_move does. Return a MoveResult object with
+        whether the move was made, the reason it was not (see MoveResult),
+        the type ID of the piece captured (if any), whether either player is
+        in check afterwards, and the game state afterwards, all as worked out
+        while making the move.
+        """
+        source_coord = _to_coord(move_from)
+        dest_coord = _to_coord(move_to)
+        if source_coord is None or dest_coord is None:
+            reason = "NOT_ON_BOARD"
+        else:
+            reason = self._make_move_coords(source_coord, dest_coord)
+
+        captured_type = None
+        if reason is None:
+            captured_piece = self._move_stack[-1][2]
+            if captured_piece is not None:
+                captured_type = captured_piece.get_type_id()
+        return MoveResult(reason, captured_type, self._red_in_check,
+                          self._black_in_check, self._game_state)
+
+    def make_move_square(self, source_square, dest_square):
+        """
+        Take as parameters the square indices (see location_to_square) of the
+        point moved from and the point moved to, and make the move as
+        make_move does, without any string parsing. Return False if either
+        index is not on the board or the move is not allowed, and True
+        otherwise.
+        """
+        if not (0 <= source_square < 90 and 0 <= dest_square < 90):
+            return False
+        return self._make_move_coords(SQUARE_COORDS[source_square],
+                                      SQUARE_COORDS[dest_square]) is None
+
+    def _make_move_coords(self, source_coord, dest_coord):
+        """
+        Take as parameters the coordinates (tuples) of the point moved from
+        and the point moved to, and make the move for make_move,
+        make_move_square, and make_move_ex. Return None if the move was made,
+        and otherwise the reason it was not (see MoveResult).
+        """
         brd = self._board.get_board()
-        is_own_general_in_check = False
 
         # Check the source coordinate
 
-        # If the point being moved from is empty, return False
+        # If the point being moved from is empty, reject the move
         if brd[source_coord].get_contains() is None:
-            return False
+            return "EMPTY_POINT"
 
         # If the point being moved from does not contain a piece belonging
-        # to the player whose turn it is, return False
+        # to the player whose turn it is, reject the move
         if (brd[source_coord].get_contains().get_color()
                 != self.get_whose_turn()):
-            return False
+            return "NOT_YOUR_PIECE"
 
         # Check the destination coordinate
 
         # If the point moved to has a piece owned by the player whose turn it
-        # is, return False
+        # is, reject the move
         if brd[dest_coord].get_contains() is not None:
             if (brd[dest_coord].get_contains().get_color()
                     == self.get_whose_turn()):
-                return False
+                return "OWN_PIECE"
 
         curr_piece = brd[source_coord].get_contains()
 
         # If the move is not legal (i.e. if the destination coordinate is not
-        # in the piece's list of points shadowed), return False
+        # in the piece's list of points shadowed), reject the move
         if dest_coord not in curr_piece.get_shadows():
-            return False
+            return "ILLEGAL_MOVE"
 
-        # If the game has already been won, return False
+        # If the game has already been won, reject the move
         if self.get_game_state() != "UNFINISHED":   # If either player has won
-            return False
+            return "GAME_OVER"
+
+        # Make the move, remembering how to reverse it. If the player's own
+        # general is then in check, reverse the move.
+        if self.push_move(source_coord, dest_coord):
+            self.pop_move()
+            return "SELF_CHECK"
+
+        # Update the game state if necessary. The move has already updated
+        # whether either player's general is in check, and whose turn it is.
+        # If the opponent has no legal move, the opponent is either in
+        # checkmate (if in check) or stalemated (if not), and loses either way.
+        if not self.has_any_legal_move(self._whose_turn):
+            if self._whose_turn == "red":
+                self._game_state = "BLACK_WON"
+            else:
+                self._game_state = "RED_WON"
 
-        # If the move is legal, make the move
-        if dest_coord in curr_piece.get_shadows():
-
-            # Temporarily hold the piece to be captured in case the move needs
-            # to be reversed
-            discarded_piece = brd[dest_coord].get_contains()
-
-            # Move the piece to the destination point
-            brd[dest_coord].set_contains(curr_piece)
-            curr_piece.set_col(dest_coord[0])
-            curr_piece.set_row(dest_coord[1])
-
-            # Remove the source point's contents
-            brd[source_coord].set_contains(None)
-
-            # Update every piece's shadows
-            for coord in brd:
-                if brd[coord].get_contains() is not None:
-                    piece = brd[coord].get_contains()
-                    piece.update_shadows(brd)
-
-            # Update every point's shadowed_by
-            self._board.update_points_shadows()
-
-            # Look for the player's own general
-            for coord in brd:
-                if brd[coord].get_contains() is not None:
-                    piece = brd[coord].get_contains()
-                    if piece.get_color() == self.get_whose_turn():
-
-                        # If the general is found
-                        if piece.get_type_id() == 'G':
-                            gen_col = piece.get_col()
-                            gen_row = piece.get_row()
-                            if (len(brd[(gen_col, gen_row)].get_shadowed_by())
-                                    >= 1):
-                                is_own_general_in_check = True
-
-            # If the player's own general is in check, reverse the move
-            if is_own_general_in_check:
-                # Restore the moved piece to its original point
-                brd[source_coord].set_contains(curr_piece)
-                curr_piece.set_col(source_coord[0])
-                curr_piece.set_row(source_coord[1])
-
-                # Have the discarded piece go back to its former point
-                brd[dest_coord].set_contains(discarded_piece)
-
-                # Restore every piece's shadows
-                for coord in brd:
-                    if brd[coord].get_contains() is not None:
-                        piece = brd[coord].get_contains()
-                        piece.update_shadows(brd)
-
-                # Restore every point's shadowed_by on the board
-                self._board.update_points_shadows()
+        # A move that has been made is rarely reversed, so rather than keep
+        # the shadows it set aside for the rest of the game, have pop_move
+        # recompute every piece's shadows if it is ever reversed
+        record = self._move_stack[-1]
+        self._move_stack[-1] = record[:3] + (None,) + record[4:]
+
+        return None
+
+    def replay(self, moves, validate=True):
+        """
+        Take as parameters an iterable of moves, each a tuple of the point
+        moved from and the point moved to (as coordinate tuples, or as
+        strings in algebraic notation), and whether to check that each move
+        is legal, and make the moves in order. Unlike make_move, whether the
+        game has been won is only decided after the last move: a player with
+        no legal move cannot make a legal move either, so a move made after
+        the end of the game is still found to be illegal. If a move is not
+        legal, the moves stop there, before that move. A move from or to a
+        point that is not on the board, or from an empty point, is found to
+        be illegal even without checking; any other illegal move made without
+        checking leaves the game in an undefined state. Return a tuple of the
+        index of the first illegal move (or None if every move was made) and
+        the game state afterwards.
+        """
+        brd = self._board.get_board()
+        move_stack = self._move_stack
+        illegal_index = None
+
+        for index, (source_coord, dest_coord) in enumerate(moves):
+            if isinstance(source_coord, str):
+                source_coord = self.quantify_location(source_coord)
+                dest_coord = self.quantify_location(dest_coord)
+                if source_coord is None or dest_coord is None:
+                    illegal_index = index
+                    break
+            elif source_coord not in brd or dest_coord not in brd:
+                illegal_index = index
+                break
 
-                return False
+            piece = brd[source_coord].get_contains()
+            if piece is None:
+                illegal_index = index
+                break
 
-        # Update the game state if necessary
-        # If either player's general is shadowed, put it in check
+            if validate:
+                # The piece must belong to the player whose turn it is, and
+                # must shadow the point moved to
+                if (piece.get_color() != self._whose_turn
+                        or dest_coord not in piece.get_shadows()
+                        or self._game_state != "UNFINISHED"):
+                    illegal_index = index
+                    break
 
-        # Check whether the red general is in check
-        if self.is_in_check("red"):
-            self._red_in_check = True
-        else:
-            self._red_in_check = False
+                if self.push_move(source_coord, dest_coord):
+                    self.pop_move()
+                    illegal_index = index
+                    break
+            else:
+                self.push_move(source_coord, dest_coord)
 
-        # Check whether the black general is in check
-        if self.is_in_check("black"):
-            self._black_in_check = True
-        else:
-            self._black_in_check = False
+            # As in make_move, have pop_move recompute the shadows instead
+            record = move_stack[-1]
+            move_stack[-1] = record[:3] + (None,) + record[4:]
 
-        # If the red general is in checkmate, then the black player wins
-        if self._red_in_check:
-            if self.is_in_checkmate("red"):
+        if (self._game_state == "UNFINISHED" and
+                not self.has_any_legal_move(self._whose_turn)):
+            if self._whose_turn == "red":
                 self._game_state = "BLACK_WON"
-
-        # If the black general is in checkmate, then the red player wins
-        if self._black_in_check:
-            if self.is_in_checkmate("black"):
+            else:
                 self._game_state = "RED_WON"
 
-        # Check whether the opponent is stalemated (i.e. not in check but
-        # has no legal moves)
+        return illegal_index, self._game_state
 
-        if self._whose_turn == "red":
-            # If the black player is stalemated, the red player wins
-            if self.is_in_stalemate("black"):
-                self._game_state = "RED_WON"
+    def push_move(self, source_coord, dest_coord):
+        """
+        Take as parameters the coordinates (tuples) of the point moved from
+        and the point moved to, and make the move without checking whether it
+        is legal. The captured piece (if any), the coordinates of the move,
+        the shadows set aside by the move, whether either player is in check,
+        whose turn it is, and the game state are recorded on the move stack
+        so that pop_move can reverse the move. Afterwards, the check flags are
+        updated and it is the other player's turn. Return True if the move
+        leaves the moving player's own general in check, and False otherwise.
+        """
+        moved_piece = self._board.get_board()[source_coord].get_contains()
+        mover_color = moved_piece.get_color()
 
-        if self._whose_turn == "black":
-            # If the red player is stalemated, the black player wins
-            if self.is_in_stalemate("red"):
-                self._game_state = "BLACK_WON"
+        # Move the piece, setting aside every affected piece's shadows
+        captured_piece, saved_shadows = self._board.move_piece(source_coord,
+                                                               dest_coord)
+
+        self._move_stack.append((source_coord, dest_coord, captured_piece,
+                                 saved_shadows, self._red_in_check,
+                                 self._black_in_check, self._whose_turn,
+                                 self._game_state))
+
+        self._red_in_check = bool(self.is_in_check("red"))
+        self._black_in_check = bool(self.is_in_check("black"))
 
-        # Update whose turn it is
         if self._whose_turn == "red":
             self._whose_turn = "black"
         else:
             self._whose_turn = "red"
 
-        return True
+        if mover_color == "red":
+            return self._red_in_check
+        return self._black_in_check
 
-    def is_in_check(self, player_color):
+    def pop_move(self):
         """
-        Take as a parameter either "red" or "black" for the player color and
-        return True if that player's general is in check, but False otherwise.
+        Reverse the move most recently made by push_move (or make_move),
+        restoring the board, the check flags, whose turn it is, and the game
+        state. Return the coordinates of the reversed move as a tuple of the
+        point moved from and the point moved to.
         """
-        brd = self._board.get_board()
-
-        # Check whether the red general is in check
-        if player_color == "red":
-            for coord in brd:
+        (source_coord, dest_coord, captured_piece, saved_shadows,
+         red_in_check, black_in_check, whose_turn,
+         game_state) = self._move_stack.pop()
 
-                # If the point has a piece
-                if brd[coord].get_contains() is not None:
-                    piece = brd[coord].get_contains()
+        # Move the piece back, have the captured piece (if any) go back to its
+        # former point, and put back the shadows set aside by the move
+        self._board.unmove_piece(source_coord, dest_coord, captured_piece,
+                                 saved_shadows)
 
-                    # If the piece is red
-                    if piece.get_color() == "red":
+        self._red_in_check = red_in_check
+        self._black_in_check = black_in_check
+        self._whose_turn = whose_turn
+        self._game_state = game_state
 
-                        # If the piece is a general
-                        if piece.get_type_id() == 'G':
-                            gen_col = piece.get_col()
-                            gen_row = piece.get_row()
-
-                            # If there is at least one piece shadowing the
-                            # red general's point
-                            if (len(brd[(gen_col, gen_row)].get_shadowed_by())
-                                    >= 1):
-                                return True
-
-                            # If there are no pieces shadowing the red
-                            # general's point
-                            else:
-                                return False
-
-        # Check whether the black general is in check
-        if player_color == "black":
-            for coord in brd:
+        return source_coord, dest_coord
 
-                # If the point has a piece
-                if brd[coord].get_contains() is not None:
-                    piece = brd[coord].get_contains()
+    def get_verdict_cache(self):
+        """
+        Return the game's VerdictCache object, or None if it has none.
+        """
+        return self._verdict_cache
 
-                    # If the piece is black
-                    if piece.get_color() == "black":
+    def set_verdict_cache(self, verdict_cache):
+        """
+        Update the game's VerdictCache object (or None for no cache).
+        """
+        self._verdict_cache = verdict_cache
 
-                        # If the piece is a general
-                        if piece.get_type_id() == 'G':
-                            gen_col = piece.get_col()
-                            gen_row = piece.get_row()
+    def get_move_stack(self):
+        """
+        Return the move stack, a list of the records kept by push_move for
+        the moves that have been made and not reversed.
+        """
+        return self._move_stack
 
-                            # If there is at least one piece shadowing the
-                            # black general's point
-                            if (len(brd[(gen_col, gen_row)].get_shadowed_by())
-                                    >= 1):
-                                return True
+    def is_in_check(self, player_color):
+        """
+        Take as a parameter either "red" or "black" for the player color and
+        return True if that player's general is in check, but False otherwise.
+        """
+        general_coord = self._board.get_general_coord(player_color)
 
-                            # If there are no pieces shadowing the black
-                            # general's point
-                            else:
-                                return False
+        # If the player's general is on the board, check whether there is at
+        # least one opponent piece shadowing the general's point
+        if general_coord is not None:
+            if player_color == "red":
+                return self._board.is_shadowed(general_coord, "black")
+            else:
+                return self._board.is_shadowed(general_coord, "red")
 
     def is_in_checkmate(self, player_color):
         """
         Take as a parameter a player color and return True if that player's
         general has been checkmated, and False otherwise.
         """
-        board = self._board.get_board()
-
-        # Assume that the general cannot escape check, unless proven otherwise
-        can_escape_check = False
-
-        # For every piece on the board that has the player color, attempt all
-        # moves for that piece, checking to see if any move puts the general
-        # out of check
-        for coord in board:
-
-            # If the point has a piece
-            if board[coord].get_contains() is not None:
-                test_piece = board[coord].get_contains()
-
-                # If the test piece matches the player_color
-                if test_piece.get_color() == player_color:
-                    old_col = test_piece.get_col()
-                    old_row = test_piece.get_row()
-
-                    shadows = test_piece.get_shadows()
-
-                    # Attempt moving the test piece into all of its shadows
-                    for shadow in shadows:
-
-                        # If the point is empty
-                        if board[shadow].get_contains() is None:
-
-                            # Move the test piece into the point
-                            board[shadow].set_contains(test_piece)
-                            test_piece.set_col(shadow[0])  # Update column
-                            test_piece.set_row(shadow[1])  # Update row
-
-                            # Remove the test piece from its former point
-                            board[(old_col, old_row)].set_contains(None)
-
-                            # Update _shadows for every piece on the board
-                            for coordt in board:
-                                if board[coordt].get_contains() is not None:
-                                    piece = board[coordt].get_contains()
-                                    piece.update_shadows(board)
-
-                            # Update _shadowed_by for every point on the board
-                            self._board.update_points_shadows()
-
-                            if not self.is_in_check(player_color):
-                                can_escape_check = True
-
-                            # Restore test_piece to its original position
-                            board[(old_col, old_row)].set_contains(test_piece)
-                            test_piece.set_col(old_col)  # Restore column
-                            test_piece.set_row(old_row)  # Restore row
-
-                            # Remove the test_piece from its shadow
-                            board[shadow].set_contains(None)
-
-                            # Restore _shadows for every piece on the board
-                            for coordin in board:
-                                if board[coordin].get_contains() is not None:
-                                    piece = board[coordin].get_contains()
-                                    piece.update_shadows(board)
-
-                            # Restore _shadowed_by for every point on the board
-                            self._board.update_points_shadows()
-
-                        # If the point has a piece
-                        else:
-                            target_piece = board[shadow].get_contains()
-
-                            # If the piece belongs to the opponent
-                            if target_piece.get_color() != player_color:
-
-                                # Move the test piece into the point occupied
-                                # by the target piece
-                                board[shadow].set_contains(test_piece)
-                                test_piece.set_col(shadow[0])  # Update column
-                                test_piece.set_row(shadow[1])  # Update row
-
-                                # Remove the test piece from its former point
-                                board[(old_col, old_row)].set_contains(None)
-
-                                # Update _shadows for every piece on the board
-                                for coordt in board:
-                                    point = board[coordt]
-                                    if point.get_contains() is not None:
-                                        piece = point.get_contains()
-                                        piece.update_shadows(board)
-
-                                # Update _shadowed_by for every point on the
-                                # board
-                                self._board.update_points_shadows()
-
-                                if not self.is_in_check(player_color):
-                                    can_escape_check = True
-
-                                # Restore test_piece to its original position
-                                board[(old_col, old_row)].set_contains(
-                                    test_piece)
-                                test_piece.set_col(old_col)  # Restore column
-                                test_piece.set_row(old_row)  # Restore row
-
-                                # Restore target_piece to its original position
-                                board[shadow].set_contains(target_piece)
-
-                                # Restore _shadows for every piece on the board
-                                for coordnt in board:
-                                    point = board[coordnt]
-                                    if point.get_contains() is not None:
-                                        piece = board[coordnt].get_contains()
-                                        piece.update_shadows(board)
-
-                                # Restore _shadowed_by for every point on the
-                                # board
-                                self._board.update_points_shadows()
-
-        if can_escape_check:
-            return False
-        else:
-            return True
+        # The general cannot escape check if no move is legal
+        return not self.has_any_legal_move(player_color)
 
     def is_in_stalemate(self, player_color):
         """
@@ -438,125 +1028,153 @@ class XiangqiGame:
         been stalemated (i.e. is not in check but has no legal moves), and
         False otherwise.
         """
-        board = self._board.get_board()
+        return not self.has_any_legal_move(player_color)
+
+    def has_any_legal_move(self, player_color):
+        """
+        Take as a parameter a player color and return True if that player has
+        at least one legal move (i.e. one that does not leave the player's own
+        general in check), and False otherwise. Moves are tried one at a time
+        with push_move and pop_move, stopping at the first legal one, with
+        the moves most likely to be legal tried first. If the game has a
+        verdict cache, the answer is looked up there first, and stored there
+        once found.
+        """
+        cache = self._verdict_cache
+        if cache is not None:
+            position_hash = self._board.get_position_hash()
+            has_legal_move = cache.get_verdict(position_hash, player_color,
+                                               "has_legal_move")
+            if has_legal_move is not None:
+                return has_legal_move
 
-        # Assume that the player has been stalemated, unless proven otherwise
         has_legal_move = False
+        for source_coord, dest_coord in self._candidate_moves(player_color):
+            is_legal = not self.push_move(source_coord, dest_coord)
+            self.pop_move()
+            if is_legal:
+                has_legal_move = True
+                break
 
-        # For every piece on the board that has the player color, attempt all
-        # moves for that piece, checking to see if any move is valid and
-        # does not put the general in check
-        for coord in board:
+        if cache is not None:
+            cache.set_verdict(position_hash, player_color, "has_legal_move",
+                              has_legal_move)
 
-            # If the point has a piece
-            if board[coord].get_contains() is not None:
-                test_piece = board[coord].get_contains()
+        return has_legal_move
 
-                # If the test piece matches the player_color
-                if test_piece.get_color() == player_color:
-                    old_col = test_piece.get_col()
-                    old_row = test_piece.get_row()
-
-                    shadows = test_piece.get_shadows()
-
-                    # Attempt moving the test piece into all of its shadows
-                    for shadow in shadows:
-
-                        # If the point is empty
-                        if board[shadow].get_contains() is None:
-
-                            # Move the test piece into the point
-                            board[shadow].set_contains(test_piece)
-                            test_piece.set_col(shadow[0])  # Update column
-                            test_piece.set_row(shadow[1])  # Update row
-
-                            # Remove the test piece from its former point
-                            board[(old_col, old_row)].set_contains(None)
-
-                            # Update _shadows for every piece on the board
-                            for coordt in board:
-                                if board[coordt].get_contains() is not None:
-                                    piece = board[coordt].get_contains()
-                                    piece.update_shadows(board)
-
-                            # Update _shadowed_by for every point on the board
-                            self._board.update_points_shadows()
-
-                            if not self.is_in_check(player_color):
-                                has_legal_move = True
-
-                            # Restore test_piece to its original position
-                            board[(old_col, old_row)].set_contains(test_piece)
-                            test_piece.set_col(old_col)  # Restore column
-                            test_piece.set_row(old_row)  # Restore row
-
-                            # Remove the test_piece from its shadow
-                            board[shadow].set_contains(None)
-
-                            # Restore _shadows for every piece on the board
-                            for coordin in board:
-                                if board[coordin].get_contains() is not None:
-                                    piece = board[coordin].get_contains()
-                                    piece.update_shadows(board)
-
-                            # Restore _shadowed_by for every point on the board
-                            self._board.update_points_shadows()
-
-                        # If the point has a piece
-                        else:
-                            target_piece = board[shadow].get_contains()
-
-                            # If the piece belongs to the opponent
-                            if target_piece.get_color() != player_color:
-
-                                # Move the test piece into the point occupied
-                                # by the target piece
-                                board[shadow].set_contains(test_piece)
-                                test_piece.set_col(shadow[0])  # Update column
-                                test_piece.set_row(shadow[1])  # Update row
-
-                                # Remove the test piece from its former point
-                                board[(old_col, old_row)].set_contains(None)
-
-                                # Update _shadows for every piece on the board
-                                for coordt in board:
-                                    point = board[coordt]
-                                    if point.get_contains() is not None:
-                                        piece = point.get_contains()
-                                        piece.update_shadows(board)
-
-                                # Update _shadowed_by for every point on the
-                                # board
-                                self._board.update_points_shadows()
-
-                                if not self.is_in_check(player_color):
-                                    has_legal_move = True
-
-                                # Restore test_piece to its original position
-                                board[(old_col, old_row)].set_contains(
-                                    test_piece)
-                                test_piece.set_col(old_col)  # Restore column
-                                test_piece.set_row(old_row)  # Restore row
-
-                                # Restore target_piece to its original position
-                                board[shadow].set_contains(target_piece)
-
-                                # Restore _shadows for every piece on the board
-                                for coordnt in board:
-                                    point = board[coordnt]
-                                    if point.get_contains() is not None:
-                                        piece = board[coordnt].get_contains()
-                                        piece.update_shadows(board)
-
-                                # Restore _shadowed_by for every point on the
-                                # board
-                                self._board.update_points_shadows()
+    def legal_moves(self, player_color=None):
+        """
+        Take as an optional parameter a player color (by default, the player
+        whose turn it is) and generate every legal move of that player, as a
+        tuple of the coordinates (tuples) of the point moved from and the
+        point moved to. A move is legal if make_move would accept it on the
+        player's turn: it goes to a point that the piece shadows and does not
+        leave the player's own general in check (which includes facing the
+        opponent's general). No moves are generated once the game has been
+        won. Moves are generated lazily, in order of the point moved from
+        (a1, b1, ..., i10); the game must not be changed until the generator
+        is exhausted or discarded.
+        """
+        if player_color is None:
+            player_color = self._whose_turn
+        if self._game_state != "UNFINISHED":
+            return
 
-        # If the player has a legal move, then it is not in stalemate
-        if has_legal_move:
-            return False
+        board = self._board.get_board()
+        squares = self._board.get_squares()
+        own_code = _COLOR_CODES[player_color]
+
+        for index in range(90):
+            code = squares[index]
+            if code == 0 or code & _BLACK_CODE != own_code:
+                continue
+            source_coord = SQUARE_COORDS[index]
+            piece = board[source_coord].get_contains()
+
+            # Try each shadowed point, reversing the move before yielding it
+            for dest_coord in piece.get_shadows()[:]:
+                is_legal = not self.push_move(source_coord, dest_coord)
+                self.pop_move()
+                if is_legal:
+                    yield source_coord, dest_coord
+
+    def get_legal_moves(self, player_color=None):
+        """
+        Take as an optional parameter a player color (by default, the player
+        whose turn it is) and return a list of all of that player's legal
+        moves, in the same form and order as legal_moves. If the game has a
+        verdict cache, the moves are looked up there first, and stored there
+        (along with whether the player has a legal move) once found.
+        """
+        if player_color is None:
+            player_color = self._whose_turn
+
+        cache = self._verdict_cache
+        if cache is None or self._game_state != "UNFINISHED":
+            return list(self.legal_moves(player_color))
+
+        position_hash = self._board.get_position_hash()
+        moves = cache.get_verdict(position_hash, player_color, "legal_moves")
+        if moves is None:
+            moves = tuple(self.legal_moves(player_color))
+            cache.set_verdict(position_hash, player_color, "legal_moves",
+                              moves)
+            cache.set_verdict(position_hash, player_color, "has_legal_move",
+                              bool(moves))
+        return list(moves)
+
+    def _candidate_moves(self, player_color):
+        """
+        Take as a parameter a player color and generate every move of that
+        player's pieces into a point that they shadow and that does not hold
+        one of the player's own pieces, as a tuple of the point moved from
+        and the point moved to. The general's own moves come first, followed
+        by captures of any piece that is checking the general, followed by
+        all other moves. No move is repeated between these three groups.
+        """
+        pieces = self._get_pieces(player_color)
+        general = None
+        checker_coords = []
+
+        if player_color == "red":
+            opponent_color = "black"
         else:
-            return True
+            opponent_color = "red"
+
+        # Try the general's moves first, since they can escape any check.
+        # (A piece never shadows a point holding one of its own side's
+        # pieces.)
+        for piece in pieces:
+            if piece.get_type_id() == 'G':
+                general = piece
+                general_coord = (piece.get_col(), piece.get_row())
+                for shadow in piece.get_shadows()[:]:
+                    yield general_coord, shadow
+
+                # Find the pieces that are checking the general
+                for checker in self._board.get_shadowing_pieces(
+                        general_coord, opponent_color):
+                    checker_coords.append((checker.get_col(),
+                                           checker.get_row()))
+
+        # Then try capturing a checking piece, and then everything else
+        for is_capturing_checker in (True, False):
+            if is_capturing_checker and not checker_coords:
+                continue
+            for piece in pieces:
+                if piece is general:
+                    continue
+                piece_coord = (piece.get_col(), piece.get_row())
+                for shadow in piece.get_shadows()[:]:
+                    if (shadow in checker_coords) == is_capturing_checker:
+                        yield piece_coord, shadow
+
+    def _get_pieces(self, player_color):
+        """
+        Take as a parameter a player color and return a list of that player's
+        pieces on the board.
+        """
+        return self._board.get_pieces(player_color)[:]
 
     def print_board(self):
         """
@@ -564,671 +1182,1191 @@ class XiangqiGame:
         and ideas from https://ozzmaker.com/add-colour-to-text-in-python/ are
         used. However, the foreground and background codes listed on the
         website did not seem to match the colors actually displayed, perhaps
-        because the Python file was run on a Windows-based system.
+        because the Python file was run on a Windows-based system. The whole
+        board is built by a BoardRenderer and written at once.
         """
-        board = self._board.get_board()
-
-        # Print the first header row
-        print("\033[0;30;47m    a", end = "  ")
-        print("\033[0;30;47mb", end = "  ")
-        print("\033[0;30;47mc", end = "  ")
-        print("\033[0;90;47md", end = "  ")
-        print("\033[0;90;47me", end = "  ")
-        print("\033[0;90;47mf", end = "  ")
-        print("\033[0;30;47mg", end = "  ")
-        print("\033[0;30;47mh", end = "  ")
-        print("\033[0;30;47mi", end = "    ")
-        print("\033[0;97;30m")
-
-        # Print the second header row
-        print("\033[0;30;47m    1", end = "  ")
-        print("\033[0;30;47m2", end = "  ")
-        print("\033[0;30;47m3", end = "  ")
-        print("\033[0;90;47m4", end = "  ")
-        print("\033[0;90;47m5", end = "  ")
-        print("\033[0;90;47m6", end = "  ")
-        print("\033[0;30;47m7", end = "  ")
-        print("\033[0;30;47m8", end = "  ")
-        print("\033[0;30;47m9", end = "    ")
-        print("\033[0;97;30m")
-
-        # Print row 1 of the game board
-        print("\033[0;30;47m 1", end=" ")   # Row label at beginning
-
-        # Print columns a-i (1-9)
-        for num in range(1, 10):
-
-            # Print left bracket
-            print("\033[0;29;48m[", end = "")
-
-            # If the point on the board does not have a piece, print a blank
-            # space and right bracket
-            if board[(num, 1)].get_contains() is None:
-                print("\033[0;29;48m ]", end="")
-
-            # If the point on the board has a piece, print the type ID using
-            # a different color, and then a right bracket
-            else:
-                # If the piece is red, print a red type ID
-                if board[(num, 1)].get_contains().get_color() == "red":
-                    print("\033[0;31;48m" +
-                        board[(num, 1)].get_contains().get_type_id(),
-                          end = "")
-                    print("\033[0;29;48m]", end = "")
-
-                # If the piece is black, print a teal type ID
-                if board[(num, 1)].get_contains().get_color() == "black":
-                    print("\033[0;36;48m" +
-                          board[(num, 1)].get_contains().get_type_id(),
-                          end = "")
-                    print("\033[0;29;48m]", end = "")
-
-        print("\033[0;30;47m 1", end=" ")   # Row label at end
-        print("\033[0;29;48m", end="\n")
-
-        # Print row 2 of the game board
-        print("\033[0;30;47m 2", end=" ")   # Row label at beginning
-
-        # Print columns a-i (1-9)
-        for num in range(1, 10):
-
-            # Print left bracket
-            print("\033[0;29;48m[", end = "")
-
-            # If the point on the board does not have a piece, print a blank
-            # space and right bracket
-            if board[(num, 2)].get_contains() is None:
-                print("\033[0;29;48m ]", end="")
-
-            # If the point on the board has a piece, print the type ID using
-            # a different color, and then a right bracket
-            else:
-                # If the piece is red, print a red type ID
-                if board[(num, 2)].get_contains().get_color() == "red":
-                    print("\033[0;31;48m" +
-                        board[(num, 2)].get_contains().get_type_id(),
-                          end = "")
-                    print("\033[0;29;48m]", end = "")
-
-                # If the piece is black, print a teal type ID
-                if board[(num, 2)].get_contains().get_color() == "black":
-                    print("\033[0;36;48m" +
-                          board[(num, 2)].get_contains().get_type_id(),
-                          end = "")
-                    print("\033[0;29;48m]", end = "")
-
-        print("\033[0;30;47m 2", end=" ")   # Row label at end
-        print("\033[0;29;48m", end="\n")
-
-        # Print row 3 of the game board
-        print("\033[0;30;47m 3", end=" ")   # Row label at beginning
-
-        # Print columns a-i (1-9)
-        for num in range(1, 10):
-
-            # Print left bracket
-            print("\033[0;29;48m[", end = "")
-
-            # If the point on the board does not have a piece, print a blank
-            # space and right bracket
-            if board[(num, 3)].get_contains() is None:
-                print("\033[0;29;48m ]", end="")
-
-            # If the point on the board has a piece, print the type ID using
-            # a different color, and then a right bracket
-            else:
-                # If the piece is red, print a red type ID
-                if board[(num, 3)].get_contains().get_color() == "red":
-                    print("\033[0;31;48m" +
-                        board[(num, 3)].get_contains().get_type_id(),
-                          end = "")
-                    print("\033[0;29;48m]", end = "")
-
-                # If the piece is black, print a teal type ID
-                if board[(num, 3)].get_contains().get_color() == "black":
-                    print("\033[0;36;48m" +
-                          board[(num, 3)].get_contains().get_type_id(),
-                          end = "")
-                    print("\033[0;29;48m]", end = "")
-
-        print("\033[0;30;47m 3", end=" ")   # Row label at end
-        print("\033[0;29;48m", end="\n")
-
-        # Print row 4 of the game board
-        print("\033[0;30;47m 4", end=" ")   # Row label at beginning
-
-        # Print columns a-i (1-9)
-        for num in range(1, 10):
-
-            # Print left bracket
-            print("\033[0;29;48m[", end = "")
-
-            # If the point on the board does not have a piece, print a blank
-            # space and right bracket
-            if board[(num, 4)].get_contains() is None:
-                print("\033[0;29;48m ]", end="")
-
-            # If the point on the board has a piece, print the type ID using
-            # a different color, and then a right bracket
-            else:
-                # If the piece is red, print a red type ID
-                if board[(num, 4)].get_contains().get_color() == "red":
-                    print("\033[0;31;48m" +
-                        board[(num, 4)].get_contains().get_type_id(),
-                          end = "")
-                    print("\033[0;29;48m]", end = "")
-
-                # If the piece is black, print a teal type ID
-                if board[(num, 4)].get_contains().get_color() == "black":
-                    print("\033[0;36;48m" +
-                          board[(num, 4)].get_contains().get_type_id(),
-                          end = "")
-                    print("\033[0;29;48m]", end = "")
-
-        print("\033[0;30;47m 4", end=" ")   # Row label at end
-        print("\033[0;29;48m", end="\n")
-
-        # Print row 5 of the game board
-        print("\033[0;30;47m 5", end=" ")   # Row label at beginning
-
-        # Print columns a-i (1-9)
-        for num in range(1, 10):
-
-            # Print left bracket
-            print("\033[0;29;48m[", end = "")
-
-            # If the point on the board does not have a piece, print a blank
-            # space and right bracket
-            if board[(num, 5)].get_contains() is None:
-                print("\033[0;29;48m ]", end="")
-
-            # If the point on the board has a piece, print the type ID using
-            # a different color, and then a right bracket
-            else:
-                # If the piece is red, print a red type ID
-                if board[(num, 5)].get_contains().get_color() == "red":
-                    print("\033[0;31;48m" +
-                        board[(num, 5)].get_contains().get_type_id(),
-                          end = "")
-                    print("\033[0;29;48m]", end = "")
-
-                # If the piece is black, print a teal type ID
-                if board[(num, 5)].get_contains().get_color() == "black":
-                    print("\033[0;36;48m" +
-                          board[(num, 5)].get_contains().get_type_id(),
-                          end = "")
-                    print("\033[0;29;48m]", end = "")
-
-        print("\033[0;30;47m 5", end=" ")   # Row label at end
-        print("\033[0;29;48m", end="\n")
-
-        # Print river
-        print("\033[0;30;44m", end="                                 ")
-        print("\033[0;29;48m", end="\n")
-
-        # Print row 6 of the game board
-        print("\033[0;30;47m 6", end=" ")   # Row label at beginning
-
-        # Print columns a-i (1-9)
-        for num in range(1, 10):
-
-            # Print left bracket
-            print("\033[0;29;48m[", end = "")
-
-            # If the point on the board does not have a piece, print a blank
-            # space and right bracket
-            if board[(num, 6)].get_contains() is None:
-                print("\033[0;29;48m ]", end="")
-
-            # If the point on the board has a piece, print the type ID using
-            # a different color, and then a right bracket
-            else:
-                # If the piece is red, print a red type ID
-                if board[(num, 6)].get_contains().get_color() == "red":
-                    print("\033[0;31;48m" +
-                        board[(num, 6)].get_contains().get_type_id(),
-                          end = "")
-                    print("\033[0;29;48m]", end = "")
-
-                # If the piece is black, print a teal type ID
-                if board[(num, 6)].get_contains().get_color() == "black":
-                    print("\033[0;36;48m" +
-                          board[(num, 6)].get_contains().get_type_id(),
-                          end = "")
-                    print("\033[0;29;48m]", end = "")
-
-        print("\033[0;30;47m 6", end=" ")   # Row label at end
-        print("\033[0;29;48m", end="\n")
-
-        # Print row 7 of the game board
-        print("\033[0;30;47m 7", end=" ")   # Row label at beginning
-
-        # Print columns a-i (1-9)
-        for num in range(1, 10):
-
-            # Print left bracket
-            print("\033[0;29;48m[", end = "")
-
-            # If the point on the board does not have a piece, print a blank
-            # space and right bracket
-            if board[(num, 7)].get_contains() is None:
-                print("\033[0;29;48m ]", end="")
-
-            # If the point on the board has a piece, print the type ID using
-            # a different color, and then a right bracket
-            else:
-                # If the piece is red, print a red type ID
-                if board[(num, 7)].get_contains().get_color() == "red":
-                    print("\033[0;31;48m" +
-                        board[(num, 7)].get_contains().get_type_id(),
-                          end = "")
-                    print("\033[0;29;48m]", end = "")
-
-                # If the piece is black, print a teal type ID
-                if board[(num, 7)].get_contains().get_color() == "black":
-                    print("\033[0;36;48m" +
-                          board[(num, 7)].get_contains().get_type_id(),
-                          end = "")
-                    print("\033[0;29;48m]", end = "")
-
-        print("\033[0;30;47m 7", end=" ")   # Row label at end
-        print("\033[0;29;48m", end="\n")
-
-        # Print row 8 of the game board
-        print("\033[0;30;47m 8", end=" ")   # Row label at beginning
-
-        # Print columns a-i (1-9)
-        for num in range(1, 10):
-
-            # Print left bracket
-            print("\033[0;29;48m[", end = "")
-
-            # If the point on the board does not have a piece, print a blank
-            # space and right bracket
-            if board[(num, 8)].get_contains() is None:
-                print("\033[0;29;48m ]", end="")
-
-            # If the point on the board has a piece, print the type ID using
-            # a different color, and then a right bracket
-            else:
-                # If the piece is red, print a red type ID
-                if board[(num, 8)].get_contains().get_color() == "red":
-                    print("\033[0;31;48m" +
-                        board[(num, 8)].get_contains().get_type_id(),
-                          end = "")
-                    print("\033[0;29;48m]", end = "")
-
-                # If the piece is black, print a teal type ID
-                if board[(num, 8)].get_contains().get_color() == "black":
-                    print("\033[0;36;48m" +
-                          board[(num, 8)].get_contains().get_type_id(),
-                          end = "")
-                    print("\033[0;29;48m]", end = "")
-
-        print("\033[0;30;47m 8", end=" ")   # Row label at end
-        print("\033[0;29;48m", end="\n")
-
-        # Print row 9 of the game board
-        print("\033[0;30;47m 9", end=" ")   # Row label at beginning
-
-        # Print columns a-i (1-9)
-        for num in range(1, 10):
-
-            # Print left bracket
-            print("\033[0;29;48m[", end = "")
-
-            # If the point on the board does not have a piece, print a blank
-            # space and right bracket
-            if board[(num, 9)].get_contains() is None:
-                print("\033[0;29;48m ]", end="")
-
-            # If the point on the board has a piece, print the type ID using
-            # a different color, and then a right bracket
-            else:
-                # If the piece is red, print a red type ID
-                if board[(num, 9)].get_contains().get_color() == "red":
-                    print("\033[0;31;48m" +
-                        board[(num, 9)].get_contains().get_type_id(),
-                          end = "")
-                    print("\033[0;29;48m]", end = "")
-
-                # If the piece is black, print a teal type ID
-                if board[(num, 9)].get_contains().get_color() == "black":
-                    print("\033[0;36;48m" +
-                          board[(num, 9)].get_contains().get_type_id(),
-                          end = "")
-                    print("\033[0;29;48m]", end = "")
-
-        print("\033[0;30;47m 9", end=" ")   # Row label at end
-        print("\033[0;29;48m", end="\n")
-
-        # Print row 10 of the game board
-        print("\033[0;30;47m10", end=" ")   # Row label at beginning
-
-        # Print columns a-i (1-9)
-        for num in range(1, 10):
-
-            # Print left bracket
-            print("\033[0;29;48m[", end = "")
-
-            # If the point on the board does not have a piece, print a blank
-            # space and right bracket
-            if board[(num, 10)].get_contains() is None:
-                print("\033[0;29;48m ]", end="")
-
-            # If the point on the board has a piece, print the type ID using
-            # a different color, and then a right bracket
-            else:
-                # If the piece is red, print a red type ID
-                if board[(num, 10)].get_contains().get_color() == "red":
-                    print("\033[0;31;48m" +
-                        board[(num, 10)].get_contains().get_type_id(),
-                          end = "")
-                    print("\033[0;29;48m]", end = "")
-
-                # If the piece is black, print a teal type ID
-                if board[(num, 10)].get_contains().get_color() == "black":
-                    print("\033[0;36;48m" +
-                          board[(num, 10)].get_contains().get_type_id(),
-                          end = "")
-                    print("\033[0;29;48m]", end = "")
-
-        print("\033[0;30;47m 10", end="")   # Row label at end
-        print("\033[0;29;48m", end="\n")
-
-        # Print the first footer row
-        print("\033[0;30;47m    1", end = "  ")
-        print("\033[0;30;47m2", end = "  ")
-        print("\033[0;30;47m3", end = "  ")
-        print("\033[0;90;47m4", end = "  ")
-        print("\033[0;90;47m5", end = "  ")
-        print("\033[0;90;47m6", end = "  ")
-        print("\033[0;30;47m7", end = "  ")
-        print("\033[0;30;47m8", end = "  ")
-        print("\033[0;30;47m9", end = "    ")
-        print("\033[0;97;30m")
-
-        # Print the second footer row
-        print("\033[0;30;47m    a", end = "  ")
-        print("\033[0;30;47mb", end = "  ")
-        print("\033[0;30;47mc", end = "  ")
-        print("\033[0;90;47md", end = "  ")
-        print("\033[0;90;47me", end = "  ")
-        print("\033[0;90;47mf", end = "  ")
-        print("\033[0;30;47mg", end = "  ")
-        print("\033[0;30;47mh", end = "  ")
-        print("\033[0;30;47mi", end = "    ")
-        print("\033[0;97;30m")
+        BoardRenderer().write(self._board)
 
     @staticmethod
     def quantify_location(location_str):
         """
         Take as a parameter a string representing a location on the board in
-        algebraic notation (e.g. 'c1'); convert the letter into a number; and
-        return a tuple representing the location in (column, row) format using
-        the digits 1-10.
+        algebraic notation (e.g. 'c1') and return a tuple representing the
+        location in (column, row) format using the digits 1-10, or None if
+        the string is not a location on the board. The tuple is looked up in
+        a table rather than worked out from the string.
         """
-        # If the length of the location string is 3, since the first character
-        # must be a single letter, the second and third characters must make
-        # up "10"
-        if len(location_str) == 3:
-            number_int = 10
-
-        # Get the individual characters of the string parameter
-        letter_char = location_str[0]
-        number_char = location_str[1]
-
-        if len(location_str) == 2:
-            number_int = int(number_char)
-
-        if letter_char == 'a':
-            return (1, number_int)
+        return LOCATION_COORDS.get(location_str)
 
-        if letter_char == 'b':
-            return (2, number_int)
-
-        if letter_char == 'c':
-            return (3, number_int)
-
-        if letter_char == 'd':
-            return (4, number_int)
-
-        if letter_char == 'e':
-            return (5, number_int)
-
-        if letter_char == 'f':
-            return (6, number_int)
+    @staticmethod
+    def location_to_square(location_str):
+        """
+        Take as a parameter a location in algebraic notation (e.g. 'c1') and
+        return its square index (its index in the board's flat array of
+        piece codes, from 0 for a1 to 89 for i10), or None if the string is
+        not a location on the board.
+        """
+        return LOCATION_SQUARES.get(location_str)
 
-        if letter_char == 'g':
-            return (7, number_int)
+    @staticmethod
+    def square_to_location(square):
+        """
+        Take as a parameter a square index and return the location in
+        algebraic notation.
+        """
+        return SQUARE_LOCATIONS[square]
 
-        if letter_char == 'h':
-            return (8, number_int)
+    @staticmethod
+    def coord_to_square(coord):
+        """
+        Take as a parameter a (column, row) tuple and return its square
+        index, or None if it is not on the board.
+        """
+        return COORD_SQUARES.get(coord)
 
-        if letter_char == 'i':
-            return (9, number_int)
+    @staticmethod
+    def square_to_coord(square):
+        """
+        Take as a parameter a square index and return the (column, row)
+        tuple.
+        """
+        return SQUARE_COORDS[square]
 
 
-class Board:
+class GamePool:
     """
-    Represent the game board, implemented as a dictionary whose keys are the
-    possible coordinates on the board, and whose values are point objects.
-    The init method sets up the starting pieces on the board.
+    Represent a pool of reusable XiangqiGame objects, for when games are
+    short-lived and many. A game taken from the pool is in the starting
+    position; a game given back is reset in place (see XiangqiGame.reset)
+    and kept for reuse, up to the pool's maximum size. The pool can be used
+    from several threads at once. Has getter methods for the maximum size
+    and for the numbers of free games and of games created.
     """
-    def __init__(self):
+    def __init__(self, max_size=64, shadow_mode="incremental",
+                 slider_backend="rays", verdict_cache=None):
         """
-        Create a Board object. The board is represented by a dictionary whose
-        keys are the board coordinates as tuples and whose values are point
-        objects.
-        """
-        board = {
-
-            # Initialize row 1
-            (1, 1): Point(1, 1, Chariot("red", 1, 1)),
-            (2, 1): Point(2, 1, Horse("red", 2, 1)),
-            (3, 1): Point(3, 1, Elephant("red", 3, 1)),
-            (4, 1): Point(4, 1, Advisor("red", 4, 1)),
-            (5, 1): Point(5, 1, General("red", 5, 1)),
-            (6, 1): Point(6, 1, Advisor("red", 6, 1)),
-            (7, 1): Point(7, 1, Elephant("red", 7, 1)),
-            (8, 1): Point(8, 1, Horse("red", 8, 1)),
-            (9, 1): Point(9, 1, Chariot("red", 9, 1)),
-
-            # Initialize row 2
-            (1, 2): Point(1, 2),
-            (2, 2): Point(2, 2),
-            (3, 2): Point(3, 2),
-            (4, 2): Point(4, 2),
-            (5, 2): Point(5, 2),
-            (6, 2): Point(6, 2),
-            (7, 2): Point(7, 2),
-            (8, 2): Point(8, 2),
-            (9, 2): Point(9, 2),
-
-            # Initialize row 3
-            (1, 3): Point(1, 3),
-            (2, 3): Point(2, 3, Cannon("red", 2, 3)),
-            (3, 3): Point(3, 3),
-            (4, 3): Point(4, 3),
-            (5, 3): Point(5, 3),
-            (6, 3): Point(6, 3),
-            (7, 3): Point(7, 3),
-            (8, 3): Point(8, 3, Cannon("red", 8, 3)),
-            (9, 3): Point(9, 3),
-
-            # Initialize row 4
-            (1, 4): Point(1, 4, Soldier("red", 1, 4)),
-            (2, 4): Point(2, 4),
-            (3, 4): Point(3, 4, Soldier("red", 3, 4)),
-            (4, 4): Point(4, 4),
-            (5, 4): Point(5, 4, Soldier("red", 5, 4)),
-            (6, 4): Point(6, 4),
-            (7, 4): Point(7, 4, Soldier("red", 7, 4)),
-            (8, 4): Point(8, 4),
-            (9, 4): Point(9, 4, Soldier("red", 9, 4)),
-
-            # Initialize row 5
-            (1, 5): Point(1, 5),
-            (2, 5): Point(2, 5),
-            (3, 5): Point(3, 5),
-            (4, 5): Point(4, 5),
-            (5, 5): Point(5, 5),
-            (6, 5): Point(6, 5),
-            (7, 5): Point(7, 5),
-            (8, 5): Point(8, 5),
-            (9, 5): Point(9, 5),
-
-            # Initialize row 6
-            (1, 6): Point(1, 6),
-            (2, 6): Point(2, 6),
-            (3, 6): Point(3, 6),
-            (4, 6): Point(4, 6),
-            (5, 6): Point(5, 6),
-            (6, 6): Point(6, 6),
-            (7, 6): Point(7, 6),
-            (8, 6): Point(8, 6),
-            (9, 6): Point(9, 6),
-
-            # Initialize row 7
-            (1, 7): Point(1, 7, Soldier("black", 1, 7)),
-            (2, 7): Point(2, 7),
-            (3, 7): Point(3, 7, Soldier("black", 3, 7)),
-            (4, 7): Point(4, 7),
-            (5, 7): Point(5, 7, Soldier("black", 5, 7)),
-            (6, 7): Point(6, 7),
-            (7, 7): Point(7, 7, Soldier("black", 7, 7)),
-            (8, 7): Point(8, 7),
-            (9, 7): Point(9, 7, Soldier("black", 9, 7)),
-
-            # Initialize row 8
-            (1, 8): Point(1, 8),
-            (2, 8): Point(2, 8, Cannon("black", 2, 8)),
-            (3, 8): Point(3, 8),
-            (4, 8): Point(4, 8),
-            (5, 8): Point(5, 8),
-            (6, 8): Point(6, 8),
-            (7, 8): Point(7, 8),
-            (8, 8): Point(8, 8, Cannon("black", 8, 8)),
-            (9, 8): Point(9, 8),
-
-            # Initialize row 9
-            (1, 9): Point(1, 9),
-            (2, 9): Point(2, 9),
-            (3, 9): Point(3, 9),
-            (4, 9): Point(4, 9),
-            (5, 9): Point(5, 9),
-            (6, 9): Point(6, 9),
-            (7, 9): Point(7, 9),
-            (8, 9): Point(8, 9),
-            (9, 9): Point(9, 9),
-
-            # Initialize row 10
-            (1, 10): Point(1, 10, Chariot("black", 1, 10)),
-            (2, 10): Point(2, 10, Horse("black", 2, 10)),
-            (3, 10): Point(3, 10, Elephant("black", 3, 10)),
-            (4, 10): Point(4, 10, Advisor("black", 4, 10)),
-            (5, 10): Point(5, 10, General("black", 5, 10)),
-            (6, 10): Point(6, 10, Advisor("black", 6, 10)),
-            (7, 10): Point(7, 10, Elephant("black", 7, 10)),
-            (8, 10): Point(8, 10, Horse("black", 8, 10)),
-            (9, 10): Point(9, 10, Chariot("black", 9, 10))
-        }
-
-        # Initialize each piece's shadows
-        for row in range(1, 11):
-            for col in range(1, 10):
-                if board[(col, row)].get_contains() is not None:
-                    piece = board[(col, row)].get_contains()
-                    piece.update_shadows(board)
-
-        self._board = board
+        Take as optional parameters the most free games to keep, and the
+        shadow mode, slider backend, and verdict cache of the games created,
+        and create an empty GamePool object.
+        """
+        self._max_size = max_size
+        self._shadow_mode = shadow_mode
+        self._slider_backend = slider_backend
+        self._verdict_cache = verdict_cache
+        self._free_games = []
+        self._created_count = 0
+        self._lock = threading.Lock()
 
-        # Initialize each point's shadowed_by
-        self.update_points_shadows()
+    def get_max_size(self):
+        """
+        Return the most free games that the pool keeps.
+        """
+        return self._max_size
 
-    def get_board(self):
+    def get_free_count(self):
         """
-        Return the board data member.
+        Return the number of free games in the pool.
         """
-        return self._board
+        return len(self._free_games)
 
-    def update_points_shadows(self):
+    def get_created_count(self):
         """
-        For every point on the board, update its list of pieces it is being
-        shadowed by.
+        Return the number of games the pool has created.
         """
-        # Clear every point's list of pieces it is shadowed by
-        for coord in self._board:
-            self._board[coord].clear_shadowed_by()
+        return self._created_count
 
-        # Update every point's list of pieces it is shadowed by
-        # Check every point on the board
-        for coordinate in self._board:
-            point = self._board[coordinate]
+    def fill(self, count):
+        """
+        Take as a parameter a number of games, and create games until the
+        pool has that many free games (or its maximum size).
+        """
+        while len(self._free_games) < min(count, self._max_size):
+            self.release(self._create_game())
 
-            # If the point has a piece
-            if point.get_contains() is not None:
-                piece = point.get_contains()
+    def acquire(self):
+        """
+        Return a game in the starting position: a free game from the pool,
+        or a new one if there are none.
+        """
+        with self._lock:
+            if self._free_games:
+                return self._free_games.pop()
+        return self._create_game()
 
-                # Update the point's shadowed_by
-                for shadowed_coordinate in piece.get_shadows():
-                    self._board[shadowed_coordinate].add_shadowed_by(piece)
+    def release(self, game):
+        """
+        Take as a parameter a game that is no longer needed, reset it, and
+        keep it for reuse unless the pool is full. A game that is already
+        free in the pool is left alone, so that it is never handed out twice.
+        Return True if the game was kept, and False otherwise.
+        """
+        with self._lock:
+            if self._is_free(game):
+                return False
+        game.reset()
+        with self._lock:
+            if (len(self._free_games) < self._max_size and
+                    not self._is_free(game)):
+                self._free_games.append(game)
+                return True
+        return False
 
-    def print_pieces_shadows(self):
+    def _is_free(self, game):
         """
-        For every piece on the board, print out what points it is shadowing.
+        Take as a parameter a game, and return True if it is one of the
+        pool's free games, or False otherwise. The pool's lock must be held.
         """
-        for row in range(1, 11):
-            for col in range(1, 10):
-                if self._board[(col, row)].get_contains() is not None:
-                    piece = self._board[(col, row)].get_contains()
-                    print(piece.get_color(), piece.get_type_id(), "@" + "(" +
-                          str(col) + "," + str(row) + ") " +
-                          "shadows:", piece.get_shadows())
-        print()
+        return any(free_game is game for free_game in self._free_games)
 
-    def print_points_shadows(self):
+    def _create_game(self):
         """
-        For every point on the board, print out what pieces it is shadowed by.
+        Create and return a new game with the pool's settings.
         """
-        for row in range(1, 11):
-            for col in range(1, 10):
-                print("(" + str(col) + "," + str(row) + ") " +
-                      "is shadowed by: ", end='')
-                for piece in self._board[(col, row)].get_shadowed_by():
-                    print(piece.get_color(), piece.get_type_id(), "@" + "(" +
-                          str(piece.get_col()) + "," + str(piece.get_row()) +
-                          "), ", end='')
-                print()
+        game = XiangqiGame(self._shadow_mode, self._slider_backend,
+                           self._verdict_cache)
+        with self._lock:
+            self._created_count += 1
+        return game
 
 
-class Point:
+class MoveResult:
     """
-    Represent a point on the board. Has various getter and setter methods for
-    retrieving and updating the column position, row position, what piece
-    (if any) the point holds, and what pieces (if any) are shadowing the
-    point.
+    Represent the result of XiangqiGame.make_move_ex: whether the move was
+    made, the reason it was not, the type ID of the piece captured, whether
+    either player is in check, and the game state. Has getter methods for
+    each. The reason is None if the move was made, or else one of
+    "NOT_ON_BOARD" (a point is not on the board), "EMPTY_POINT" (there is no
+    piece to move), "NOT_YOUR_PIECE" (the piece belongs to the other player),
+    "OWN_PIECE" (the point moved to holds one of the player's own pieces),
+    "ILLEGAL_MOVE" (the piece cannot move there), "GAME_OVER" (the game has
+    already been won), or "SELF_CHECK" (the move would leave the player's own
+    general in check). The check flags and game state are those after the
+    move, or the unchanged ones if it was not made.
     """
-    def __init__(self, col, row, piece=None):
+    __slots__ = ("_reason", "_captured_type", "_red_in_check",
+                 "_black_in_check", "_game_state")
+
+    REASONS = ("NOT_ON_BOARD", "EMPTY_POINT", "NOT_YOUR_PIECE", "OWN_PIECE",
+               "ILLEGAL_MOVE", "GAME_OVER", "SELF_CHECK")
+
+    def __init__(self, reason, captured_type, red_in_check, black_in_check,
+                 game_state):
         """
-        Take as parameters a column position, row position, and a piece
-        (optional) to create a point object. If no piece is provided, the
-        point contains None by default.
+        Take as parameters the reason the move was not made (or None), the
+        type ID of the piece captured (or None), whether the red and black
+        generals are in check, and the game state, and create a MoveResult
+        object.
         """
-        self._col = col
-        self._row = row
-        self._contains = piece
-        self._shadowed_by = []   # Pieces that shadow the point
+        self._reason = reason
+        self._captured_type = captured_type
+        self._red_in_check = red_in_check
+        self._black_in_check = black_in_check
+        self._game_state = game_state
 
-    def get_col(self):
+    def __bool__(self):
         """
-        Return the column position of the point.
+        Return True if the move was made, as make_move would.
         """
-        return self._col
+        return self._reason is None
 
-    def get_row(self):
+    def __repr__(self):
         """
-        Return the row position of the point.
+        Return a string showing the fields of the result.
+        """
+        return ("MoveResult(reason=%r, captured_type=%r, red_in_check=%r, "
+                "black_in_check=%r, game_state=%r)"
+                % (self._reason, self._captured_type, self._red_in_check,
+                   self._black_in_check, self._game_state))
+
+    def get_made(self):
+        """
+        Return True if the move was made, and False otherwise.
+        """
+        return self._reason is None
+
+    def get_reason(self):
+        """
+        Return the reason the move was not made, or None if it was made.
+        """
+        return self._reason
+
+    def get_captured_type(self):
+        """
+        Return the type ID of the piece captured (e.g. 'C' for a chariot), or
+        None if no piece was captured.
+        """
+        return self._captured_type
+
+    def is_in_check(self, player_color):
+        """
+        Take as a parameter either "red" or "black" for the player color and
+        return True if that player's general is in check, and False otherwise.
+        """
+        if player_color == "red":
+            return self._red_in_check
+        return self._black_in_check
+
+    def get_game_state(self):
+        """
+        Return the game state, which can be "UNFINISHED", "RED_WON", or
+        "BLACK_WON".
+        """
+        return self._game_state
+
+
+class BoardRenderer:
+    """
+    Represent a renderer that turns a board into text, either with the ANSI
+    colors of print_board ("color" mode) or without any escape codes
+    ("plain" mode, where red pieces are upper case and black pieces lower
+    case). A frame is built into a single string from cached pieces of text
+    and can be written with one call. The renderer remembers the pieces on
+    the board in the last frame it built, so that it can also build just the
+    changes since then, as ANSI cursor movements to the changed points (in
+    either mode). The frame is assumed to start on the terminal row given by
+    the origin row, in the first column.
+    """
+    MODES = ("color", "plain")
+
+    def __init__(self, mode="color", origin_row=1):
+        """
+        Take as optional parameters the mode ("color" or "plain") and the
+        terminal row that frames start on, and create a BoardRenderer object
+        that has not built a frame yet.
+        """
+        if mode not in self.MODES:
+            raise ValueError("Unknown render mode: " + str(mode))
+        self._mode = mode
+        self._parts = _FRAME_PARTS[mode]
+        self._origin_row = origin_row
+        self._last_squares = None   # Piece codes in the last frame built
+
+    def get_mode(self):
+        """
+        Return the render mode, "color" or "plain".
+        """
+        return self._mode
+
+    def get_origin_row(self):
+        """
+        Return the terminal row that frames start on.
+        """
+        return self._origin_row
+
+    def get_last_squares(self):
+        """
+        Return the piece codes of every point in the last frame built (as a
+        bytes object indexed by square), or None if no frame has been built.
+        """
+        return self._last_squares
+
+    def set_last_squares(self, squares):
+        """
+        Take as a parameter the piece codes of every point (indexed by
+        square), and remember them as those of the last frame built, as when
+        the frame has been built by another renderer of the same mode and
+        origin row.
+        """
+        self._last_squares = bytes(squares)
+
+    def forget_frame(self):
+        """
+        Forget the last frame built, so that the next call to render_changes
+        builds a whole frame.
+        """
+        self._last_squares = None
+
+    def render(self, board):
+        """
+        Take as a parameter a Board object, and return the whole frame of the
+        board as a string, which ends with a newline.
+        """
+        squares = board.get_squares()
+        parts = self._parts
+        cells = parts["cells"]
+        lines = [parts["header"]]
+        for row in range(1, 11):
+            lines.append(parts["row_prefixes"][row - 1])
+            lines.extend(map(cells.__getitem__,
+                             squares[row * 9 - 9:row * 9]))
+            lines.append(parts["row_suffixes"][row - 1])
+            if row == 5:
+                lines.append(parts["river"])
+        lines.append(parts["footer"])
+        self._last_squares = bytes(squares)
+        return "".join(lines)
+
+    def render_changes(self, board):
+        """
+        Take as a parameter a Board object, and return the points whose
+        contents have changed since the last frame built, each as an ANSI
+        cursor movement to the point followed by the point's text, and then a
+        cursor movement to the row below the frame. If no frame has been
+        built yet, return the whole frame instead.
+        """
+        last_squares = self._last_squares
+        if last_squares is None:
+            return self.render(board)
+
+        squares = board.get_squares()
+        cells = self._parts["cells"]
+        origin_row = self._origin_row
+        changes = []
+        for index in range(90):
+            code = squares[index]
+            if code != last_squares[index]:
+                col, row = SQUARE_COORDS[index]
+                # Rows 6-10 come after the river's line
+                line = origin_row + 1 + row + (row > 5)
+                changes.append("\033[%d;%dH" % (line, 3 * col + 1) +
+                               cells[code])
+        if not changes:
+            return ""
+        changes.append("\033[%d;1H" % (origin_row + 15))
+        self._last_squares = bytes(squares)
+        return "".join(changes)
+
+    def write(self, board, file=None, changes_only=False):
+        """
+        Take as parameters a Board object, an optional file object to write
+        to (by default, standard output), and whether to write only the
+        changes since the last frame, and write the frame (or changes) with
+        a single call. Return the number of characters written.
+        """
+        if changes_only:
+            text = self.render_changes(board)
+        else:
+            text = self.render(board)
+        if file is None:
+            file = sys.stdout
+        file.write(text)
+        return len(text)
+
+
+class VerdictCache:
+    """
+    Represent a bounded cache of verdicts about positions, which can be
+    shared between games, including games played in different threads (as
+    by a GamePool), since the cache is locked while it is read or changed. A
+    verdict is looked up by a position's Zobrist hash (see
+    Board.get_position_hash), a player color, and the verdict's name:
+    "has_legal_move" (whether the player has any legal move, which decides
+    checkmate and stalemate) or "legal_moves" (a list of the player's legal
+    moves). Whether a player is in check is not cached, as it is a single
+    lookup of the general's point. When the cache holds more than its
+    maximum number of positions, the least recently used position is
+    dropped. Has getter methods for the number of hits and misses, which can
+    be reset.
+    """
+    VERDICTS = ("has_legal_move", "legal_moves")
+
+    def __init__(self, max_entries=65536):
+        """
+        Take as an optional parameter the maximum number of positions (each
+        of a position hash and a player color) to hold, and create an empty
+        VerdictCache object.
+        """
+        self._max_entries = max_entries
+        self._entries = OrderedDict()   # Verdicts of each position, by age
+        self._hits = 0
+        self._misses = 0
+        self._lock = threading.Lock()
+
+    def get_verdict(self, position_hash, player_color, verdict):
+        """
+        Take as parameters a position hash, a player color, and the name of a
+        verdict, and return the cached verdict, or None if there is none.
+        Count the lookup as a hit or a miss. Raise a ValueError if there is
+        no such verdict.
+        """
+        if verdict not in self.VERDICTS:
+            raise ValueError("Unknown verdict: " + str(verdict))
+
+        key = (position_hash, player_color)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[verdict] is None:
+                self._misses += 1
+                return None
+
+            self._hits += 1
+            self._entries.move_to_end(key)
+            return entry[verdict]
+
+    def set_verdict(self, position_hash, player_color, verdict, value):
+        """
+        Take as parameters a position hash, a player color, the name of a
+        verdict, and the verdict's value, and store the verdict, dropping the
+        least recently used position if the cache is full.
+        """
+        if verdict not in self.VERDICTS:
+            raise ValueError("Unknown verdict: " + str(verdict))
+
+        key = (position_hash, player_color)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = dict.fromkeys(self.VERDICTS)
+                self._entries[key] = entry
+                if len(self._entries) > self._max_entries:
+                    self._entries.popitem(last=False)
+            else:
+                self._entries.move_to_end(key)
+            entry[verdict] = value
+
+    def get_max_entries(self):
+        """
+        Return the maximum number of positions that the cache holds.
+        """
+        return self._max_entries
+
+    def set_max_entries(self, max_entries):
+        """
+        Update the maximum number of positions that the cache holds, dropping
+        the least recently used positions if there are now too many.
+        """
+        with self._lock:
+            self._max_entries = max_entries
+            while len(self._entries) > max_entries:
+                self._entries.popitem(last=False)
+
+    def get_size(self):
+        """
+        Return the number of positions in the cache.
+        """
+        return len(self._entries)
+
+    def get_hits(self):
+        """
+        Return the number of lookups that found a cached verdict.
+        """
+        return self._hits
+
+    def get_misses(self):
+        """
+        Return the number of lookups that did not find a cached verdict.
+        """
+        return self._misses
+
+    def reset_counters(self):
+        """
+        Reset the numbers of hits and misses to 0.
+        """
+        with self._lock:
+            self._hits = 0
+            self._misses = 0
+
+    def clear(self):
+        """
+        Remove every position from the cache and reset the counters.
+        """
+        with self._lock:
+            self._entries.clear()
+        self.reset_counters()
+
+
+class Board:
+    """
+    Represent the game board, implemented as a dictionary whose keys are the
+    possible coordinates on the board, and whose values are point objects.
+    The board also keeps a flat array of piece codes and a list of each
+    player's pieces, which the points keep up to date as their contents
+    change. The init method sets up the starting pieces on the board.
+    """
+    def __init__(self, shadow_mode="incremental", slider_backend="rays",
+                 pieces=None):
+        """
+        Create a Board object. The board is represented by a dictionary whose
+        keys are the board coordinates as tuples and whose values are point
+        objects. The pieces are in their starting positions, unless a list of
+        pieces is given, in which case those pieces (each on the point given
+        by its column and row) are the only ones on the board. The shadow mode
+        determines how the update_shadows method brings the shadows up to date
+        after pieces have been moved: "incremental" sets aside the shadows of
+        only the pieces that a move could affect, to be recomputed when next
+        needed and put back when the move is reversed, "full" recomputes every
+        piece, and "differential" does the former and then checks it against
+        the latter. The slider backend determines how the chariots' and
+        cannons' shadows are computed: "rays" walks each ray point by point,
+        and "bitboard" looks them up by the occupancy of the piece's row and
+        column.
+        """
+        if pieces is not None:
+            # Put the given pieces on an empty board
+            board = {coord: Point(coord[0], coord[1])
+                     for coord in SQUARE_COORDS}
+            for piece in pieces:
+                board[(piece.get_col(), piece.get_row())].set_contains(piece)
+        else:
+            board = {
+
+                # Initialize row 1
+                (1, 1): Point(1, 1, Chariot("red", 1, 1)),
+                (2, 1): Point(2, 1, Horse("red", 2, 1)),
+                (3, 1): Point(3, 1, Elephant("red", 3, 1)),
+                (4, 1): Point(4, 1, Advisor("red", 4, 1)),
+                (5, 1): Point(5, 1, General("red", 5, 1)),
+                (6, 1): Point(6, 1, Advisor("red", 6, 1)),
+                (7, 1): Point(7, 1, Elephant("red", 7, 1)),
+                (8, 1): Point(8, 1, Horse("red", 8, 1)),
+                (9, 1): Point(9, 1, Chariot("red", 9, 1)),
+
+                # Initialize row 2
+                (1, 2): Point(1, 2),
+                (2, 2): Point(2, 2),
+                (3, 2): Point(3, 2),
+                (4, 2): Point(4, 2),
+                (5, 2): Point(5, 2),
+                (6, 2): Point(6, 2),
+                (7, 2): Point(7, 2),
+                (8, 2): Point(8, 2),
+                (9, 2): Point(9, 2),
+
+                # Initialize row 3
+                (1, 3): Point(1, 3),
+                (2, 3): Point(2, 3, Cannon("red", 2, 3)),
+                (3, 3): Point(3, 3),
+                (4, 3): Point(4, 3),
+                (5, 3): Point(5, 3),
+                (6, 3): Point(6, 3),
+                (7, 3): Point(7, 3),
+                (8, 3): Point(8, 3, Cannon("red", 8, 3)),
+                (9, 3): Point(9, 3),
+
+                # Initialize row 4
+                (1, 4): Point(1, 4, Soldier("red", 1, 4)),
+                (2, 4): Point(2, 4),
+                (3, 4): Point(3, 4, Soldier("red", 3, 4)),
+                (4, 4): Point(4, 4),
+                (5, 4): Point(5, 4, Soldier("red", 5, 4)),
+                (6, 4): Point(6, 4),
+                (7, 4): Point(7, 4, Soldier("red", 7, 4)),
+                (8, 4): Point(8, 4),
+                (9, 4): Point(9, 4, Soldier("red", 9, 4)),
+
+                # Initialize row 5
+                (1, 5): Point(1, 5),
+                (2, 5): Point(2, 5),
+                (3, 5): Point(3, 5),
+                (4, 5): Point(4, 5),
+                (5, 5): Point(5, 5),
+                (6, 5): Point(6, 5),
+                (7, 5): Point(7, 5),
+                (8, 5): Point(8, 5),
+                (9, 5): Point(9, 5),
+
+                # Initialize row 6
+                (1, 6): Point(1, 6),
+                (2, 6): Point(2, 6),
+                (3, 6): Point(3, 6),
+                (4, 6): Point(4, 6),
+                (5, 6): Point(5, 6),
+                (6, 6): Point(6, 6),
+                (7, 6): Point(7, 6),
+                (8, 6): Point(8, 6),
+                (9, 6): Point(9, 6),
+
+                # Initialize row 7
+                (1, 7): Point(1, 7, Soldier("black", 1, 7)),
+                (2, 7): Point(2, 7),
+                (3, 7): Point(3, 7, Soldier("black", 3, 7)),
+                (4, 7): Point(4, 7),
+                (5, 7): Point(5, 7, Soldier("black", 5, 7)),
+                (6, 7): Point(6, 7),
+                (7, 7): Point(7, 7, Soldier("black", 7, 7)),
+                (8, 7): Point(8, 7),
+                (9, 7): Point(9, 7, Soldier("black", 9, 7)),
+
+                # Initialize row 8
+                (1, 8): Point(1, 8),
+                (2, 8): Point(2, 8, Cannon("black", 2, 8)),
+                (3, 8): Point(3, 8),
+                (4, 8): Point(4, 8),
+                (5, 8): Point(5, 8),
+                (6, 8): Point(6, 8),
+                (7, 8): Point(7, 8),
+                (8, 8): Point(8, 8, Cannon("black", 8, 8)),
+                (9, 8): Point(9, 8),
+
+                # Initialize row 9
+                (1, 9): Point(1, 9),
+                (2, 9): Point(2, 9),
+                (3, 9): Point(3, 9),
+                (4, 9): Point(4, 9),
+                (5, 9): Point(5, 9),
+                (6, 9): Point(6, 9),
+                (7, 9): Point(7, 9),
+                (8, 9): Point(8, 9),
+                (9, 9): Point(9, 9),
+
+                # Initialize row 10
+                (1, 10): Point(1, 10, Chariot("black", 1, 10)),
+                (2, 10): Point(2, 10, Horse("black", 2, 10)),
+                (3, 10): Point(3, 10, Elephant("black", 3, 10)),
+                (4, 10): Point(4, 10, Advisor("black", 4, 10)),
+                (5, 10): Point(5, 10, General("black", 5, 10)),
+                (6, 10): Point(6, 10, Advisor("black", 6, 10)),
+                (7, 10): Point(7, 10, Elephant("black", 7, 10)),
+                (8, 10): Point(8, 10, Horse("black", 8, 10)),
+                (9, 10): Point(9, 10, Chariot("black", 9, 10))
+            }
+
+        self._board = board
+        self._shadow_mode = shadow_mode
+        self._squares = bytearray(90)   # Piece code of each point
+        self._general_coords = {}   # Where each player's general was placed
+        self._pieces = {"red": [], "black": []}   # Each player's pieces
+        self._points_shadows_stale = True   # Whether shadowed_by is outdated
+        self._slider_backend = None
+        self._rank_occupancy = [0] * 10   # Bitmask of each row's pieces
+        self._file_occupancy = [0] * 9    # Bitmask of each column's pieces
+        self._position_hash = 0   # Zobrist hash of the pieces on the board
+        self._material_score = 0     # Red's material minus black's
+        self._positional_score = 0   # Red's piece-square values minus black's
+        self.set_slider_backend(slider_backend)
+
+        # Have every point report its contents back to the board
+        for coord in board:
+            board[coord].set_owner(self)
+            piece = board[coord].get_contains()
+            if piece is not None:
+                self._pieces[piece.get_color()].append(piece)
+
+        # The pieces set up in the starting position, which reset puts back,
+        # and the starting contents and shadowed_by of each point, which the
+        # first reset works out (so that boards never reset take no more
+        # memory)
+        self._starting_pieces = None
+        self._starting_contents = None
+        self._starting_shadowed_by = None
+        if pieces is None:
+            self._starting_pieces = (tuple(self._pieces["red"]) +
+                                     tuple(self._pieces["black"]))
+
+        if (self._starting_pieces is not None and
+                _starting_shadows is not None):
+            # Copy the shadows recorded by the first such board
+            self.load_starting_shadows()
+        else:
+            # Initialize each piece's shadows
+            self.update_pieces_shadows()
+
+            # Initialize each point's shadowed_by
+            self.update_points_shadows()
+
+            if self._starting_pieces is not None:
+                self.record_starting_shadows()
+
+    def get_board(self):
+        """
+        Return the board data member.
+        """
+        return self._board
+
+    def reset(self):
+        """
+        Put the board back in the starting position, reusing its points and
+        (if the board was set up in the starting position) its pieces, and
+        copying the starting shadows rather than computing them. The shadow
+        mode and slider backend are kept.
+        """
+        if _starting_shadows is None:
+            Board()     # Record the starting shadows
+        starting_shadows = _starting_shadows
+        layout = starting_shadows["pieces"]
+        if self._starting_pieces is None:
+            self._starting_pieces = tuple(
+                piece_class(color, coord[0], coord[1])
+                for piece_class, color, coord, _ in layout)
+
+        # Put each piece back on its starting point, changing only the
+        # points and pieces that have moved
+        board = self._board
+        for coord, piece in zip(SQUARE_COORDS, self._get_starting_contents()):
+            if board[coord].get_contains() is not piece:
+                board[coord].set_contains(piece)
+        for piece, (_, _, coord, _) in zip(self._starting_pieces, layout):
+            if piece.get_col() != coord[0]:
+                piece.set_col(coord[0])
+            if piece.get_row() != coord[1]:
+                piece.set_row(coord[1])
+
+        red_count = starting_shadows["red_count"]
+        self._pieces["red"][:] = self._starting_pieces[:red_count]
+        self._pieces["black"][:] = self._starting_pieces[red_count:]
+
+        self.load_starting_shadows()
+
+    def record_starting_shadows(self):
+        """
+        Record the shadows of the board, which must be in the starting
+        position, for load_starting_shadows to copy, unless they have already
+        been recorded. The record is published only once it is complete.
+        """
+        global _starting_shadows
+        with _starting_shadows_lock:
+            if _starting_shadows is not None:
+                return
+            pieces = self._pieces["red"] + self._pieces["black"]
+            record = {
+                "red_count": len(self._pieces["red"]),
+                "pieces": tuple(
+                    (type(piece), piece.get_color(),
+                     (piece.get_col(), piece.get_row()),
+                     tuple(piece.get_shadows()))
+                    for piece in pieces),
+                "shadowed_by": tuple(
+                    tuple((piece.get_col(), piece.get_row())
+                          for piece in self._board[coord].get_shadowed_by())
+                    for coord in SQUARE_COORDS)}
+            _starting_shadows = record
+
+    def load_starting_shadows(self):
+        """
+        Copy the recorded starting shadows to every piece and point. The
+        board's pieces must be in the starting position, in the order they
+        were recorded in.
+        """
+        pieces = self._pieces["red"] + self._pieces["black"]
+        for piece, (_, _, _, shadows) in zip(pieces,
+                                             _starting_shadows["pieces"]):
+            piece.set_shadows(shadows)
+
+        board = self._board
+        if self._starting_shadowed_by is not None:
+            for coord, pieces in zip(SQUARE_COORDS,
+                                     self._starting_shadowed_by):
+                board[coord].set_shadowed_by(pieces)
+        else:
+            for coord, shadowed_by in zip(SQUARE_COORDS,
+                                          _starting_shadows["shadowed_by"]):
+                board[coord].set_shadowed_by(
+                    [board[piece_coord].get_contains()
+                     for piece_coord in shadowed_by])
+        self._points_shadows_stale = False
+
+    def _get_starting_contents(self):
+        """
+        Return a tuple of the piece (or None) on each point in the starting
+        position, indexed by square, made from the board's starting pieces.
+        The first call also works out the pieces shadowing each point in the
+        starting position, for load_starting_shadows.
+        """
+        if self._starting_contents is None:
+            contents = [None] * 90
+            for piece, (_, _, coord, _) in zip(self._starting_pieces,
+                                               _starting_shadows["pieces"]):
+                contents[COORD_SQUARES[coord]] = piece
+            self._starting_contents = tuple(contents)
+            self._starting_shadowed_by = tuple(
+                tuple(contents[COORD_SQUARES[piece_coord]]
+                      for piece_coord in shadowed_by)
+                for shadowed_by in _starting_shadows["shadowed_by"])
+        return self._starting_contents
+
+    def get_squares(self):
+        """
+        Return the flat array of piece codes, which has one byte per point.
+        """
+        return self._squares
+
+    def get_pieces(self, player_color):
+        """
+        Take as a parameter a player color and return the list of that
+        player's pieces on the board.
+        """
+        return self._pieces[player_color]
+
+    def update_contents(self, point, piece):
+        """
+        Take as parameters a point and the piece (or None) that the point now
+        holds, and keep the flat array of piece codes, the occupancy of each
+        row and column, the Zobrist hash of the pieces, the material and
+        positional scores, and the index of the generals' coordinates up to
+        date. Called by Point.set_contains.
+        """
+        col = point.get_col()
+        row = point.get_row()
+        index = row * 9 + col - 10
+
+        # Take the point's former piece out of the hash and the scores
+        former_code = self._squares[index]
+        self._position_hash ^= _ZOBRIST_KEYS[former_code][index]
+        self._material_score -= _MATERIAL_SCORES[former_code]
+        self._positional_score -= _PIECE_SQUARE_SCORES[former_code][index]
+
+        if piece is None:
+            self._squares[index] = 0
+            self._rank_occupancy[row - 1] &= ~(1 << (col - 1))
+            self._file_occupancy[col - 1] &= ~(1 << (row - 1))
+        else:
+            code = piece.get_code()
+            self._squares[index] = code
+            self._position_hash ^= _ZOBRIST_KEYS[code][index]
+            self._material_score += _MATERIAL_SCORES[code]
+            self._positional_score += _PIECE_SQUARE_SCORES[code][index]
+            self._rank_occupancy[row - 1] |= 1 << (col - 1)
+            self._file_occupancy[col - 1] |= 1 << (row - 1)
+            if piece.get_type_id() == 'G':
+                self._general_coords[piece.get_color()] = SQUARE_COORDS[index]
+
+    def get_position_hash(self):
+        """
+        Return the Zobrist hash of the pieces on the board, which does not
+        include whose turn it is.
+        """
+        return self._position_hash
+
+    def get_material_score(self):
+        """
+        Return the material score of the pieces on the board: the total
+        value of red's pieces minus that of black's.
+        """
+        return self._material_score
+
+    def get_positional_score(self):
+        """
+        Return the positional score of the pieces on the board: the total
+        piece-square value of red's pieces minus that of black's.
+        """
+        return self._positional_score
+
+    def move_piece(self, source_coord, dest_coord):
+        """
+        Take as parameters the coordinates of the point moved from and the
+        point moved to, and move the piece between them, taking any piece on
+        the point moved to off the board. Update the shadows and return the
+        captured piece (or None) along with the shadows set aside by
+        update_shadows.
+        """
+        board = self._board
+        moved_piece = board[source_coord].get_contains()
+        captured_piece = board[dest_coord].get_contains()
+
+        # Move the piece to the destination point
+        board[dest_coord].set_contains(moved_piece)
+        moved_piece.set_col(dest_coord[0])
+        moved_piece.set_row(dest_coord[1])
+
+        # Remove the source point's contents
+        board[source_coord].set_contains(None)
+
+        if captured_piece is not None:
+            self._pieces[captured_piece.get_color()].remove(captured_piece)
+
+        # Update the shadows of every piece affected by the move
+        saved_shadows = self.update_shadows([source_coord, dest_coord])
+
+        return captured_piece, saved_shadows
+
+    def unmove_piece(self, source_coord, dest_coord, captured_piece,
+                     saved_shadows):
+        """
+        Take as parameters the coordinates of the point that a piece was moved
+        from and the point it was moved to, the piece it captured (or None),
+        and the shadows that move_piece returned, and reverse the move made by
+        move_piece.
+        """
+        board = self._board
+        moved_piece = board[dest_coord].get_contains()
+
+        # Restore the moved piece to its original point
+        board[source_coord].set_contains(moved_piece)
+        moved_piece.set_col(source_coord[0])
+        moved_piece.set_row(source_coord[1])
+
+        # Have the captured piece (if any) go back to its former point
+        board[dest_coord].set_contains(captured_piece)
+
+        if captured_piece is not None:
+            self._pieces[captured_piece.get_color()].append(captured_piece)
+
+        # Restore the shadows of every affected piece
+        self.restore_shadows(saved_shadows)
+
+    def get_general_coord(self, player_color):
+        """
+        Take as a parameter a player color and return the coordinates of that
+        player's general, or None if the general is not on the board.
+        """
+        coord = self._general_coords.get(player_color)
+        if coord is None:
+            return None
+
+        # The general may since have been captured
+        piece = self._board[coord].get_contains()
+        if (piece is None or piece.get_type_id() != 'G' or
+                piece.get_color() != player_color):
+            return None
+
+        return coord
+
+    def get_occupancy(self):
+        """
+        Return a tuple of the occupancy of each row and of each column (as
+        lists of bitmasks, in which bit 0 stands for column a or row 1) if the
+        slider backend is "bitboard", or None otherwise.
+        """
+        if self._slider_backend == "bitboard":
+            return self._rank_occupancy, self._file_occupancy
+        return None
+
+    def get_slider_backend(self):
+        """
+        Return the slider backend, which can be "rays" or "bitboard".
+        """
+        return self._slider_backend
+
+    def set_slider_backend(self, slider_backend):
+        """
+        Update the slider backend to "rays" or "bitboard". The lookup tables
+        of the "bitboard" backend are built the first time it is used.
+        """
+        if slider_backend == "bitboard":
+            _get_slider_table(9)
+            _get_slider_table(10)
+        self._slider_backend = slider_backend
+
+    def get_shadow_mode(self):
+        """
+        Return the shadow mode, which can be "incremental", "full", or
+        "differential".
+        """
+        return self._shadow_mode
+
+    def set_shadow_mode(self, shadow_mode):
+        """
+        Update the shadow mode to "incremental", "full", or "differential".
+        """
+        self._shadow_mode = shadow_mode
+
+    def update_shadows(self, changed_coords):
+        """
+        Take as a parameter a list of coordinates whose contents have just
+        changed, and bring every piece's shadows up to date according to the
+        shadow mode. Every point's shadowed_by is rebuilt when it is next
+        needed. Return the shadows that were set aside, which restore_shadows
+        can put back once the change has been reversed, or None if every
+        piece's shadows were recomputed.
+        """
+        if self._shadow_mode == "full":
+            self.update_pieces_shadows()
+            self.update_points_shadows()
+            return None
+
+        saved = self.invalidate_shadows(changed_coords)
+        self._points_shadows_stale = True
+
+        if self._shadow_mode == "differential":
+            self.check_shadows()
+
+        return saved
+
+    def restore_shadows(self, saved):
+        """
+        Take as a parameter the shadows returned by update_shadows and, once
+        the change to the board has been reversed, put them back in place. If
+        the shadows were recomputed instead of set aside (or the shadow mode
+        is "full"), recompute them all again.
+        """
+        if saved is None or self._shadow_mode == "full":
+            self.update_pieces_shadows()
+            self.update_points_shadows()
+            return
+
+        # Put back the most recently set aside shadows last
+        for piece, piece_saved in reversed(saved):
+            piece.restore_shadows(piece_saved)
+        self._points_shadows_stale = True
+
+        if self._shadow_mode == "differential":
+            self.check_shadows()
+
+    def update_pieces_shadows(self):
+        """
+        For every piece on the board, update its list of coordinates that it
+        is shadowing.
+        """
+        for player_color in self._pieces:
+            for piece in self._pieces[player_color]:
+                piece.update_shadows(self)
+
+    def invalidate_shadows(self, changed_coords):
+        """
+        Take as a parameter a list of coordinates whose contents have just
+        changed. Set aside the shadows of only those pieces that could be
+        affected by the changed coordinates, to be recomputed when they are
+        next needed. Return a list of each such piece and its set aside
+        shadows.
+        """
+        changed_mask = 0
+        for coord in changed_coords:
+            changed_mask |= 1 << (coord[1] * 9 + coord[0] - 10)
+
+        saved = []
+        for player_color in self._pieces:
+            for piece in self._pieces[player_color]:
+                if piece.get_influence_mask() & changed_mask:
+                    saved.append((piece, piece.invalidate_shadows(self)))
+        return saved
+
+    def is_shadowed(self, coord, player_color):
+        """
+        Take as parameters a coordinate and a player color and return True if
+        any of that player's pieces is shadowing the point, and False
+        otherwise.
+        """
+        bit = 1 << (coord[1] * 9 + coord[0] - 10)
+        for piece in self._pieces[player_color]:
+            # A piece can only shadow points within its influence
+            if (piece.get_influence_mask() & bit and
+                    coord in piece.get_shadows()):
+                return True
+        return False
+
+    def get_shadowing_pieces(self, coord, player_color):
+        """
+        Take as parameters a coordinate and a player color and return a list
+        of that player's pieces that are shadowing the point.
+        """
+        bit = 1 << (coord[1] * 9 + coord[0] - 10)
+        pieces = []
+        for piece in self._pieces[player_color]:
+            if (piece.get_influence_mask() & bit and
+                    coord in piece.get_shadows()):
+                pieces.append(piece)
+        return pieces
+
+    def refresh_points_shadows(self):
+        """
+        If any piece's shadows have changed since every point's shadowed_by
+        was last updated, update every point's shadowed_by. Called by
+        Point.get_shadowed_by.
+        """
+        if self._points_shadows_stale:
+            self.update_points_shadows()
+
+    def check_shadows(self):
+        """
+        Compare every piece's shadows and every point's shadowed_by against a
+        full recompute. Raise a RuntimeError naming the first mismatch, if
+        any. The board is left with the fully recomputed shadows.
+        """
+        board = self._board
+        pieces_shadows = {}
+        points_shadowed_by = {}
+        for coord in board:
+            point = board[coord]
+            points_shadowed_by[coord] = point.get_shadowed_by()[:]
+            if point.get_contains() is not None:
+                pieces_shadows[coord] = point.get_contains().get_shadows()[:]
+
+        self.update_pieces_shadows()
+        self.update_points_shadows()
+
+        for coord in board:
+            point = board[coord]
+            if point.get_contains() is not None:
+                expected = point.get_contains().get_shadows()
+                if pieces_shadows[coord] != expected:
+                    raise RuntimeError(
+                        "Shadows of the piece at " + str(coord) + " are " +
+                        str(pieces_shadows[coord]) + " instead of " +
+                        str(expected))
+
+            # Compare the pieces themselves, not merely equal values
+            expected = point.get_shadowed_by()
+            actual = points_shadowed_by[coord]
+            if (len(actual) != len(expected) or
+                    any(a is not b for a, b in zip(actual, expected))):
+                raise RuntimeError(
+                    "Pieces shadowing the point " + str(coord) +
+                    " differ from a full recompute")
+
+    def update_points_shadows(self):
+        """
+        For every point on the board, update its list of pieces it is being
+        shadowed by.
+        """
+        self._points_shadows_stale = False
+
+        # Clear every point's list of pieces it is shadowed by
+        for coord in self._board:
+            self._board[coord].clear_shadowed_by()
+
+        # Update every point's list of pieces it is shadowed by
+        # Check every point on the board
+        for coordinate in self._board:
+            point = self._board[coordinate]
+
+            # If the point has a piece
+            if point.get_contains() is not None:
+                piece = point.get_contains()
+
+                # Update the point's shadowed_by
+                for shadowed_coordinate in piece.get_shadows():
+                    self._board[shadowed_coordinate].add_shadowed_by(piece)
+
+    def print_pieces_shadows(self):
+        """
+        For every piece on the board, print out what points it is shadowing.
+        """
+        for row in range(1, 11):
+            for col in range(1, 10):
+                if self._board[(col, row)].get_contains() is not None:
+                    piece = self._board[(col, row)].get_contains()
+                    print(piece.get_color(), piece.get_type_id(), "@" + "(" +
+                          str(col) + "," + str(row) + ") " +
+                          "shadows:", piece.get_shadows())
+        print()
+
+    def print_points_shadows(self):
+        """
+        For every point on the board, print out what pieces it is shadowed by.
+        """
+        for row in range(1, 11):
+            for col in range(1, 10):
+                print("(" + str(col) + "," + str(row) + ") " +
+                      "is shadowed by: ", end='')
+                for piece in self._board[(col, row)].get_shadowed_by():
+                    print(piece.get_color(), piece.get_type_id(), "@" + "(" +
+                          str(piece.get_col()) + "," + str(piece.get_row()) +
+                          "), ", end='')
+                print()
+
+
+class Point:
+    """
+    Represent a point on the board. Has various getter and setter methods for
+    retrieving and updating the column position, row position, what piece
+    (if any) the point holds, and what pieces (if any) are shadowing the
+    point.
+    """
+    # Points (like pieces) have no per-instance dictionary, since every game
+    # holds 90 of them
+    __slots__ = ("_col", "_row", "_contains", "_shadowed_by", "_owner")
+
+    def __init__(self, col, row, piece=None):
+        """
+        Take as parameters a column position, row position, and a piece
+        (optional) to create a point object. If no piece is provided, the
+        point contains None by default.
+        """
+        self._col = col
+        self._row = row
+        self._contains = piece
+        self._shadowed_by = []   # Pieces that shadow the point
+        self._owner = None       # Board that the point belongs to
+
+    def get_col(self):
+        """
+        Return the column position of the point.
+        """
+        return self._col
+
+    def get_row(self):
+        """
+        Return the row position of the point.
         """
         return self._row
 
@@ -1240,14 +2378,34 @@ class Point:
 
     def set_contains(self, piece):
         """
-        Update what the point holds (a different piece or None).
+        Update what the point holds (a different piece or None), and let the
+        board that the point belongs to (if any) know.
         """
         self._contains = piece
+        if self._owner is not None:
+            self._owner.update_contents(self, piece)
+
+    def get_owner(self):
+        """
+        Return the board that the point belongs to, or None.
+        """
+        return self._owner
+
+    def set_owner(self, board):
+        """
+        Take as a parameter a Board object and make it the board that the
+        point belongs to. The board is told what the point contains.
+        """
+        self._owner = board
+        board.update_contents(self, self._contains)
 
     def get_shadowed_by(self):
         """
-        Return what pieces (if any) are shadowing the point.
+        Return what pieces (if any) are shadowing the point, after having the
+        board that the point belongs to (if any) bring it up to date.
         """
+        if self._owner is not None:
+            self._owner.refresh_points_shadows()
         return self._shadowed_by
 
     def add_shadowed_by(self, piece):
@@ -1264,6 +2422,13 @@ class Point:
         """
         self._shadowed_by.clear()
 
+    def set_shadowed_by(self, pieces):
+        """
+        Take as a parameter a list of piece objects and make them the pieces
+        that are shadowing the point.
+        """
+        self._shadowed_by[:] = pieces
+
 
 class Piece:
     """
@@ -1273,6 +2438,10 @@ class Piece:
     position, row position, type ID, and list of coordinates (tuples) that it
     is shadowing.
     """
+    _type_code = 0     # Identify the piece's type in the flat array of codes
+    __slots__ = ("_color", "_col", "_row", "_type_id", "_shadows",
+                 "_stale_board", "_influence_mask")
+
     def __init__(self, color, col, row):
         """
         Take as parameters the piece's color, column position, and row
@@ -1285,6 +2454,9 @@ class Piece:
         self._row = row
         self._type_id = None  # Identify the piece's type via a single letter
         self._shadows = []    # Track coordinates that the piece can move to
+        self._stale_board = None  # Board to recompute the shadows from
+        self._influence_mask = None  # Points that can change the shadows
+        self.update_influence_mask()
 
     def get_color(self):
         """
@@ -1303,6 +2475,7 @@ class Piece:
         Update the column position of the piece.
         """
         self._col = col_pos
+        self.update_influence_mask()
 
     def get_row(self):
         """
@@ -1315,6 +2488,7 @@ class Piece:
         Update the row position of the piece.
         """
         self._row = row_pos
+        self.update_influence_mask()
 
     def get_type_id(self):
         """
@@ -1322,357 +2496,184 @@ class Piece:
         """
         return self._type_id
 
+    def get_code(self):
+        """
+        Return the code of the piece in the board's flat array of piece codes,
+        which combines the piece's type and color.
+        """
+        return self._type_code + _COLOR_CODES[self._color]
+
     def get_shadows(self):
         """
         Return the list of coordinates (if any) that the piece is shadowing.
+        If the shadows have been invalidated since they were last updated,
+        they are recomputed first.
         """
+        if self._stale_board is not None:
+            board = self._stale_board
+            self._stale_board = None
+            self.update_shadows(board)
         return self._shadows
 
-
-class General(Piece):
-    """
-    Represent a general (i.e. king) piece. This class is a subclass of Piece.
-    """
-    def __init__(self, color, col, row):
+    def set_shadows(self, shadows):
         """
-        Take as parameters the general's color, column position, and row
-        position to create a General object. Initialize the corresponding
-        data members, as well as the type ID.
+        Take as a parameter a sequence of coordinates and make them the
+        piece's shadows, as when they are known without being computed.
         """
-        super().__init__(color, col, row)
-        self._type_id = 'G'                # First letter of "General"
+        self._shadows = list(shadows)
+        self._stale_board = None
 
-    def update_shadows(self, board):
+    def invalidate_shadows(self, board):
         """
-        Take as a parameter the current board and update the general's list of
-        coordinates that it is shadowing.
+        Take as a parameter the Board object that the piece is on, set the
+        piece's shadows aside, and have them recomputed from the board when
+        they are next needed. Return what was set aside, which can later be
+        passed to restore_shadows.
         """
-        self._shadows.clear()
-        col = self._col
-        row = self._row
-
-        # Check for possible points that the red general can move to
-        if self._color == "red":
-            # Check the north orthogonal point
-            if 1 <= (row - 1) <= 3:
-                if board[(col, row - 1)].get_contains() is None:
-                    self._shadows.append((col, row - 1))
-
-                # If there is a piece on the point, check its color
-                else:
-                    piece = board[(col, row - 1)].get_contains()
-                    if piece.get_color() != self._color:
-                        self._shadows.append((col, row - 1))
-
-            # Check the south orthogonal point
-            if 1 <= (row + 1) <= 3:
-                if board[(col, row + 1)].get_contains() is None:
-                    self._shadows.append((col, row + 1))
-
-                # If there is a piece on the point, check its color
-                else:
-                    piece = board[(col, row + 1)].get_contains()
-                    if piece.get_color() != self._color:
-                        self._shadows.append((col, row + 1))
-
-            # Check the east orthogonal point
-            if 4 <= (col + 1) <= 6:
-                if board[(col + 1, row)].get_contains() is None:
-                    self._shadows.append((col + 1, row))
-
-                # If there is a piece on the point, check its color
-                else:
-                    piece = board[(col + 1, row)].get_contains()
-                    if piece.get_color() != self._color:
-                        self._shadows.append((col + 1, row))
-
-            # Check the west orthogonal point
-            if 4 <= (col - 1) <= 6:
-                if board[(col - 1, row)].get_contains() is None:
-                    self._shadows.append((col - 1, row))
-
-                # If there is a piece on the point, check its color
-                else:
-                    piece = board[(col - 1, row)].get_contains()
-                    if piece.get_color() != self._color:
-                        self._shadows.append((col - 1, row))
-
-            # Check for the "flying general" condition:
-            # Get the black general's column and row positions
-            black_gen_col = None
-            black_gen_row = None
-            is_file_clear = True   # Assume True unless proven otherwise
-
-            # Check every point on the board
-            for coord in board:
-
-                # If the point has a piece
-                if board[coord].get_contains() is not None:
-                    piece = board[coord].get_contains()
-
-                    # If the piece is black
-                    if piece.get_color() == "black":
-
-                        # If the piece is a general
-                        if piece.get_type_id() == 'G':
-                            black_gen_col = piece.get_col()
-                            black_gen_row = piece.get_row()
-
-            # If the two generals are in the same column
-            if self._col == black_gen_col:
-
-                # Check for pieces in the rows between the generals
-                for row_num in range(self._row + 1, black_gen_row):
-                    # If there is a piece
-                    if board[(self._col, row_num)].get_contains() is not None:
-                        is_file_clear = False
-
-                # If there are no intervening pieces between the generals
-                if is_file_clear:
-                    # Add all points between the generals, as well as the
-                    # black general's point, to the red general's _shadows
-                    # data member
-                    for row_num in range(self._row + 1, black_gen_row + 1):
-                        self._shadows.append((self._col, row_num))
-
-        # Check for possible points that the black general can move to
-        if self._color == "black":
-            # Check the north orthogonal point
-            if 8 <= (row - 1) <= 10:
-                if board[(col, row - 1)].get_contains() is None:
-                    self._shadows.append((col, row - 1))
-
-                # If there is a piece on the point, check its color
-                else:
-                    piece = board[(col, row - 1)].get_contains()
-                    if piece.get_color() != self._color:
-                        self._shadows.append((col, row - 1))
-
-            # Check the south orthogonal point
-            if 8 <= (row + 1) <= 10:
-                if board[(col, row + 1)].get_contains() is None:
-                    self._shadows.append((col, row + 1))
-
-                # If there is a piece on the point, check its color
-                else:
-                    piece = board[(col, row + 1)].get_contains()
-                    if piece.get_color() != self._color:
-                        self._shadows.append((col, row + 1))
-
-            # Check the east orthogonal point
-            if 4 <= (col + 1) <= 6:
-                if board[(col + 1, row)].get_contains() is None:
-                    self._shadows.append((col + 1, row))
-
-                # If there is a piece on the point, check its color
-                else:
-                    piece = board[(col + 1, row)].get_contains()
-                    if piece.get_color() != self._color:
-                        self._shadows.append((col + 1, row))
-
-            # Check the west orthogonal point
-            if 4 <= (col - 1) <= 6:
-                if board[(col - 1, row)].get_contains() is None:
-                    self._shadows.append((col - 1, row))
-
-                # If there is a piece on the point, check its color
-                else:
-                    piece = board[(col - 1, row)].get_contains()
-                    if piece.get_color() != self._color:
-                        self._shadows.append((col - 1, row))
-
-            # Check for the "flying general" condition:
-            # Get the red general's column and row positions
-            red_gen_col = None
-            red_gen_row = None
-            is_file_clear = True   # Assume True unless proven otherwise
-
-            # Check every point on the board
-            for coord in board:
+        saved = (self._shadows, self._stale_board)
+        self._shadows = []
+        self._stale_board = board
+        return saved
 
-                # If the point has a piece
-                if board[coord].get_contains() is not None:
-                    piece = board[coord].get_contains()
-
-                    # If the piece is red
-                    if piece.get_color() == "red":
-
-                        # If the piece is a general
-                        if piece.get_type_id() == 'G':
-                            red_gen_col = piece.get_col()
-                            red_gen_row = piece.get_row()
+    def restore_shadows(self, saved):
+        """
+        Take as a parameter the shadows set aside by invalidate_shadows and
+        put them back in place of the current ones.
+        """
+        self._shadows, self._stale_board = saved
 
-            # If the two generals are in the same column
-            if self._col == red_gen_col:
+    def is_affected_by(self, coord):
+        """
+        Take as a parameter a coordinate and return True if a change to the
+        point's contents could change the piece's shadows (or if the piece is
+        on the point), and False otherwise.
+        """
+        return bool(self.get_influence_mask() >>
+                    (coord[1] * 9 + coord[0] - 10) & 1)
 
-                # Check for pieces in the rows between the generals
-                for row_num in range(red_gen_row + 1, self._row):
-                    # If there is a piece
-                    if board[(self._col, row_num)].get_contains() is not None:
-                        is_file_clear = False
+    def get_influence_mask(self):
+        """
+        Return a bitmask of the indices in the board's flat array of piece
+        codes whose contents can change the piece's shadows, given where the
+        piece is. The piece's own point is included.
+        """
+        return self._influence_mask
 
-                # If there are no intervening pieces between the generals
-                if is_file_clear:
-                    # Add all points between the generals, as well as the red
-                    # general's point, to the black general's _shadows data
-                    # member
-                    for row_num in range(red_gen_row, self._row):
-                        self._shadows.append((self._col, row_num))
+    def update_influence_mask(self):
+        """
+        Look up the piece's influence mask for its current position.
+        """
+        self._influence_mask = _INFLUENCE_MASKS[self._type_code][
+            self._row * 9 + self._col - 10]
 
 
-class Advisor(Piece):
+class General(Piece):
     """
-    Represent an advisor piece. This class is a subclass of Piece.
+    Represent a general (i.e. king) piece. This class is a subclass of Piece.
     """
+    _type_code = 1
+    __slots__ = ()
+
     def __init__(self, color, col, row):
         """
-        Take as parameters and initialize the advisor's color, column
-        position, and row position to create an Advisor object. Initialize
-        the corresponding data members, as well as the type ID.
+        Take as parameters the general's color, column position, and row
+        position to create a General object. Initialize the corresponding
+        data members, as well as the type ID.
         """
         super().__init__(color, col, row)
-        self._type_id = 'A'                # First letter of "Advisor"
-
-    def update_shadows(self, board):
-        """
-        Take as a parameter the current board and update the advisor's list of
-        coordinates that it is shadowing.
-        """
-        self._shadows.clear()
-        col = self._col
-        row = self._row
-
-        # Check for possible points that the red advisor can move to
-        if self._color == "red":
-
-            # Check the northeast diagonal
-            if (4 <= (col + 1) <= 6) and (1 <= (row - 1) <= 3):
-
-                # If the point is empty
-                if board[(col + 1, row - 1)].get_contains() is None:
-                    self._shadows.append((col + 1, row - 1))
-
-                # If the point has a piece
-                else:
-                    piece = board[(col + 1, row - 1)].get_contains()
-
-                    # If the piece belongs to the opponent
-                    if piece.get_color() != self.get_color():
-                        self._shadows.append((col + 1, row - 1))
-
-            # Check the southeast diagonal
-            if (4 <= (col + 1) <= 6) and (1 <= (row + 1) <= 3):
-
-                # If the point is empty
-                if board[(col + 1, row + 1)].get_contains() is None:
-                    self._shadows.append((col + 1, row + 1))
-
-                # If the point has a piece
-                else:
-                    piece = board[(col + 1, row + 1)].get_contains()
-
-                    # If the piece belongs to the opponent
-                    if piece.get_color() != self.get_color():
-                        self._shadows.append((col + 1, row + 1))
-
-            # Check the southwest diagonal
-            if (4 <= (col - 1) <= 6) and (1 <= (row + 1) <= 3):
-
-                # If the point is empty
-                if board[(col - 1, row + 1)].get_contains() is None:
-                    self._shadows.append((col - 1, row + 1))
-
-                # If the point has a piece
-                else:
-                    piece = board[(col - 1, row + 1)].get_contains()
-
-                    # If the piece belongs to the opponent
-                    if piece.get_color() != self.get_color():
-                        self._shadows.append((col - 1, row + 1))
-
-            # Check the northwest diagonal
-            if (4 <= (col - 1) <= 6) and (1 <= (row - 1) <= 3):
-
-                # If the point is empty
-                if board[(col - 1, row - 1)].get_contains() is None:
-                    self._shadows.append((col - 1, row - 1))
-
-                # If the point has a piece
-                else:
-                    piece = board[(col - 1, row - 1)].get_contains()
-
-                    # If the piece belongs to the opponent
-                    if piece.get_color() != self.get_color():
-                        self._shadows.append((col - 1, row - 1))
-
-        # Check for possible points that the black advisor can move to
-        if self._color == "black":
-
-            # Check the northeast diagonal
-            if (4 <= (col + 1) <= 6) and (8 <= (row - 1) <= 10):
-
-                # If the point is empty
-                if board[(col + 1, row - 1)].get_contains() is None:
-                    self._shadows.append((col + 1, row - 1))
-
-                # If the point has a piece
-                else:
-                    piece = board[(col + 1, row - 1)].get_contains()
-
-                    # If the piece belongs to the opponent
-                    if piece.get_color() != self.get_color():
-                        self._shadows.append((col + 1, row - 1))
-
-            # Check the southeast diagonal
-            if (4 <= (col + 1) <= 6) and (8 <= (row + 1) <= 10):
-
-                # If the point is empty
-                if board[(col + 1, row + 1)].get_contains() is None:
-                    self._shadows.append((col + 1, row + 1))
-
-                # If the point has a piece
-                else:
-                    piece = board[(col + 1, row + 1)].get_contains()
-
-                    # If the piece belongs to the opponent
-                    if piece.get_color() != self.get_color():
-                        self._shadows.append((col + 1, row + 1))
+        self._type_id = 'G'                # First letter of "General"
 
-            # Check the southwest diagonal
-            if (4 <= (col - 1) <= 6) and (8 <= (row + 1) <= 10):
+    def update_shadows(self, board):
+        """
+        Take as a parameter the current board (the dictionary of points, the
+        board's flat array of piece codes, or the Board object) and update the
+        general's list of coordinates that it is shadowing.
+        """
+        squares = _get_squares(board)
+        self._shadows.clear()
+        col = self._col
+        row = self._row
+        own_code = _COLOR_CODES[self._color]
+
+        # Walk the table of the general's moves from its point: north, south,
+        # east, and west, staying within the palace's rows when moving north
+        # or south and within its columns when moving east or west
+        for index, _ in _LEAPER_MOVES[self.get_code()][row * 9 + col - 10]:
+
+            # If the point is empty or has an opponent piece
+            code = squares[index]
+            if code == 0 or code & _BLACK_CODE != own_code:
+                self._shadows.append(SQUARE_COORDS[index])
+
+        # Check for the "flying general" condition: find the opponent's
+        # general
+        other_index = squares.find(self._type_code + _BLACK_CODE - own_code)
+        if other_index == -1:
+            return
+        other_col, other_row = SQUARE_COORDS[other_index]
+
+        # If the two generals are in the same column
+        if col == other_col:
+            if self._color == "red":
+                between_rows = range(row + 1, other_row)
+                shadowed_rows = range(row + 1, other_row + 1)
+            else:
+                between_rows = range(other_row + 1, row)
+                shadowed_rows = range(other_row, row)
 
-                # If the point is empty
-                if board[(col - 1, row + 1)].get_contains() is None:
-                    self._shadows.append((col - 1, row + 1))
+            # If there are no intervening pieces between the generals, add
+            # all points between the generals, as well as the opponent
+            # general's point, to the general's _shadows data member
+            for row_num in between_rows:
+                if squares[row_num * 9 + col - 10] != 0:
+                    return
+            for row_num in shadowed_rows:
+                self._shadows.append(SQUARE_COORDS[row_num * 9 + col - 10])
 
-                # If the point has a piece
-                else:
-                    piece = board[(col - 1, row + 1)].get_contains()
 
-                    # If the piece belongs to the opponent
-                    if piece.get_color() != self.get_color():
-                        self._shadows.append((col - 1, row + 1))
+class Advisor(Piece):
+    """
+    Represent an advisor piece. This class is a subclass of Piece.
+    """
+    _type_code = 2
+    __slots__ = ()
 
-            # Check the northwest diagonal
-            if (4 <= (col - 1) <= 6) and (8 <= (row - 1) <= 10):
+    def __init__(self, color, col, row):
+        """
+        Take as parameters and initialize the advisor's color, column
+        position, and row position to create an Advisor object. Initialize
+        the corresponding data members, as well as the type ID.
+        """
+        super().__init__(color, col, row)
+        self._type_id = 'A'                # First letter of "Advisor"
 
-                # If the point is empty
-                if board[(col - 1, row - 1)].get_contains() is None:
-                    self._shadows.append((col - 1, row - 1))
+    def update_shadows(self, board):
+        """
+        Take as a parameter the current board (the dictionary of points, the
+        board's flat array of piece codes, or the Board object) and update the
+        advisor's list of coordinates that it is shadowing.
+        """
+        squares = _get_squares(board)
+        self._shadows.clear()
+        own_code = _COLOR_CODES[self._color]
 
-                # If the point has a piece
-                else:
-                    piece = board[(col - 1, row - 1)].get_contains()
+        # Walk the table of the advisor's moves from its point
+        for index, _ in _LEAPER_MOVES[self.get_code()][
+                self._row * 9 + self._col - 10]:
 
-                    # If the piece belongs to the opponent
-                    if piece.get_color() != self.get_color():
-                        self._shadows.append((col - 1, row - 1))
+            # If the point is empty or has an opponent piece
+            code = squares[index]
+            if code == 0 or code & _BLACK_CODE != own_code:
+                self._shadows.append(SQUARE_COORDS[index])
 
 
 class Elephant(Piece):
     """
     Represent an elephant piece. This class is a subclass of Piece.
     """
+    _type_code = 3
+    __slots__ = ()
+
     def __init__(self, color, col, row):
         """
         Take as parameters the elephant's color, column position, and row
@@ -1684,192 +2685,35 @@ class Elephant(Piece):
 
     def update_shadows(self, board):
         """
-        Take as a parameter the current board and update the elephant's list
-        of coordinates that it is shadowing.
+        Take as a parameter the current board (the dictionary of points, the
+        board's flat array of piece codes, or the Board object) and update the
+        elephant's list of coordinates that it is shadowing.
         """
+        squares = _get_squares(board)
         self._shadows.clear()
-        col = self._col
-        row = self._row
-
-        # Check for possible points that the red elephant can move to
-        if self._color == "red":
-
-            # Check northeast one point diagonally for an intervening piece
-            if (1 <= (col + 1) <= 9) and (1 <= (row - 1) <= 5):
-
-                # If there is no intervening piece
-                if board[(col + 1, row - 1)].get_contains() is None:
-
-                    # Check northeast two points diagonally
-                    if (1 <= (col + 2) <= 9) and (1 <= (row - 2) <= 5):
-
-                        # If the point is empty
-                        if board[(col + 2, row - 2)].get_contains() is None:
-                            self._shadows.append((col + 2, row - 2))
-
-                        # If the point has a piece
-                        else:
-                            piece = board[(col + 2, row - 2)].get_contains()
-
-                            # If the piece belongs to the opponent
-                            if piece.get_color() != self.get_color():
-                                self._shadows.append((col + 2, row - 2))
-
-            # Check southeast one point diagonally for an intervening piece
-            if (1 <= (col + 1) <= 9) and (1 <= (row + 1) <= 5):
-
-                # If there is no intervening piece
-                if board[(col + 1, row + 1)].get_contains() is None:
-
-                    # Check southeast two points diagonally
-                    if (1 <= (col + 2) <= 9) and (1 <= (row + 2) <= 5):
-
-                        # If the point is empty
-                        if board[(col + 2, row + 2)].get_contains() is None:
-                            self._shadows.append((col + 2, row + 2))
-
-                        # If the point has a piece
-                        else:
-                            piece = board[(col + 2, row + 2)].get_contains()
-
-                            # If the piece belongs to the opponent
-                            if piece.get_color() != self.get_color():
-                                self._shadows.append((col + 2, row + 2))
-
-            # Check southwest one point diagonally for an intervening piece
-            if (1 <= (col - 1) <= 9) and (1 <= (row + 1) <= 5):
-
-                # If there is no intervening piece
-                if board[(col - 1, row + 1)].get_contains() is None:
-
-                    # Check southwest two points diagonally
-                    if (1 <= (col - 2) <= 9) and (1 <= (row + 2) <= 5):
-
-                        # If the point is empty
-                        if board[(col - 2, row + 2)].get_contains() is None:
-                            self._shadows.append((col - 2, row + 2))
-
-                        # If the point has a piece
-                        else:
-                            piece = board[(col - 2, row + 2)].get_contains()
-
-                            # If the piece belongs to the opponent
-                            if piece.get_color() != self.get_color():
-                                self._shadows.append((col - 2, row + 2))
-
-            # Check northwest one point diagonally for an intervening piece
-            if (1 <= (col - 1) <= 9) and (1 <= (row - 1) <= 5):
-
-                # If there is no intervening piece
-                if board[(col - 1, row - 1)].get_contains() is None:
-
-                    # Check northwest two points diagonally
-                    if (1 <= (col - 2) <= 9) and (1 <= (row - 2) <= 5):
-
-                        # If the point is empty
-                        if board[(col - 2, row - 2)].get_contains() is None:
-                            self._shadows.append((col - 2, row - 2))
-
-                        # If the point has a piece
-                        else:
-                            piece = board[(col - 2, row - 2)].get_contains()
-
-                            # If the piece belongs to the opponent
-                            if piece.get_color() != self.get_color():
-                                self._shadows.append((col - 2, row - 2))
-
-        # Check for possible points that the black elephant can move to
-        if self._color == "black":
-
-            # Check northeast one point diagonally for an intervening piece
-            if (1 <= (col + 1) <= 9) and (6 <= (row - 1) <= 10):
-
-                # If there is no intervening piece
-                if board[(col + 1, row - 1)].get_contains() is None:
-
-                    # Check northeast two points diagonally
-                    if (1 <= (col + 2) <= 9) and (6 <= (row - 2) <= 10):
-
-                        # If the point is empty
-                        if board[(col + 2, row - 2)].get_contains() is None:
-                            self._shadows.append((col + 2, row - 2))
-
-                        # If the point has a piece
-                        else:
-                            piece = board[(col + 2, row - 2)].get_contains()
-
-                            # If the piece belongs to the opponent
-                            if piece.get_color() != self.get_color():
-                                self._shadows.append((col + 2, row - 2))
+        own_code = _COLOR_CODES[self._color]
 
-            # Check southeast one point diagonally for an intervening piece
-            if (1 <= (col + 1) <= 9) and (6 <= (row + 1) <= 10):
+        # Walk the table of the elephant's moves from its point
+        for index, block_index in _LEAPER_MOVES[self.get_code()][
+                self._row * 9 + self._col - 10]:
 
-                # If there is no intervening piece
-                if board[(col + 1, row + 1)].get_contains() is None:
-
-                    # Check southeast two points diagonally
-                    if (1 <= (col + 2) <= 9) and (6 <= (row + 2) <= 10):
-
-                        # If the point is empty
-                        if board[(col + 2, row + 2)].get_contains() is None:
-                            self._shadows.append((col + 2, row + 2))
-
-                        # If the point has a piece
-                        else:
-                            piece = board[(col + 2, row + 2)].get_contains()
-
-                            # If the piece belongs to the opponent
-                            if piece.get_color() != self.get_color():
-                                self._shadows.append((col + 2, row + 2))
-
-            # Check southwest one point diagonally for an intervening piece
-            if (1 <= (col - 1) <= 9) and (6 <= (row + 1) <= 10):
-
-                # If there is no intervening piece
-                if board[(col - 1, row + 1)].get_contains() is None:
-
-                    # Check southwest two points diagonally
-                    if (1 <= (col - 2) <= 9) and (6 <= (row + 2) <= 10):
-
-                        # If the point is empty
-                        if board[(col - 2, row + 2)].get_contains() is None:
-                            self._shadows.append((col - 2, row + 2))
-
-                        # If the point has a piece
-                        else:
-                            piece = board[(col - 2, row + 2)].get_contains()
-
-                            # If the piece belongs to the opponent
-                            if piece.get_color() != self.get_color():
-                                self._shadows.append((col - 2, row + 2))
-
-            # Check northwest one point diagonally for an intervening piece
-            if (1 <= (col - 1) <= 9) and (6 <= (row - 1) <= 10):
-
-                # If there is no intervening piece
-                if board[(col - 1, row - 1)].get_contains() is None:
-
-                    # Check northwest two points diagonally
-                    if (1 <= (col - 2) <= 9) and (6 <= (row - 2) <= 10):
-
-                        # If the point is empty
-                        if board[(col - 2, row - 2)].get_contains() is None:
-                            self._shadows.append((col - 2, row - 2))
-
-                        # If the point has a piece
-                        else:
-                            piece = board[(col - 2, row - 2)].get_contains()
+            # The elephant's "eye" must be empty
+            if squares[block_index] != 0:
+                continue
 
-                            # If the piece belongs to the opponent
-                            if piece.get_color() != self.get_color():
-                                self._shadows.append((col - 2, row - 2))
+            # If the point is empty or has an opponent piece
+            code = squares[index]
+            if code == 0 or code & _BLACK_CODE != own_code:
+                self._shadows.append(SQUARE_COORDS[index])
 
 
 class Horse(Piece):
     """
     Represent a horse piece. This class is a subclass of Piece.
     """
+    _type_code = 4
+    __slots__ = ()
+
     def __init__(self, color, col, row):
         """
         Take as parameters the horse's color, column position, and row
@@ -1881,165 +2725,35 @@ class Horse(Piece):
 
     def update_shadows(self, board):
         """
-        Take as a parameter the current board and update the horse's list of
-        coordinates that it is shadowing.
+        Take as a parameter the current board (the dictionary of points, the
+        board's flat array of piece codes, or the Board object) and update the
+        horse's list of coordinates that it is shadowing.
         """
+        squares = _get_squares(board)
         self._shadows.clear()
-        col = self._col
-        row = self._row
-
-        # Check for possible points that the horse can move to in the
-        # following order: N-NW, N-NE, E-NE, E-SE, S-SE, S-SW, W-SW, W-NW
-
-        # Check the north orthogonal point
-        if 1 <= (row - 1) <= 10:
-
-            # If the north orthogonal point is empty
-            if board[(col, row - 1)].get_contains() is None:
-
-                # From the north orthogonal point, check the northwest diagonal
-                if (1 <= (col - 1) <= 9) and (1 <= (row - 2) <= 10):
-
-                    # If the north-northwest point is empty
-                    if board[(col - 1, row - 2)].get_contains() is None:
-                        self._shadows.append((col - 1, row - 2))
-
-                    # If the north-northwest point has a piece
-                    else:
-                        piece = board[(col - 1, row - 2)].get_contains()
-
-                        # If the piece belongs to the opponent
-                        if piece.get_color() != self.get_color():
-                            self._shadows.append((col - 1, row - 2))
-
-                # From the north orthogonal point, check the northeast diagonal
-                if (1 <= (col + 1) <= 9) and (1 <= (row - 2) <= 10):
-
-                    # If the north-northeast point is empty
-                    if board[(col + 1, row - 2)].get_contains() is None:
-                        self._shadows.append((col + 1, row - 2))
-
-                    # If the north-northeast point has a piece
-                    else:
-                        piece = board[(col + 1, row - 2)].get_contains()
-
-                        # If the piece belongs to the opponent
-                        if piece.get_color() != self.get_color():
-                            self._shadows.append((col + 1, row - 2))
-
-        # Check the east orthogonal point
-        if 1 <= (col + 1) <= 9:
-
-            # If the east orthogonal point is empty
-            if board[(col + 1, row)].get_contains() is None:
-
-                # From the east orthogonal point, check the northeast diagonal
-                if (1 <= (col + 2) <= 9) and (1 <= (row - 1) <= 10):
-
-                    # If the east-northeast point is empty
-                    if board[(col + 2, row - 1)].get_contains() is None:
-                        self._shadows.append((col + 2, row - 1))
-
-                    # If the east-northeast point has a piece
-                    else:
-                        piece = board[(col + 2, row - 1)].get_contains()
-
-                        # If the piece belongs to the opponent
-                        if piece.get_color() != self.get_color():
-                            self._shadows.append((col + 2, row - 1))
-
-                # From the east orthogonal point, check the southeast diagonal
-                if (1 <= (col + 2) <= 9) and (1 <= (row + 1) <= 10):
-
-                    # If the east-southeast point is empty
-                    if board[(col + 2, row + 1)].get_contains() is None:
-                        self._shadows.append((col + 2, row + 1))
-
-                    # If the east-southeast point has a piece
-                    else:
-                        piece = board[(col + 2, row + 1)].get_contains()
-
-                        # If the piece belongs to the opponent
-                        if piece.get_color() != self.get_color():
-                            self._shadows.append((col + 2, row + 1))
-
-        # Check the south orthogonal point
-        if 1 <= (row + 1) <= 10:
-
-            # If the south orthogonal point is empty
-            if board[(col, row + 1)].get_contains() is None:
-
-                # From the south orthogonal point, check the southeast diagonal
-                if (1 <= (col + 1) <= 9) and (1 <= (row + 2) <= 10):
-
-                    # If the south-southeast point is empty
-                    if board[(col + 1, row + 2)].get_contains() is None:
-                        self._shadows.append((col + 1, row + 2))
-
-                    # If the south-southeast point has a piece
-                    else:
-                        piece = board[(col + 1, row + 2)].get_contains()
-
-                        # If the piece belongs to the opponent
-                        if piece.get_color() != self.get_color():
-                            self._shadows.append((col + 1, row + 2))
-
-                # From the south orthogonal point, check the southwest diagonal
-                if (1 <= (col - 1) <= 9) and (1 <= (row + 2) <= 10):
-
-                    # If the south-southwest point is empty
-                    if board[(col - 1, row + 2)].get_contains() is None:
-                        self._shadows.append((col - 1, row + 2))
-
-                    # If the south-southwest point has a piece
-                    else:
-                        piece = board[(col - 1, row + 2)].get_contains()
-
-                        # If the piece belongs to the opponent
-                        if piece.get_color() != self.get_color():
-                            self._shadows.append((col - 1, row + 2))
-
-        # Check the west orthogonal point
-        if 1 <= (col - 1) <= 9:
-
-            # If the west orthogonal point is empty
-            if board[(col - 1, row)].get_contains() is None:
-
-                # From the west orthogonal point, check the southwest diagonal
-                if (1 <= (col - 2) <= 9) and (1 <= (row + 1) <= 10):
-
-                    # If the west-southwest point is empty
-                    if board[(col - 2, row + 1)].get_contains() is None:
-                        self._shadows.append((col - 2, row + 1))
-
-                    # If the west-southwest point has a piece
-                    else:
-                        piece = board[(col - 2, row + 1)].get_contains()
-
-                        # If the piece belongs to the opponent
-                        if piece.get_color() != self.get_color():
-                            self._shadows.append((col - 2, row + 1))
+        own_code = _COLOR_CODES[self._color]
 
-                # From the west orthogonal point, check the northwest diagonal
-                if (1 <= (col - 2) <= 9) and (1 <= (row - 1) <= 10):
+        # Walk the table of the horse's moves from its point
+        for index, block_index in _LEAPER_MOVES[self.get_code()][
+                self._row * 9 + self._col - 10]:
 
-                    # If the west-northwest point is empty
-                    if board[(col - 2, row - 1)].get_contains() is None:
-                        self._shadows.append((col - 2, row - 1))
-
-                    # If the west-northwest point has a piece
-                    else:
-                        piece = board[(col - 2, row - 1)].get_contains()
+            # The horse's "leg" must be empty
+            if squares[block_index] != 0:
+                continue
 
-                        # If the piece belongs to the opponent
-                        if piece.get_color() != self.get_color():
-                            self._shadows.append((col - 2, row - 1))
+            # If the point is empty or has an opponent piece
+            code = squares[index]
+            if code == 0 or code & _BLACK_CODE != own_code:
+                self._shadows.append(SQUARE_COORDS[index])
 
 
 class Chariot(Piece):
     """
     Represent a chariot piece. This class is a subclass of Piece.
     """
+    _type_code = 5
+    __slots__ = ()
+
     def __init__(self, color, col, row):
         """
         Take as parameters the chariot's color, column position, and row
@@ -2051,108 +2765,60 @@ class Chariot(Piece):
 
     def update_shadows(self, board):
         """
-        Take as a parameter the current board and update the chariot's list of
-        coordinates that it is shadowing.
+        Take as a parameter the current board (the dictionary of points, the
+        board's flat array of piece codes, or the Board object) and update the
+        chariot's list of coordinates that it is shadowing.
         """
+        squares = _get_squares(board)
+        occupancy = _get_occupancy(board)
         self._shadows.clear()
-        col = self._col
-        row = self._row
-
-        # Check for possible points that the chariot can move to:
-
-        # Check the north piece(s)
-        row_offset = 1
-
-        # Check if the next north piece is within the bounds of the board
-        while 1 <= (row - row_offset) <= 10:
-            # If the point is empty
-            if board[(col, row - row_offset)].get_contains() is None:
-                self._shadows.append((col, row - row_offset))
-                row_offset += 1
-                continue
-
-            else:   # If the point has a piece
-                piece = board[(col, row - row_offset)].get_contains()
-
-                # If the piece belongs to the opponent
-                if piece.get_color() != self._color:
-                    self._shadows.append((col, row - row_offset))
-                    break
-
-                else:   # If the piece is the current player's
-                    break
-
-        # Check the south piece(s)
-        row_offset = 1
-
-        # Check if the next south piece is within the bounds of the board
-        while 1 <= (row + row_offset) <= 10:
-            # If the point is empty
-            if board[(col, row + row_offset)].get_contains() is None:
-                self._shadows.append((col, row + row_offset))
-                row_offset += 1
-                continue
-
-            else:   # If the point has a piece
-                piece = board[(col, row + row_offset)].get_contains()
-
-                # If the piece belongs to the opponent
-                if piece.get_color() != self._color:
-                    self._shadows.append((col, row + row_offset))
-                    break
-
-                else:   # If the piece is the current player's
-                    break
-
-        # Check the east piece(s)
-        col_offset = 1
-
-        # Check if the next east piece is within the bounds of the board
-        while 1 <= (col + col_offset) <= 9:
-            # If the point is empty
-            if board[(col + col_offset, row)].get_contains() is None:
-                self._shadows.append((col + col_offset, row))
-                col_offset += 1
-                continue
-
-            else:   # If the point has a piece
-                piece = board[(col + col_offset, row)].get_contains()
-
-                # If the piece belongs to the opponent
-                if piece.get_color() != self._color:
-                    self._shadows.append((col + col_offset, row))
-                    break
-
-                else:   # If the piece is the current player's
-                    break
-
-        # Check the west piece(s)
-        col_offset = 1
-
-        # Check if the next west piece is within the bounds of the board
-        while 1 <= (col - col_offset) <= 9:
-            # If the point is empty
-            if board[(col - col_offset, row)].get_contains() is None:
-                self._shadows.append((col - col_offset, row))
-                col_offset += 1
-                continue
-
-            else:   # If the point has a piece
-                piece = board[(col - col_offset, row)].get_contains()
+        own_code = _COLOR_CODES[self._color]
+
+        # With the "bitboard" backend, look up the rays by the occupancy of
+        # the chariot's row and column: the chariot moves onto the empty
+        # points before the first piece, which it can capture if it is the
+        # opponent's
+        if occupancy is not None:
+            for (empties, blocker, _), coords, indices in _slider_rays(
+                    self._col, self._row, occupancy):
+                self._shadows.extend(coords[empties])
+                if blocker is not None:
+                    index = indices[blocker]
+                    if squares[index] & _BLACK_CODE != own_code:
+                        self._shadows.append(SQUARE_COORDS[index])
+            return
+
+        # Check for possible points that the chariot can move to in the
+        # following order: N, S, E, W
+        for col_step, row_step in ((0, -1), (0, 1), (1, 0), (-1, 0)):
+            new_col = self._col + col_step
+            new_row = self._row + row_step
 
-                # If the piece belongs to the opponent
-                if piece.get_color() != self._color:
-                    self._shadows.append((col - col_offset, row))
-                    break
+            # Check if the next point is within the bounds of the board
+            while (1 <= new_col <= 9) and (1 <= new_row <= 10):
+                index = new_row * 9 + new_col - 10
+                code = squares[index]
 
-                else:   # If the piece is the current player's
-                    break
+                # If the point is empty
+                if code == 0:
+                    self._shadows.append(SQUARE_COORDS[index])
+                    new_col += col_step
+                    new_row += row_step
+                    continue
+
+                # If the point has a piece belonging to the opponent
+                if code & _BLACK_CODE != own_code:
+                    self._shadows.append(SQUARE_COORDS[index])
+                break
 
 
 class Cannon(Piece):
     """
     Represent a cannon piece. This class is a subclass of Piece.
     """
+    _type_code = 6
+    __slots__ = ()
+
     def __init__(self, color, col, row):
         """
         Take as parameters the cannon's color, column position, and row
@@ -2164,177 +2830,65 @@ class Cannon(Piece):
 
     def update_shadows(self, board):
         """
-        Take as a parameter the current board and update the cannon's list of
-        coordinates that it is shadowing.
+        Take as a parameter the current board (the dictionary of points, the
+        board's flat array of piece codes, or the Board object) and update the
+        cannon's list of coordinates that it is shadowing.
         """
+        squares = _get_squares(board)
+        occupancy = _get_occupancy(board)
         self._shadows.clear()
-        col = self._col
-        row = self._row
+        own_code = _COLOR_CODES[self._color]
+
+        # With the "bitboard" backend, look up the rays by the occupancy of
+        # the cannon's row and column: the cannon moves onto the empty points
+        # before the first piece (the "screen"), and can capture the next
+        # piece beyond it if it is the opponent's
+        if occupancy is not None:
+            for (empties, _, target), coords, indices in _slider_rays(
+                    self._col, self._row, occupancy):
+                self._shadows.extend(coords[empties])
+                if target is not None:
+                    index = indices[target]
+                    if squares[index] & _BLACK_CODE != own_code:
+                        self._shadows.append(SQUARE_COORDS[index])
+            return
 
         # Check for possible points that the cannon can move to in the
         # following order: N, S, E, W
-
-        # Check the north piece(s)
-        row_offset = 1
-
-        # Check if the next north piece is within the bounds of the board
-        while 1 <= (row - row_offset) <= 10:
-
-            # If the point is empty
-            if board[(col, row - row_offset)].get_contains() is None:
-                self._shadows.append((col, row - row_offset))
-                row_offset += 1
-                continue
-
-            # If the point has a piece, this piece becomes the "screen" over
-            # which the cannon may jump to capture an opponent piece
-            else:
-                screen = board[(col, row - row_offset)].get_contains()
-                row_offset += 1
-
-                # Check the next piece(s) for an opponent piece
-                while 1 <= (row - row_offset) <= 10:   # Check the bounds
-
-                    # If the point is empty
-                    if board[(col, row - row_offset)].get_contains() is None:
-                        row_offset += 1
-                        continue
-
-                    # If the point has a piece
-                    else:
-                        piece = board[(col, row - row_offset)].get_contains()
-
-                        # If the piece belongs to the opponent
-                        if piece.get_color() != self._color:
-                            self._shadows.append((col, row - row_offset))
-                            break
-
-                        else:   # If the piece belongs to the current player
-                            break
-                break
-
-        # Check the south piece(s)
-        row_offset = 1
-
-        # Check if the next south piece is within the bounds of the board
-        while 1 <= (row + row_offset) <= 10:
-
-            # If the point is empty
-            if board[(col, row + row_offset)].get_contains() is None:
-                self._shadows.append((col, row + row_offset))
-                row_offset += 1
-                continue
-
-            # If the point has a piece, this piece becomes the "screen" over
-            # which the cannon may jump to capture an opponent piece
-            else:
-                screen = board[(col, row + row_offset)].get_contains()
-                row_offset += 1
-
-                # Check the next piece(s) for an opponent piece
-                while 1 <= (row + row_offset) <= 10:   # Check the bounds
-
-                    # If the point is empty
-                    if board[(col, row + row_offset)].get_contains() is None:
-                        row_offset += 1
-                        continue
-
-                    # If the point has a piece
-                    else:
-                        piece = board[(col, row + row_offset)].get_contains()
-
-                        # If the piece belongs to the opponent
-                        if piece.get_color() != self._color:
-                            self._shadows.append((col, row + row_offset))
-                            break
-
-                        else:   # If the piece belongs to the current player
-                            break
-                break
-
-        # Check the east piece(s)
-        col_offset = 1
-
-        # Check if the next east piece is within the bounds of the board
-        while 1 <= (col + col_offset) <= 9:
-
-            # If the point is empty
-            if board[(col + col_offset, row)].get_contains() is None:
-                self._shadows.append((col + col_offset, row))
-                col_offset += 1
-                continue
-
-            # If the point has a piece, this piece becomes the "screen" over
-            # which the cannon may jump to capture an opponent piece
-            else:
-                screen = board[(col + col_offset, row)].get_contains()
-                col_offset += 1
-
-                # Check the next piece(s) for an opponent piece
-                while 1 <= (col + col_offset) <= 9:   # Check the bounds
-
-                    # If the point is empty
-                    if board[(col + col_offset, row)].get_contains() is None:
-                        col_offset += 1
-                        continue
-
-                    # If the point has a piece
+        for col_step, row_step in ((0, -1), (0, 1), (1, 0), (-1, 0)):
+            new_col = self._col + col_step
+            new_row = self._row + row_step
+            is_screened = False
+
+            # Check if the next point is within the bounds of the board
+            while (1 <= new_col <= 9) and (1 <= new_row <= 10):
+                index = new_row * 9 + new_col - 10
+                code = squares[index]
+
+                # Before the "screen", the cannon moves onto empty points. The
+                # first piece becomes the screen over which the cannon may
+                # jump to capture the next piece, if it is the opponent's.
+                if not is_screened:
+                    if code == 0:
+                        self._shadows.append(SQUARE_COORDS[index])
                     else:
-                        piece = board[(col + col_offset, row)].get_contains()
-
-                        # If the piece belongs to the opponent
-                        if piece.get_color() != self._color:
-                            self._shadows.append((col + col_offset, row))
-                            break
-
-                        else:   # If the piece belongs to the current player
-                            break
-                break
-
-        # Check the west piece(s)
-        col_offset = 1
-
-        # Check if the next west piece is within the bounds of the board
-        while 1 <= (col - col_offset) <= 9:
-
-            # If the point is empty
-            if board[(col - col_offset, row)].get_contains() is None:
-                self._shadows.append((col - col_offset, row))
-                col_offset += 1
-                continue
-
-            # If the point has a piece, this piece becomes the "screen" over
-            # which the cannon may jump to capture an opponent piece
-            else:
-                screen = board[(col - col_offset, row)].get_contains()
-                col_offset += 1
-
-                # Check the next piece(s) for an opponent piece
-                while 1 <= (col - col_offset) <= 9:   # Check the bounds
-
-                    # If the point is empty
-                    if board[(col - col_offset, row)].get_contains() is None:
-                        col_offset += 1
-                        continue
-
-                    # If the point has a piece
-                    else:
-                        piece = board[(col - col_offset, row)].get_contains()
-
-                        # If the piece belongs to the opponent
-                        if piece.get_color() != self._color:
-                            self._shadows.append((col - col_offset, row))
-                            break
+                        is_screened = True
+                elif code != 0:
+                    if code & _BLACK_CODE != own_code:
+                        self._shadows.append(SQUARE_COORDS[index])
+                    break
 
-                        else:   # If the piece belongs to the current player
-                            break
-                break
+                new_col += col_step
+                new_row += row_step
 
 
 class Soldier(Piece):
     """
     Represent a soldier piece. This class is a subclass of Piece.
     """
+    _type_code = 7
+    __slots__ = ("_river_crossed",)
+
     def __init__(self, color, col, row):
         """
         Take as parameters the soldier's color, column position, and row
@@ -2349,117 +2903,103 @@ class Soldier(Piece):
 
     def update_shadows(self, board):
         """
-        Take as a parameter the current board and update the soldier's list of
-        coordinates that it is shadowing.
+        Take as a parameter the current board (the dictionary of points, the
+        board's flat array of piece codes, or the Board object) and update the
+        soldier's list of coordinates that it is shadowing.
         """
+        squares = _get_squares(board)
         self._shadows.clear()
-        col = self._col
-        row = self._row
+        own_code = _COLOR_CODES[self._color]
 
         # Check whether the soldier has crossed the river
-        if self._color == "red":     # If the soldier is red
-            if self._row >= 6:
-                self._river_crossed = True
-            else:
-                self._river_crossed = False
-
-        if self._color == "black":   # If the soldier is black
-            if self._row <= 5:
-                self._river_crossed = True
-            else:
-                self._river_crossed = False
-
-        # Check possible points that a red soldier might be able to move to
         if self._color == "red":
+            self._river_crossed = self._row >= 6
+        else:
+            self._river_crossed = self._row <= 5
 
-            # If the soldier has crossed the river, it can move and capture
-            # by advancing one point and by one point horizontally
-            if self._river_crossed:
-
-                # Check the east orthogonal point
-                if 1 <= (col + 1) <= 9:
-                    if board[(col + 1, row)].get_contains() is None:
-                        self._shadows.append((col + 1, row))
-
-                    # If there is a piece on the point, check its color
-                    else:
-                        piece = board[(col + 1, row)].get_contains()
-
-                        # If the piece is the opponent's
-                        if piece.get_color() != self._color:
-                            self._shadows.append((col + 1, row))
-
-                # Check the west orthogonal point
-                if 1 <= (col - 1) <= 9:
-                    if board[(col - 1, row)].get_contains() is None:
-                        self._shadows.append((col - 1, row))
-
-                    # If there is a piece on the point, check its color
-                    else:
-                        piece = board[(col - 1, row)].get_contains()
-
-                        # If the piece is the opponent's
-                        if piece.get_color() != self._color:
-                            self._shadows.append((col - 1, row))
-
-            # Check the south orthogonal point
-            if 1 <= (row + 1) <= 10:
-                if board[(col, row + 1)].get_contains() is None:
-                    self._shadows.append((col, row + 1))
-
-                # If there is a piece on the point, check its color
-                else:
-                    piece = board[(col, row + 1)].get_contains()
-
-                    # If the piece is the opponent's
-                    if piece.get_color() != self._color:
-                        self._shadows.append((col, row + 1))
-
-        # Check possible points that a black soldier might be able to move to
-        if self._color == "black":
-
-            # If the soldier has crossed the river, it can move and capture
-            # by advancing one point and by one point horizontally
-            if self._river_crossed:
+        # Walk the table of the soldier's moves from its point: the east and
+        # west points (once across the river), and then the point ahead
+        for index, _ in _LEAPER_MOVES[self.get_code()][
+                self._row * 9 + self._col - 10]:
 
-                # Check the east orthogonal point
-                if 1 <= (col + 1) <= 9:
-                    if board[(col + 1, row)].get_contains() is None:
-                        self._shadows.append((col + 1, row))
+            # If the point is empty or has an opponent piece
+            code = squares[index]
+            if code == 0 or code & _BLACK_CODE != own_code:
+                self._shadows.append(SQUARE_COORDS[index])
 
-                    # If there is a piece on the point, check its color
-                    else:
-                        piece = board[(col + 1, row)].get_contains()
 
-                        # If the piece is the opponent's
-                        if piece.get_color() != self._color:
-                            self._shadows.append((col + 1, row))
+def _get_squares(board):
+    """
+    Take as a parameter a dictionary of points, a flat array of piece codes,
+    or a Board object, and return the flat array of piece codes. The array
+    kept by the Board object (or the one that the points belong to) is used
+    if there is one; otherwise, one is made from the points.
+    """
+    if isinstance(board, bytearray):
+        return board
+    if isinstance(board, Board):
+        return board.get_squares()
 
-                # Check the west orthogonal point
-                if 1 <= (col - 1) <= 9:
-                    if board[(col - 1, row)].get_contains() is None:
-                        self._shadows.append((col - 1, row))
+    owner = next(iter(board.values())).get_owner()
+    if owner is not None:
+        return owner.get_squares()
 
-                    # If there is a piece on the point, check its color
-                    else:
-                        piece = board[(col - 1, row)].get_contains()
+    squares = bytearray(90)
+    for coord in board:
+        piece = board[coord].get_contains()
+        if piece is not None:
+            squares[coord[1] * 9 + coord[0] - 10] = piece.get_code()
+    return squares
 
-                        # If the piece is the opponent's
-                        if piece.get_color() != self._color:
-                            self._shadows.append((col - 1, row))
 
-            # Check the north orthogonal point
-            if 1 <= (row - 1) <= 10:
-                if board[(col, row - 1)].get_contains() is None:
-                    self._shadows.append((col, row - 1))
+def _get_occupancy(board):
+    """
+    Take as a parameter a dictionary of points, a flat array of piece codes,
+    or a Board object, and return the occupancy of each row and column that
+    the board's "bitboard" slider backend uses, or None if the board is not
+    a Board object or uses the "rays" slider backend.
+    """
+    if isinstance(board, Board):
+        return board.get_occupancy()
+    return None
 
-                # If there is a piece on the point, check its color
-                else:
-                    piece = board[(col, row - 1)].get_contains()
 
-                    # If the piece is the opponent's
-                    if piece.get_color() != self._color:
-                        self._shadows.append((col, row - 1))
+def _to_coord(location):
+    """
+    Take as a parameter a point as a string in algebraic notation, a
+    coordinate tuple, or a square index, and return its coordinates as a
+    tuple, or None if it is not a point on the board (or is not a string, a
+    tuple of two integers, or an integer).
+    """
+    if isinstance(location, str):
+        return LOCATION_COORDS.get(location)
+    if isinstance(location, bool):
+        return None
+    if isinstance(location, int):
+        if 0 <= location < 90:
+            return SQUARE_COORDS[location]
+        return None
+    if (isinstance(location, tuple) and len(location) == 2 and
+            all(isinstance(number, int) and not isinstance(number, bool)
+                for number in location) and
+            location in COORD_SQUARES):
+        return location
+    return None
+
+
+# The moves of the sample game in main (including its invalid moves), which
+# ends with the red general in checkmate
+SAMPLE_GAME = (
+    ('c4', 'c5'), ('e7', 'e6'), ('c5', 'b5'), ('c5', 'd5'), ('c5', 'c6'),
+    ('e6', 'd6'), ('e6', 'f6'), ('e6', 'e5'), ('c6', 'd6'), ('e5', 'e4'),
+    ('d6', 'd7'), ('e4', 'f4'), ('f10', 'e9'), ('b1', 'c3'), ('h8', 'h1'),
+    ('c3', 'd5'), ('h1', 'f1'), ('d5', 'c7'), ('f1', 'd1'), ('d7', 'd8'),
+    ('d1', 'a1'), ('e1', 'f1'), ('e1', 'e2'), ('i10', 'i8'), ('d8', 'e8'),
+    ('i8', 'f8'), ('e8', 'e9'), ('d10', 'e9'), ('i1', 'i2'), ('a10', 'a9'),
+    ('i2', 'f2'), ('a9', 'd9'), ('f2', 'f1'), ('d9', 'd3'), ('f1', 'e1'),
+    ('f8', 'f3'), ('c1', 'a3'), ('a1', 'g1'), ('b3', 'b5'), ('g7', 'g6'),
+    ('h3', 'h5'), ('e4', 'e3')
+)
 
 
 def main():
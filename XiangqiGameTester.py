@@ -3,8 +3,11 @@
 # Description: This test file tests the various classes in XiangqiGame.py.
 
 import unittest
-from XiangqiGame import XiangqiGame, Board, Point, Piece, General, Advisor, \
-    Elephant, Horse, Chariot, Cannon, Soldier
+import io
+from contextlib import redirect_stdout
+from XiangqiGame import XiangqiGame, VerdictCache, Board, Point, Piece, \
+    General, Advisor, Elephant, Horse, Chariot, Cannon, Soldier, \
+    BoardRenderer, MoveResult, GamePool, SAMPLE_GAME
 
 
 class TestXiangqiGame(unittest.TestCase):
@@ -3870,3 +3873,859 @@ class TestXiangqiGame(unittest.TestCase):
         self.assertFalse(game.is_in_check("red"))
         self.assertFalse(game.is_in_check("black"))
         self.assertEqual(game.get_whose_turn(), "red")
+
+    def test_39(self):
+        """
+        Test whether incrementally updated shadows match a full recompute
+        after every move of the sample game in XiangqiGame.py.
+        """
+        moves = [('c4', 'c5'), ('e7', 'e6'), ('c5', 'b5'), ('c5', 'd5'),
+                 ('c5', 'c6'), ('e6', 'd6'), ('e6', 'f6'), ('e6', 'e5'),
+                 ('c6', 'd6'), ('e5', 'e4'), ('d6', 'd7'), ('e4', 'f4'),
+                 ('f10', 'e9'), ('b1', 'c3'), ('h8', 'h1'), ('c3', 'd5'),
+                 ('h1', 'f1'), ('d5', 'c7'), ('f1', 'd1'), ('d7', 'd8'),
+                 ('d1', 'a1'), ('e1', 'f1'), ('e1', 'e2'), ('i10', 'i8'),
+                 ('d8', 'e8'), ('i8', 'f8'), ('e8', 'e9'), ('d10', 'e9'),
+                 ('i1', 'i2'), ('a10', 'a9'), ('i2', 'f2'), ('a9', 'd9'),
+                 ('f2', 'f1'), ('d9', 'd3'), ('f1', 'e1'), ('f8', 'f3'),
+                 ('c1', 'a3'), ('a1', 'g1'), ('b3', 'b5'), ('g7', 'g6'),
+                 ('h3', 'h5'), ('e4', 'e3')]
+
+        # The differential mode raises a RuntimeError on any mismatch
+        game = XiangqiGame("differential")
+        full_game = XiangqiGame("full")
+        for move_from, move_to in moves:
+            self.assertEqual(game.make_move(move_from, move_to),
+                             full_game.make_move(move_from, move_to))
+
+        self.assertEqual(game.get_game_state(), "BLACK_WON")
+        self.assertEqual(full_game.get_game_state(), "BLACK_WON")
+
+    def test_40(self):
+        """
+        Test whether incrementally updated shadows match a full recompute
+        over randomly played games, including captures and moves that are
+        reversed because they leave the player's own general in check.
+        """
+        import random
+
+        rng = random.Random(162)
+        for _ in range(4):
+            game = XiangqiGame("differential")
+            board = game.get_game_board().get_board()
+            for _ in range(60):
+                if game.get_game_state() != "UNFINISHED":
+                    break
+                candidates = []
+                for coord in board:
+                    piece = board[coord].get_contains()
+                    if (piece is not None and
+                            piece.get_color() == game.get_whose_turn()):
+                        for shadow in piece.get_shadows():
+                            candidates.append((coord, shadow))
+                move_from, move_to = rng.choice(candidates)
+                game.make_move("abcdefghi"[move_from[0] - 1] +
+                               str(move_from[1]),
+                               "abcdefghi"[move_to[0] - 1] + str(move_to[1]))
+
+    def test_41(self):
+        """
+        Test whether pop_move exactly reverses push_move, including captures,
+        shadows, the check flags, and whose turn it is.
+        """
+        game = XiangqiGame()
+        board = game.get_game_board().get_board()
+
+        def snapshot():
+            pieces = {}
+            points = {}
+            for coord in board:
+                piece = board[coord].get_contains()
+                if piece is not None:
+                    pieces[coord] = (piece, piece.get_shadows()[:])
+                points[coord] = board[coord].get_shadowed_by()[:]
+            return (pieces, points, game.is_in_check("red"),
+                    game.is_in_check("black"), game.get_whose_turn())
+
+        self.assertTrue(game.make_move('b3', 'b10'))   # Cannon captures horse
+        before = snapshot()
+
+        game.push_move((2, 10), (3, 10))   # Cannon captures elephant
+        self.assertEqual(game.get_whose_turn(), "red")
+        self.assertEqual(board[(3, 10)].get_contains().get_type_id(), 'N')
+        self.assertIsNone(board[(2, 10)].get_contains())
+        self.assertEqual(len(game.get_move_stack()), 2)
+
+        self.assertEqual(game.pop_move(), ((2, 10), (3, 10)))
+        self.assertEqual(snapshot(), before)
+        self.assertEqual(len(game.get_move_stack()), 1)
+
+        game.pop_move()
+        self.assertEqual(board[(2, 3)].get_contains().get_type_id(), 'N')
+        self.assertEqual(board[(2, 10)].get_contains().get_type_id(), 'H')
+        self.assertEqual(game.get_whose_turn(), "red")
+
+    def test_42(self):
+        """
+        Test has_any_legal_move at the start of a game, while in check, and
+        once the red general has been checkmated.
+        """
+        game = XiangqiGame()
+        self.assertTrue(game.has_any_legal_move("red"))
+        self.assertTrue(game.has_any_legal_move("black"))
+
+        # Black's chariot checks the red general, which can still escape
+        for move_from, move_to in [('c4', 'c5'), ('i10', 'i9'),
+                                   ('c5', 'c6'), ('i9', 'f9'),
+                                   ('a4', 'a5'), ('f9', 'f1')]:
+            self.assertTrue(game.make_move(move_from, move_to))
+        self.assertTrue(game.is_in_check("red"))
+        self.assertTrue(game.has_any_legal_move("red"))
+        self.assertFalse(game.is_in_checkmate("red"))
+        self.assertEqual(game.get_game_state(), "UNFINISHED")
+
+        moves = [('c4', 'c5'), ('e7', 'e6'), ('c5', 'c6'), ('e6', 'e5'),
+                 ('c6', 'd6'), ('e5', 'e4'), ('d6', 'd7'), ('f10', 'e9'),
+                 ('b1', 'c3'), ('h8', 'h1'), ('c3', 'd5'), ('h1', 'f1'),
+                 ('d5', 'c7'), ('f1', 'd1'), ('d7', 'd8'), ('d1', 'a1'),
+                 ('e1', 'e2'), ('i10', 'i8'), ('d8', 'e8'), ('i8', 'f8'),
+                 ('e8', 'e9'), ('d10', 'e9'), ('i1', 'i2'), ('a10', 'a9'),
+                 ('i2', 'f2'), ('a9', 'd9'), ('f2', 'f1'), ('d9', 'd3'),
+                 ('f1', 'e1'), ('f8', 'f3'), ('c1', 'a3'), ('a1', 'g1'),
+                 ('b3', 'b5'), ('g7', 'g6'), ('h3', 'h5'), ('e4', 'e3')]
+        game = XiangqiGame()
+        for move_from, move_to in moves:
+            self.assertTrue(game.make_move(move_from, move_to))
+        self.assertFalse(game.has_any_legal_move("red"))
+        self.assertTrue(game.is_in_checkmate("red"))
+        self.assertEqual(game.get_game_state(), "BLACK_WON")
+
+    def test_43(self):
+        """
+        Test whether the board's index of the generals' coordinates follows
+        the generals as they move, and as their moves are reversed.
+        """
+        game = XiangqiGame()
+        board = game.get_game_board()
+        self.assertEqual(board.get_general_coord("red"), (5, 1))
+        self.assertEqual(board.get_general_coord("black"), (5, 10))
+
+        self.assertTrue(game.make_move('e1', 'e2'))
+        self.assertTrue(game.make_move('e10', 'e9'))
+        self.assertEqual(board.get_general_coord("red"), (5, 2))
+        self.assertEqual(board.get_general_coord("black"), (5, 9))
+
+        self.assertTrue(game.make_move('e2', 'd2'))
+        self.assertEqual(board.get_general_coord("red"), (4, 2))
+
+        game.pop_move()
+        self.assertEqual(board.get_general_coord("red"), (5, 2))
+        game.pop_move()
+        game.pop_move()
+        self.assertEqual(board.get_general_coord("red"), (5, 1))
+        self.assertEqual(board.get_general_coord("black"), (5, 10))
+
+    def test_44(self):
+        """
+        Test whether the board's flat array of piece codes follows the moves,
+        and whether the shadows set aside by a move are recomputed when
+        needed and put back when the move is reversed.
+        """
+        game = XiangqiGame()
+        board = game.get_game_board()
+        squares = board.get_squares()
+        self.assertEqual(squares[0], 5)         # Red chariot on a1
+        self.assertEqual(squares[4], 1)         # Red general on e1
+        self.assertEqual(squares[85], 9)        # Black general on e10
+        self.assertEqual(squares[19], 6)        # Red cannon on b3
+        self.assertEqual(squares[40], 0)        # Empty e5
+
+        horse = board.get_board()[(2, 1)].get_contains()
+        shadows = horse.get_shadows()
+        self.assertEqual(shadows, [(3, 3), (1, 3)])
+
+        # The cannon moving to c3 blocks the horse's leg
+        game.push_move((2, 3), (3, 3))
+        self.assertEqual(squares[19], 0)
+        self.assertEqual(squares[20], 6)
+        self.assertEqual(horse.get_shadows(), [(1, 3)])
+
+        game.pop_move()
+        self.assertIs(horse.get_shadows(), shadows)
+        self.assertEqual(horse.get_shadows(), [(3, 3), (1, 3)])
+        self.assertEqual(squares[19], 6)
+
+    def test_45(self):
+        """
+        Test whether points and pieces are slotted (i.e. have no per-instance
+        dictionary) while keeping their getters and setters, and whether a
+        move can still be reversed after make_move has discarded the shadows
+        it set aside.
+        """
+        game = XiangqiGame()
+        board = game.get_game_board().get_board()
+        self.assertFalse(hasattr(board[(1, 1)], "__dict__"))
+        for coord in board:
+            piece = board[coord].get_contains()
+            if piece is not None:
+                self.assertFalse(hasattr(piece, "__dict__"))
+        with self.assertRaises(AttributeError):
+            board[(1, 1)].get_contains().extra = 1
+
+        soldier = board[(1, 4)].get_contains()
+        soldier.set_row(5)
+        self.assertEqual(soldier.get_row(), 5)
+        soldier.set_row(4)
+
+        reference = XiangqiGame("full")
+        self.assertTrue(game.make_move('b3', 'b10'))
+        game.pop_move()
+        for coord in board:
+            piece = board[coord].get_contains()
+            if piece is not None:
+                self.assertEqual(
+                    piece.get_shadows(),
+                    reference.get_game_board().get_board()[coord]
+                    .get_contains().get_shadows())
+
+    def test_46(self):
+        """
+        Test whether the pieces' precomputed move tables respect the palace
+        and the river, and whether the horse's and elephant's moves name the
+        point that must be empty.
+        """
+        from XiangqiGame import _LEAPER_MOVES, SQUARE_COORDS
+
+        # Red advisor (code 2) and black advisor (code 10) stay in the palace
+        for code, rows in ((2, (1, 2, 3)), (10, (8, 9, 10))):
+            for moves in _LEAPER_MOVES[code]:
+                for index, block_index in moves:
+                    col, row = SQUARE_COORDS[index]
+                    self.assertIn(col, (4, 5, 6))
+                    self.assertIn(row, rows)
+                    self.assertIsNone(block_index)
+
+        # Red elephants (code 3) stay on their side of the river
+        for moves in _LEAPER_MOVES[3]:
+            for index, block_index in moves:
+                self.assertLessEqual(SQUARE_COORDS[index][1], 5)
+                self.assertLessEqual(SQUARE_COORDS[block_index][1], 5)
+
+        # The red horse on b1 can reach d2 past its leg on c1, and then c3 and
+        # a3 past its leg on b2
+        self.assertEqual(_LEAPER_MOVES[4][1],
+                         ((12, 2), (20, 10), (18, 10)))
+
+        # A black soldier (code 15) on e5 has crossed the river
+        self.assertEqual(_LEAPER_MOVES[15][40],
+                         ((41, None), (39, None), (31, None)))
+
+    def test_47(self):
+        """
+        Test whether the "bitboard" slider backend gives the same shadows as
+        the "rays" backend over randomly played games.
+        """
+        import random
+
+        rng = random.Random(408)
+        for _ in range(3):
+            game = XiangqiGame(slider_backend="bitboard")
+            reference = XiangqiGame(slider_backend="rays")
+            board = game.get_game_board().get_board()
+            reference_board = reference.get_game_board().get_board()
+            for _ in range(60):
+                if game.get_game_state() != "UNFINISHED":
+                    break
+                candidates = []
+                for coord in board:
+                    piece = board[coord].get_contains()
+                    if piece is None:
+                        continue
+                    self.assertEqual(
+                        piece.get_shadows(),
+                        reference_board[coord].get_contains().get_shadows())
+                    if piece.get_color() == game.get_whose_turn():
+                        for shadow in piece.get_shadows():
+                            candidates.append((coord, shadow))
+                move_from, move_to = rng.choice(candidates)
+                move_from = ("abcdefghi"[move_from[0] - 1] +
+                             str(move_from[1]))
+                move_to = "abcdefghi"[move_to[0] - 1] + str(move_to[1])
+                self.assertEqual(game.make_move(move_from, move_to),
+                                 reference.make_move(move_from, move_to))
+
+    def test_48(self):
+        """
+        Test whether the position hash follows moves and their reversal,
+        depends on whose turn it is, and is the same for a position reached
+        by different move orders.
+        """
+        from XiangqiGame import _ZOBRIST_KEYS, _ZOBRIST_BLACK_TO_MOVE
+
+        game = XiangqiGame()
+        initial_hash = game.get_position_hash()
+        self.assertEqual(initial_hash, XiangqiGame().get_position_hash())
+
+        # The hash matches one computed from scratch
+        squares = game.get_game_board().get_squares()
+        expected = 0
+        for index in range(90):
+            expected ^= _ZOBRIST_KEYS[squares[index]][index]
+        self.assertEqual(initial_hash, expected)
+
+        self.assertTrue(game.make_move('b1', 'c3'))
+        black_to_move_hash = game.get_position_hash()
+        self.assertNotEqual(black_to_move_hash, initial_hash)
+
+        # Only whose turn it is differs
+        game.set_whose_turn("red")
+        self.assertEqual(game.get_position_hash(),
+                         black_to_move_hash ^ _ZOBRIST_BLACK_TO_MOVE)
+        game.set_whose_turn("black")
+        game.pop_move()
+        self.assertEqual(game.get_position_hash(), initial_hash)
+
+        # Transposed move orders reach the same hash
+        first = XiangqiGame()
+        for move_from, move_to in (('b1', 'c3'), ('b10', 'c8'),
+                                   ('h1', 'g3'), ('h10', 'g8')):
+            self.assertTrue(first.make_move(move_from, move_to))
+        second = XiangqiGame()
+        for move_from, move_to in (('h1', 'g3'), ('h10', 'g8'),
+                                   ('b1', 'c3'), ('b10', 'c8')):
+            self.assertTrue(second.make_move(move_from, move_to))
+        self.assertEqual(first.get_position_hash(),
+                         second.get_position_hash())
+
+        # A capture changes the hash, and reversing it restores the hash
+        self.assertTrue(game.make_move('b3', 'b10'))
+        self.assertNotEqual(game.get_position_hash(), initial_hash)
+        game.pop_move()
+        self.assertEqual(game.get_position_hash(), initial_hash)
+
+    def test_49(self):
+        """
+        Test whether a verdict cache shared between games gives the same
+        outcome as no cache, is hit when positions repeat, and stays within
+        its maximum number of positions.
+        """
+        moves = (('h3', 'e3'), ('h10', 'g8'), ('e3', 'e7'), ('g8', 'e7'),
+                 ('b3', 'e3'), ('a10', 'a9'))
+        cache = VerdictCache()
+        first = XiangqiGame(verdict_cache=cache)
+        for move_from, move_to in moves:
+            self.assertTrue(first.make_move(move_from, move_to))
+        self.assertEqual(cache.get_hits(), 0)
+        self.assertEqual(cache.get_misses(), len(moves))
+        self.assertEqual(cache.get_size(), len(moves))
+
+        second = XiangqiGame(verdict_cache=cache)
+        for move_from, move_to in moves:
+            self.assertTrue(second.make_move(move_from, move_to))
+        self.assertEqual(cache.get_hits(), len(moves))
+        self.assertEqual(first.get_game_state(), second.get_game_state())
+
+        # The cached verdicts agree with the game
+        position_hash = second.get_game_board().get_position_hash()
+        self.assertTrue(cache.get_verdict(position_hash, "red",
+                                          "has_legal_move"))
+        self.assertIsNone(cache.get_verdict(position_hash, "red",
+                                            "legal_moves"))
+        self.assertTrue(second.has_any_legal_move("red"))
+
+        # The least recently used positions are dropped
+        cache.set_max_entries(2)
+        self.assertEqual(cache.get_size(), 2)
+        self.assertIsNotNone(cache.get_verdict(position_hash, "red",
+                                               "has_legal_move"))
+        cache.clear()
+        self.assertEqual(cache.get_size(), 0)
+        self.assertEqual(cache.get_hits(), 0)
+        with self.assertRaises(ValueError):
+            cache.set_verdict(position_hash, "red", "checkmate", False)
+        with self.assertRaises(ValueError):
+            cache.get_verdict(position_hash, "red", "in_check")
+
+    def test_50(self):
+        """
+        Test whether legal_moves generates exactly the moves that make_move
+        accepts, lazily or all at once, and nothing once the game is over.
+        """
+        game = XiangqiGame()
+        self.assertEqual(len(game.get_legal_moves()), 44)
+        self.assertEqual(next(game.legal_moves()), ((1, 1), (1, 2)))
+
+        # With the black general in check, compare against make_move for
+        # every pair of points
+        for move_from, move_to in (('h3', 'e3'), ('b8', 'e8'), ('e3', 'e7')):
+            self.assertTrue(game.make_move(move_from, move_to))
+        self.assertTrue(game.is_in_check("black"))
+
+        accepted = []
+        for source_coord in sorted(game.get_game_board().get_board(),
+                                   key=lambda coord: (coord[1], coord[0])):
+            for dest_coord in game.get_game_board().get_board():
+                if game.make_move(
+                        "abcdefghi"[source_coord[0] - 1] +
+                        str(source_coord[1]),
+                        "abcdefghi"[dest_coord[0] - 1] + str(dest_coord[1])):
+                    accepted.append((source_coord, dest_coord))
+                    game.pop_move()
+        self.assertEqual(sorted(game.get_legal_moves()), sorted(accepted))
+        self.assertEqual(list(game.legal_moves("black")),
+                         game.get_legal_moves())
+
+        # Red's moves can be listed on black's turn, and are cached
+        cache = VerdictCache()
+        game.set_verdict_cache(cache)
+        red_moves = game.get_legal_moves("red")
+        self.assertEqual(game.get_legal_moves("red"), red_moves)
+        self.assertEqual(cache.get_hits(), 1)
+        self.assertTrue(game.has_any_legal_move("red"))
+        self.assertEqual(cache.get_hits(), 2)
+
+        game.set_game_state("RED_WON")
+        self.assertEqual(game.get_legal_moves(), [])
+
+    def test_51(self):
+        """
+        Test whether the material and positional scores follow moves and
+        their reversal, and always match scores computed from scratch.
+        """
+        from XiangqiGame import _MATERIAL_SCORES, _PIECE_SQUARE_SCORES
+
+        def scores_from_scratch(board):
+            squares = board.get_squares()
+            return (sum(_MATERIAL_SCORES[code] for code in squares),
+                    sum(_PIECE_SQUARE_SCORES[squares[index]][index]
+                        for index in range(90)))
+
+        game = XiangqiGame()
+        board = game.get_game_board()
+        self.assertEqual(board.get_material_score(), 0)
+        self.assertEqual(board.get_positional_score(), 0)
+        self.assertEqual(game.evaluate(), 0)
+
+        # A cannon taking a horse gains the horse's value for red
+        self.assertTrue(game.make_move('b3', 'b10'))
+        self.assertEqual(board.get_material_score(), 400)
+        self.assertEqual(game.evaluate(), -400 - board.get_positional_score())
+        game.pop_move()
+        self.assertEqual(board.get_material_score(), 0)
+        self.assertEqual(board.get_positional_score(), 0)
+
+        # Play the first legal move of each position for a while
+        for _ in range(30):
+            move = next(game.legal_moves(), None)
+            if move is None:
+                break
+            game.push_move(move[0], move[1])
+            self.assertEqual((board.get_material_score(),
+                              board.get_positional_score()),
+                             scores_from_scratch(board))
+        while game.get_move_stack():
+            game.pop_move()
+        self.assertEqual(game.evaluate(), 0)
+
+    def test_52(self):
+        """
+        Test whether replay agrees with make_move, stops at the first illegal
+        move, and only finds that the game has been won after the last move.
+        """
+        # The valid moves of the sample game in XiangqiGame.py's main
+        # function, the last of which checkmates the red general
+        moves = [tuple(move.split("-")) for move in (
+            "c4-c5 e7-e6 c5-c6 e6-e5 c6-d6 e5-e4 d6-d7 f10-e9 b1-c3 h8-h1 "
+            "c3-d5 h1-f1 d5-c7 f1-d1 d7-d8 d1-a1 e1-e2 i10-i8 d8-e8 i8-f8 "
+            "e8-e9 d10-e9 i1-i2 a10-a9 i2-f2 a9-d9 f2-f1 d9-d3 f1-e1 f8-f3 "
+            "c1-a3 a1-g1 b3-b5 g7-g6 h3-h5 e4-e3").split()]
+
+        reference = XiangqiGame()
+        for move_from, move_to in moves:
+            self.assertTrue(reference.make_move(move_from, move_to))
+
+        game = XiangqiGame()
+        self.assertEqual(game.replay(moves), (None, "BLACK_WON"))
+        self.assertEqual(game.get_position_hash(),
+                         reference.get_position_hash())
+        self.assertEqual(len(game.get_move_stack()), len(moves))
+
+        # The same moves as coordinates, without validation
+        coord_moves = [(XiangqiGame.quantify_location(move_from),
+                        XiangqiGame.quantify_location(move_to))
+                       for move_from, move_to in moves]
+        game = XiangqiGame()
+        self.assertEqual(game.replay(iter(coord_moves), validate=False),
+                         (None, "BLACK_WON"))
+        self.assertEqual(game.get_position_hash(),
+                         reference.get_position_hash())
+
+        # A move after the checkmate is illegal
+        game = XiangqiGame()
+        self.assertEqual(game.replay(moves + [('e2', 'f2')]),
+                         (len(moves), "BLACK_WON"))
+
+        # An illegal move (red moving twice in a row) stops the replay
+        # before it, and the game goes on from there
+        game = XiangqiGame()
+        self.assertEqual(game.replay(moves[:16] + [('e1', 'e2'),
+                                                   ('e2', 'e3')]),
+                         (17, "UNFINISHED"))
+        self.assertEqual(len(game.get_move_stack()), 17)
+        self.assertEqual(game.get_whose_turn(), "black")
+        self.assertTrue(game.make_move('i10', 'i8'))
+
+        # A move by the wrong player, or of a piece that is not there
+        self.assertEqual(XiangqiGame().replay([('e7', 'e6')]),
+                         (0, "UNFINISHED"))
+        self.assertEqual(XiangqiGame().replay([('e5', 'e6')]),
+                         (0, "UNFINISHED"))
+
+        # A point off the board, or an empty point without validation
+        for validate in (True, False):
+            for bad_move in (((5, 0), (5, 1)), ((3, 4), (3, 11)),
+                             ((5, 5), (5, 6))):
+                game = XiangqiGame()
+                self.assertEqual(game.replay([((3, 4), (3, 5)), bad_move],
+                                             validate),
+                                 (1, "UNFINISHED"))
+                self.assertEqual(len(game.get_move_stack()), 1)
+
+    def test_53(self):
+        """
+        Test whether positions are written and read back in FEN, whether a
+        position read from FEN plays like the same position reached by moves,
+        and whether bad FEN is rejected.
+        """
+        from XiangqiGame import STARTING_FEN
+
+        game = XiangqiGame()
+        self.assertEqual(game.to_fen(), STARTING_FEN)
+        self.assertTrue(game.make_move('h3', 'e3'))
+        self.assertEqual(game.to_fen(),
+                         "rnbakabnr/9/1c5c1/p1p1p1p1p/9/9/P1P1P1P1P/1C2C4/9/"
+                         "RNBAKABNR b - - 0 1")
+        self.assertTrue(game.make_move('h10', 'g8'))
+
+        loaded = XiangqiGame.from_fen(game.to_fen())
+        self.assertEqual(loaded.to_fen(), game.to_fen())
+        self.assertEqual(loaded.get_position_hash(),
+                         game.get_position_hash())
+        self.assertEqual(loaded.get_whose_turn(), "red")
+        self.assertEqual(sorted(loaded.get_legal_moves()),
+                         sorted(game.get_legal_moves()))
+        self.assertTrue(loaded.make_move('e3', 'e7'))
+        self.assertTrue(game.make_move('e3', 'e7'))
+        self.assertEqual(loaded.to_fen(), game.to_fen())
+
+        # The final position of the sample game, with red checkmated
+        checkmate = XiangqiGame.from_fen(
+            "1nb1k1bn1/4a4/1c7/p1N5p/6p2/1C5C1/P5P1P/B2rpr3/4K4/4R1c2 w - - "
+            "0 19", slider_backend="bitboard")
+        self.assertEqual(checkmate.get_game_state(), "BLACK_WON")
+        self.assertTrue(checkmate.is_in_check("red"))
+        self.assertFalse(checkmate.make_move('e2', 'e1'))
+
+        # Black to move, with the alternative letters for elephant and horse
+        black_to_move = XiangqiGame.from_fen(
+            "4k4/9/9/9/9/9/9/4E4/4H4/3K5 b")
+        self.assertEqual(black_to_move.get_whose_turn(), "black")
+        self.assertEqual(black_to_move.to_fen(),
+                         "4k4/9/9/9/9/9/9/4B4/4N4/3K5 b - - 0 1")
+
+        for bad_fen in ("", "rnbakabnr/9 w", "rnbakabnr/9/1c5c1/p1p1p1p1p/"
+                        "9/9/P1P1P1P1P/1C5C1/9/RNBAKABN w",
+                        "rnbakabnr/9/1c5c1/p1p1p1p1p/9/9/P1P1P1P1P/1C5C1/9/"
+                        "RNBAXABNR w", "4k4/9/9/9/9/9/9/9/9/9 w",
+                        STARTING_FEN.replace(" w ", " x ")):
+            with self.assertRaises(ValueError):
+                XiangqiGame.from_fen(bad_fen)
+
+    def test_54(self):
+        """
+        Test whether the coordinate tables convert between locations,
+        coordinates, and square indices, and whether moves made by square
+        index are the same as moves made by location.
+        """
+        from XiangqiGame import SQUARE_COORDS, SQUARE_LOCATIONS
+
+        for square in range(90):
+            location = XiangqiGame.square_to_location(square)
+            coord = XiangqiGame.square_to_coord(square)
+            self.assertEqual(XiangqiGame.location_to_square(location), square)
+            self.assertEqual(XiangqiGame.coord_to_square(coord), square)
+            self.assertEqual(XiangqiGame.quantify_location(location), coord)
+        self.assertEqual(SQUARE_LOCATIONS[:2], ("a1", "b1"))
+        self.assertEqual(SQUARE_COORDS[89], (9, 10))
+        self.assertEqual(XiangqiGame.quantify_location('a10'), (1, 10))
+        self.assertEqual(XiangqiGame.location_to_square('c4'), 29)
+        for bad_location in ('j1', 'a11', 'a0', 'c', ''):
+            self.assertIsNone(XiangqiGame.quantify_location(bad_location))
+            self.assertIsNone(XiangqiGame.location_to_square(bad_location))
+        self.assertIsNone(XiangqiGame.coord_to_square((0, 1)))
+
+        game = XiangqiGame()
+        reference = XiangqiGame()
+        for move_from, move_to in (('c4', 'c5'), ('e7', 'e6'), ('c5', 'b5'),
+                                   ('c5', 'c6'), ('e6', 'e5')):
+            self.assertEqual(
+                game.make_move_square(
+                    XiangqiGame.location_to_square(move_from),
+                    XiangqiGame.location_to_square(move_to)),
+                reference.make_move(move_from, move_to))
+        self.assertEqual(game.get_position_hash(),
+                         reference.get_position_hash())
+
+        # Points that are not on the board are rejected
+        self.assertFalse(game.make_move_square(-1, 20))
+        self.assertFalse(game.make_move_square(29, 90))
+        self.assertFalse(game.make_move('z1', 'a1'))
+        self.assertEqual(game.replay([('a11', 'a10')]), (0, "UNFINISHED"))
+
+    def test_55(self):
+        """
+        Test whether BoardRenderer builds the same frame that print_board
+        writes, whether plain frames have no escape codes, and whether only
+        the changed points are rendered after a move.
+        """
+        game = XiangqiGame()
+        board = game.get_game_board()
+        output = io.StringIO()
+        with redirect_stdout(output):
+            game.print_board()
+        renderer = BoardRenderer()
+        self.assertEqual(renderer.render(board), output.getvalue())
+        self.assertEqual(output.getvalue().count("\n"), 15)
+
+        plain = BoardRenderer("plain")
+        frame = plain.render(board)
+        self.assertNotIn("\033", frame)
+        lines = frame.split("\n")
+        self.assertEqual(lines[2], " 1 [C][H][E][A][G][A][E][H][C] 1 ")
+        self.assertEqual(lines[12], "10 [c][h][e][a][g][a][e][h][c] 10")
+        self.assertRaises(ValueError, BoardRenderer, "sepia")
+
+        # Without a last frame, the whole frame is rendered
+        changes = BoardRenderer("plain", origin_row=3)
+        self.assertEqual(changes.render_changes(board), frame)
+        self.assertEqual(changes.render_changes(board), "")
+        self.assertTrue(game.make_move('b3', 'e3'))
+        self.assertEqual(changes.render_changes(board),
+                         "\033[7;7H[ ]\033[7;16H[N]\033[18;1H")
+        self.assertTrue(game.make_move('h8', 'h6'))
+        self.assertEqual(changes.render_changes(board),
+                         "\033[11;25H[n]\033[13;25H[ ]\033[18;1H")
+        self.assertEqual(changes.get_last_squares(),
+                         bytes(board.get_squares()))
+
+        output = io.StringIO()
+        self.assertEqual(renderer.write(board, output, changes_only=True),
+                         len(output.getvalue()))
+        # Four changed points, each after a cursor movement, and one more
+        # cursor movement to below the frame
+        self.assertEqual(output.getvalue().count("H\033[0;29;48m["), 4)
+        self.assertTrue(output.getvalue().endswith("\033[16;1H"))
+        renderer.forget_frame()
+        self.assertIsNone(renderer.get_last_squares())
+
+    def test_56(self):
+        """
+        Test whether make_move_ex makes the same moves as make_move, and
+        whether its results give the piece captured, the check flags, the
+        game state, and the reason a move was rejected.
+        """
+        game = XiangqiGame()
+        reference = XiangqiGame()
+        results = []
+        for move_from, move_to in SAMPLE_GAME:
+            result = game.make_move_ex(move_from, move_to)
+            self.assertEqual(bool(result),
+                             reference.make_move(move_from, move_to))
+            self.assertEqual(result.get_made(), bool(result))
+            self.assertEqual(result.is_in_check("red"),
+                             game.is_in_check("red"))
+            self.assertEqual(result.is_in_check("black"),
+                             bool(game.is_in_check("black")))
+            self.assertEqual(result.get_game_state(), game.get_game_state())
+            results.append(result)
+        self.assertEqual(game.to_fen(), reference.to_fen())
+
+        self.assertEqual(results[2].get_reason(), "ILLEGAL_MOVE")
+        self.assertEqual(results[9].get_captured_type(), 'S')
+        self.assertEqual(results[11].get_reason(), "SELF_CHECK")
+        self.assertEqual(results[20].get_captured_type(), 'C')
+        self.assertTrue(results[20].is_in_check("red"))
+        self.assertEqual(results[21].get_reason(), "SELF_CHECK")
+        self.assertTrue(results[26].is_in_check("black"))
+        self.assertIsNone(results[41].get_reason())
+        self.assertIsNone(results[41].get_captured_type())
+        self.assertEqual(results[41].get_game_state(), "BLACK_WON")
+        self.assertEqual(game.make_move_ex('a4', 'a5').get_reason(),
+                         "GAME_OVER")
+
+        # Points can be given as locations, coordinates, or square indices
+        game = XiangqiGame()
+        self.assertEqual(game.make_move_ex('h3', (8, 10)).get_captured_type(),
+                         'H')
+        for move_from, move_to, reason in (('z1', 'a1', "NOT_ON_BOARD"),
+                                           ((0, 1), 'a1', "NOT_ON_BOARD"),
+                                           (0, 90, "NOT_ON_BOARD"),
+                                           (None, 'a1', "NOT_ON_BOARD"),
+                                           (1.5, 'a1', "NOT_ON_BOARD"),
+                                           (True, 'a1', "NOT_ON_BOARD"),
+                                           ('a1', (1, 1, 1), "NOT_ON_BOARD"),
+                                           ((1.0, 1), 'a2', "NOT_ON_BOARD"),
+                                           ('e5', 'e6', "EMPTY_POINT"),
+                                           (0, 1, "NOT_YOUR_PIECE"),
+                                           ('a10', 'b10', "OWN_PIECE"),
+                                           ('a10', 'b9', "ILLEGAL_MOVE")):
+            result = game.make_move_ex(move_from, move_to)
+            self.assertFalse(result)
+            self.assertEqual(result.get_reason(), reason)
+            self.assertIn(reason, MoveResult.REASONS)
+        self.assertTrue(game.make_move_ex(81, 72))
+        self.assertEqual(len(game.get_move_stack()), 2)
+
+    def test_57(self):
+        """
+        Test whether a reset game is in the same state as a new game and
+        plays the same way, whether it reuses its points and pieces, and
+        whether a GamePool hands out reset games.
+        """
+        new_game = XiangqiGame()
+        for shadow_mode in ("incremental", "full", "differential"):
+            game = XiangqiGame(shadow_mode, "bitboard")
+            board = game.get_game_board()
+            points = list(board.get_board().values())
+            pieces = board.get_pieces("red") + board.get_pieces("black")
+            for move_from, move_to in SAMPLE_GAME:
+                game.make_move(move_from, move_to)
+            self.assertEqual(game.get_game_state(), "BLACK_WON")
+
+            game.reset()
+            self.assertIs(game.get_game_board(), board)
+            self.assertEqual(list(board.get_board().values()), points)
+            self.assertEqual(board.get_pieces("red") +
+                             board.get_pieces("black"), pieces)
+            self.assertEqual(game.to_fen(), new_game.to_fen())
+            self.assertEqual(game.get_position_hash(),
+                             new_game.get_position_hash())
+            self.assertEqual(game.evaluate(), new_game.evaluate())
+            self.assertEqual(game.get_whose_turn(), "red")
+            self.assertEqual(game.get_game_state(), "UNFINISHED")
+            self.assertFalse(game.is_in_check("red"))
+            self.assertEqual(game.get_move_stack(), [])
+            self.assertEqual(list(game.legal_moves()),
+                             list(new_game.legal_moves()))
+            board.check_shadows()
+            for move_from, move_to in SAMPLE_GAME:
+                game.make_move(move_from, move_to)
+            self.assertEqual(game.get_game_state(), "BLACK_WON")
+
+        # A game read from FEN is given a full set of pieces
+        game = XiangqiGame.from_fen("4k4/9/9/9/9/9/9/9/9/4K4 b - - 0 9")
+        game.reset()
+        self.assertEqual(game.to_fen(), new_game.to_fen())
+        self.assertEqual(len(game.get_legal_moves()), 44)
+        game.get_game_board().check_shadows()
+
+        pool = GamePool(max_size=2)
+        pool.fill(3)
+        self.assertEqual(pool.get_free_count(), 2)
+        first = pool.acquire()
+        second = pool.acquire()
+        third = pool.acquire()
+        self.assertEqual(pool.get_created_count(), 3)
+        self.assertTrue(first.make_move('h3', 'h10'))
+        self.assertTrue(pool.release(first))
+        self.assertTrue(pool.release(second))
+        self.assertFalse(pool.release(third))
+        reused = pool.acquire()
+        self.assertIs(reused, second)
+        reused = pool.acquire()
+        self.assertIs(reused, first)
+        self.assertEqual(reused.to_fen(), new_game.to_fen())
+        self.assertEqual(pool.get_created_count(), 3)
+
+        # A game given back twice is only kept once
+        pool = GamePool(max_size=4)
+        game = pool.acquire()
+        self.assertTrue(pool.release(game))
+        self.assertFalse(pool.release(game))
+        self.assertEqual(pool.get_free_count(), 1)
+        self.assertIsNot(pool.acquire(), pool.acquire())
+
+    def test_58(self):
+        """
+        Test whether games built and reset in several threads at once, before
+        the starting shadows are recorded, all get the right shadows.
+        """
+        import threading
+        import XiangqiGame as game_module
+
+        recorded = game_module._starting_shadows
+        game_module._starting_shadows = None
+        barrier = threading.Barrier(8)
+        games = []
+        errors = []
+
+        def build():
+            try:
+                barrier.wait(10)
+                game = XiangqiGame()
+                game.make_move('h3', 'h10')
+                game.reset()
+                games.append(game)
+            except Exception as error:
+                errors.append(error)
+
+        try:
+            threads = [threading.Thread(target=build) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            if game_module._starting_shadows is None:
+                game_module._starting_shadows = recorded
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(games), 8)
+        self.assertIsNotNone(game_module._starting_shadows)
+        new_game = XiangqiGame()
+        for game in games:
+            game.get_game_board().check_shadows()
+            self.assertEqual(game.to_fen(), new_game.to_fen())
+            self.assertEqual(list(game.legal_moves()),
+                             list(new_game.legal_moves()))
+
+    def test_59(self):
+        """
+        Test whether a verdict cache shared by games in several threads stays
+        within its maximum number of positions and counts every lookup.
+        """
+        import threading
+
+        cache = VerdictCache(max_entries=8)
+        errors = []
+
+        def look_up(offset):
+            try:
+                for number in range(2000):
+                    position_hash = (number * 7 + offset) % 20
+                    if cache.get_verdict(position_hash, "red",
+                                         "has_legal_move") is None:
+                        cache.set_verdict(position_hash, "red",
+                                          "has_legal_move", True)
+            except Exception as error:
+                errors.append(error)
+
+        threads = [threading.Thread(target=look_up, args=(offset,))
+                   for offset in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertLessEqual(cache.get_size(), 8)
+        self.assertEqual(cache.get_hits() + cache.get_misses(), 8000)
@@ -0,0 +1,350 @@
+# Description: This file defines a compact binary format for archives of
+# xiangqi games, along with a streaming writer and reader. A game's moves are
+# stored as two bytes each: the index of the point moved from and the index
+# of the point moved to, in the flat array of piece codes that the Board
+# class in XiangqiGame.py keeps (the point (col, row) has the index
+# row * 9 + col - 10). Moves are read back as coordinate tuples, which can be
+# passed to XiangqiGame.replay or push_move without going through strings.
+#
+# A file starts with the 4 bytes "XQGR" and a version byte. Each game then
+# has a 3-byte header, made of the number of moves (2 bytes, little-endian)
+# and a flags byte. If bit 0 of the flags is set, the game starts from a
+# position in FEN rather than the starting position, and the header is
+# followed by the length of the FEN (1 byte) and the FEN in ASCII. The moves
+# come last.
+#
+# Usage: python XiangqiRecord.py convert ARCHIVE RECORDS
+#        python XiangqiRecord.py validate RECORDS
+
+import argparse
+import mmap
+import struct
+import sys
+import time
+
+from XiangqiGame import XiangqiGame, SQUARE_COORDS, COORD_SQUARES, \
+    LOCATION_SQUARES
+
+MAGIC = b"XQGR"
+VERSION = 1
+
+_GAME_HEADER = struct.Struct("<HB")
+_HAS_FEN = 1                    # Flag for a game that starts from a FEN
+_MAX_MOVES = 0xFFFF
+
+
+class GameRecord:
+    """
+    Represent one game read from a file of game records: the position it
+    starts from (as FEN, or None for the starting position) and its moves as
+    a bytes object of two square indices per move. Has getter methods for
+    both, and can generate the moves as coordinate tuples or replay them on
+    a new game.
+    """
+    __slots__ = ("_fen", "_move_bytes")
+
+    def __init__(self, fen, move_bytes):
+        """
+        Take as parameters the FEN of the first position (or None) and the
+        moves as a bytes object, and create a GameRecord object.
+        """
+        self._fen = fen
+        self._move_bytes = move_bytes
+
+    def get_fen(self):
+        """
+        Return the FEN of the position that the game starts from, or None
+        for the starting position.
+        """
+        return self._fen
+
+    def get_move_bytes(self):
+        """
+        Return the moves as a bytes object of two square indices per move.
+        """
+        return self._move_bytes
+
+    def get_move_count(self):
+        """
+        Return the number of moves in the game.
+        """
+        return len(self._move_bytes) // 2
+
+    def moves(self):
+        """
+        Generate the moves, each as a tuple of the coordinates (tuples) of
+        the point moved from and the point moved to.
+        """
+        coords = SQUARE_COORDS
+        move_bytes = self._move_bytes
+        return zip(map(coords.__getitem__, move_bytes[0::2]),
+                   map(coords.__getitem__, move_bytes[1::2]))
+
+    def replay(self, validate=True):
+        """
+        Take as an optional parameter whether to check that each move is
+        legal, and make the moves on a new game with XiangqiGame.replay.
+        Return the game along with the index of the first illegal move (or
+        None) and the final game state.
+        """
+        if self._fen is None:
+            game = XiangqiGame()
+        else:
+            game = XiangqiGame.from_fen(self._fen)
+        illegal_index, game_state = game.replay(self.moves(), validate)
+        return game, illegal_index, game_state
+
+
+class GameRecordWriter:
+    """
+    Represent a writer of game records to a binary file object, which it
+    writes the file header to when created. Games are written one at a time,
+    so an archive of any size can be written in a single pass.
+    """
+    def __init__(self, file):
+        """
+        Take as a parameter a binary file object opened for writing, and
+        create a GameRecordWriter object, writing the file header.
+        """
+        self._file = file
+        self._game_count = 0
+        file.write(MAGIC + bytes((VERSION,)))
+
+    def get_game_count(self):
+        """
+        Return the number of games written.
+        """
+        return self._game_count
+
+    def write_game(self, moves, fen=None):
+        """
+        Take as parameters a sequence of moves and an optional FEN of the
+        position the game starts from, and write the game. Each move is a
+        tuple of the points moved from and to, given as coordinate tuples,
+        square indices, or strings in algebraic notation. Raise a ValueError
+        (naming the move, counting from 1) if a move is not two points, a
+        point is not on the board, or there are too many moves.
+        """
+        move_bytes = bytearray()
+        for ply, move in enumerate(moves, 1):
+            try:
+                if isinstance(move, str) or len(move) != 2:
+                    raise ValueError("Not a move of two points in move " +
+                                     str(ply))
+                move_from, move_to = move
+                move_bytes.append(_square_index(move_from))
+                move_bytes.append(_square_index(move_to))
+            except (KeyError, IndexError, TypeError):
+                raise ValueError("Not a point on the board in move " +
+                                 str(ply))
+        if len(move_bytes) // 2 > _MAX_MOVES:
+            raise ValueError("Too many moves in a game")
+
+        if fen is None:
+            header = _GAME_HEADER.pack(len(move_bytes) // 2, 0)
+        else:
+            fen_bytes = fen.encode("ascii")
+            if len(fen_bytes) > 255:
+                raise ValueError("FEN too long: " + fen)
+            header = (_GAME_HEADER.pack(len(move_bytes) // 2, _HAS_FEN) +
+                      bytes((len(fen_bytes),)) + fen_bytes)
+
+        self._file.write(header)
+        self._file.write(move_bytes)
+        self._game_count += 1
+
+
+class GameRecordReader:
+    """
+    Represent a reader of game records from a binary file object. A file on
+    disk is memory-mapped, so that games are read straight from the page
+    cache; any other stream is read as it goes. Iterating over the reader
+    generates a GameRecord for each game. Can be used as a context manager,
+    which closes the memory map (not the file) on exit.
+    """
+    def __init__(self, file, use_mmap=True):
+        """
+        Take as parameters a binary file object opened for reading and
+        whether to memory-map it if possible, read the file header, and
+        create a GameRecordReader object. Raise a ValueError if the file is
+        not a file of game records.
+        """
+        self._file = file
+        self._map = None
+        if use_mmap:
+            try:
+                self._map = mmap.mmap(file.fileno(), 0,
+                                      access=mmap.ACCESS_READ)
+            except (AttributeError, OSError, ValueError):
+                self._map = None    # Not a regular (or non-empty) file
+        self._offset = 0
+        if self._read(5) != MAGIC + bytes((VERSION,)):
+            raise ValueError("Not a file of game records")
+
+    def __enter__(self):
+        """
+        Return the reader itself.
+        """
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """
+        Close the memory map, if any.
+        """
+        self.close()
+
+    def __iter__(self):
+        """
+        Generate a GameRecord for each of the remaining games. Raise a
+        ValueError if a game is cut short or holds a point that is not on
+        the board.
+        """
+        while True:
+            header = self._read(_GAME_HEADER.size)
+            if not header:
+                return
+            if len(header) < _GAME_HEADER.size:
+                raise ValueError("Truncated game header")
+            move_count, flags = _GAME_HEADER.unpack(header)
+
+            fen = None
+            if flags & _HAS_FEN:
+                fen_length = self._read(1)
+                fen_bytes = self._read(fen_length[0] if fen_length else 0)
+                if not fen_length or len(fen_bytes) < fen_length[0]:
+                    raise ValueError("Truncated FEN")
+                fen = fen_bytes.decode("ascii")
+
+            move_bytes = self._read(2 * move_count)
+            if len(move_bytes) < 2 * move_count:
+                raise ValueError("Truncated moves")
+            if move_bytes and max(move_bytes) >= 90:
+                raise ValueError("Not a point on the board in a move")
+            yield GameRecord(fen, move_bytes)
+
+    def close(self):
+        """
+        Close the memory map, if any. The file itself is left open.
+        """
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+    def _read(self, size):
+        """
+        Take as a parameter a number of bytes, and return up to that many
+        bytes from the memory map or the file.
+        """
+        if self._map is None:
+            return self._file.read(size)
+        data = self._map[self._offset:self._offset + size]
+        self._offset += len(data)
+        return data
+
+
+def _square_index(location):
+    """
+    Take as a parameter a point as a coordinate tuple, a square index, or a
+    string in algebraic notation, and return its square index.
+    """
+    if isinstance(location, int):
+        if not 0 <= location < 90:
+            raise IndexError(location)
+        return location
+    if isinstance(location, str):
+        return LOCATION_SQUARES[location]
+    return COORD_SQUARES[tuple(location)]
+
+
+def convert_archive(archive, output):
+    """
+    Take as parameters an open text archive of games (one game per line, as
+    moves such as "c4-c5" separated by spaces; blank lines and lines starting
+    with "#" are skipped) and an open binary output file, and write the games
+    as game records. Return the number of games written. Raise a ValueError
+    naming the game and move (each counting from 1) if a move is not of the
+    form "c4-c5" or is not on the board.
+    """
+    writer = GameRecordWriter(output)
+    for line in archive:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        game_number = writer.get_game_count() + 1
+        moves = []
+        for ply, move_str in enumerate(line.split(), 1):
+            locations = move_str.split("-")
+            if len(locations) != 2:
+                raise ValueError("Bad move %s in game %d, move %d"
+                                 % (move_str, game_number, ply))
+            moves.append(locations)
+        try:
+            writer.write_game(moves)
+        except ValueError as error:
+            raise ValueError("%s of game %d" % (error, game_number))
+    return writer.get_game_count()
+
+
+def validate_records(reader):
+    """
+    Take as a parameter a GameRecordReader, and replay every game it reads,
+    checking that each move is legal. A game whose FEN cannot be read counts
+    as invalid, along with a game that has an illegal move. Return the number
+    of games read and the number of invalid games.
+    """
+    game_count = 0
+    invalid_count = 0
+    for record in reader:
+        game_count += 1
+        try:
+            illegal_index = record.replay()[1]
+        except ValueError:      # The FEN cannot be read
+            illegal_index = 0
+        if illegal_index is not None:
+            invalid_count += 1
+    return game_count, invalid_count
+
+
+def main():
+    """
+    Run the command named on the command line: convert a text archive to
+    game records, or replay every game in a file of game records and report
+    how many were legal and how many were validated per second.
+    """
+    parser = argparse.ArgumentParser(description="Convert and validate "
+                                                 "binary xiangqi game "
+                                                 "records.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    convert_parser = subparsers.add_parser(
+        "convert", help="text archive to game records")
+    convert_parser.add_argument("archive")
+    convert_parser.add_argument("records")
+
+    validate_parser = subparsers.add_parser(
+        "validate", help="replay every game in a file of game records")
+    validate_parser.add_argument("records")
+
+    args = parser.parse_args()
+
+    if args.command == "convert":
+        with open(args.archive) as archive, \
+                open(args.records, "wb") as output:
+            try:
+                game_count = convert_archive(archive, output)
+            except ValueError as error:
+                parser.error(str(error))
+        print("%d games written" % game_count)
+    else:
+        start = time.perf_counter()
+        with open(args.records, "rb") as file, \
+                GameRecordReader(file) as reader:
+            game_count, invalid_count = validate_records(reader)
+        elapsed = time.perf_counter() - start
+        print("%d games (%d invalid) in %.2f s: %.1f games per second"
+              % (game_count, invalid_count, elapsed,
+                 game_count / elapsed if elapsed else 0.0), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+# Description: This test file tests the binary game records in
+# XiangqiRecord.py.
+
+import io
+import os
+import tempfile
+import unittest
+from XiangqiGame import XiangqiGame
+from XiangqiRecord import MAGIC, GameRecordWriter, GameRecordReader, \
+    convert_archive, validate_records
+
+# The valid moves of the sample game in XiangqiGame.py's main function, the
+# last of which checkmates the red general
+SAMPLE_LINE = ("c4-c5 e7-e6 c5-c6 e6-e5 c6-d6 e5-e4 d6-d7 f10-e9 b1-c3 h8-h1 "
+               "c3-d5 h1-f1 d5-c7 f1-d1 d7-d8 d1-a1 e1-e2 i10-i8 d8-e8 i8-f8 "
+               "e8-e9 d10-e9 i1-i2 a10-a9 i2-f2 a9-d9 f2-f1 d9-d3 f1-e1 f8-f3 "
+               "c1-a3 a1-g1 b3-b5 g7-g6 h3-h5 e4-e3")
+
+
+class TestXiangqiRecord(unittest.TestCase):
+    """
+    Test the binary game records in XiangqiRecord.py.
+    """
+    def test_1(self):
+        """
+        Test whether games written in every move form are read back the same,
+        at two bytes per move, from a stream and from a memory-mapped file.
+        """
+        buffer = io.BytesIO()
+        writer = GameRecordWriter(buffer)
+        writer.write_game([((3, 4), (3, 5)), ((5, 7), (5, 6))])
+        writer.write_game([(29, 38), ('e7', 'e6')])
+        writer.write_game([], fen="4k4/9/9/9/9/9/9/9/9/3K5 w - - 0 1")
+        self.assertEqual(writer.get_game_count(), 3)
+        data = buffer.getvalue()
+        self.assertTrue(data.startswith(MAGIC))
+        self.assertEqual(len(data), 5 + 3 + 4 + 3 + 4 + 3 + 1 + 33)
+
+        records = list(GameRecordReader(io.BytesIO(data)))
+        self.assertEqual([list(record.moves()) for record in records[:2]],
+                         [[((3, 4), (3, 5)), ((5, 7), (5, 6))]] * 2)
+        self.assertIsNone(records[0].get_fen())
+        self.assertEqual(records[2].get_move_count(), 0)
+        self.assertEqual(records[2].get_fen(),
+                         "4k4/9/9/9/9/9/9/9/9/3K5 w - - 0 1")
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "games.xqr")
+            with open(path, "wb") as file:
+                file.write(data)
+            with open(path, "rb") as file, \
+                    GameRecordReader(file) as reader:
+                mapped = list(reader)
+        self.assertEqual([record.get_move_bytes() for record in mapped],
+                         [record.get_move_bytes() for record in records])
+
+    def test_2(self):
+        """
+        Test whether a converted archive replays to the same results as the
+        text moves, including an illegal move and a game from a FEN.
+        """
+        archive = io.StringIO(SAMPLE_LINE + "\n\n# comment\nc4-c5 c5-c6\n")
+        buffer = io.BytesIO()
+        self.assertEqual(convert_archive(archive, buffer), 2)
+
+        records = list(GameRecordReader(io.BytesIO(buffer.getvalue())))
+        game, illegal_index, game_state = records[0].replay()
+        self.assertEqual((illegal_index, game_state), (None, "BLACK_WON"))
+        reference = XiangqiGame()
+        reference.replay(move.split("-") for move in SAMPLE_LINE.split())
+        self.assertEqual(game.get_position_hash(),
+                         reference.get_position_hash())
+        self.assertEqual(records[1].replay()[1:], (1, "UNFINISHED"))
+
+        # The red general moves from d1 to d2
+        buffer = io.BytesIO()
+        GameRecordWriter(buffer).write_game(
+            [('d1', 'd2')], fen="4k4/9/9/9/9/9/9/9/9/3K5 w - - 0 1")
+        record = next(iter(GameRecordReader(io.BytesIO(buffer.getvalue()))))
+        game, illegal_index, _ = record.replay()
+        self.assertIsNone(illegal_index)
+        self.assertEqual(game.to_fen(), "4k4/9/9/9/9/9/9/9/3K5/9 b - - 0 1")
+
+    def test_3(self):
+        """
+        Test whether bad moves are not written, and whether files that are
+        not game records, or are cut short, are not read.
+        """
+        writer = GameRecordWriter(io.BytesIO())
+        for bad_move in (((0, 1), (1, 1)), (90, 0), ('j1', 'a1'), (-1, 0),
+                         "c4c5", ('c4', 'c5', 'c6'), None):
+            with self.assertRaises(ValueError):
+                writer.write_game([bad_move])
+
+        # A bad move in an archive is named by its game and move
+        for line, message in (("c4c5", "c4c5 in game 2, move 1"),
+                              ("c4-c5 e7-e6-e5", "game 2, move 2"),
+                              ("c4-c5 e7-z6", "move 2 of game 2")):
+            archive = io.StringIO("c4-c5\n" + line + "\n")
+            with self.assertRaises(ValueError) as context:
+                convert_archive(archive, io.BytesIO())
+            self.assertIn(message, str(context.exception))
+
+        with self.assertRaises(ValueError):
+            GameRecordReader(io.BytesIO(b"XQGX\x01"))
+        buffer = io.BytesIO()
+        GameRecordWriter(buffer).write_game([('c4', 'c5')])
+        for data in (buffer.getvalue()[:-1], buffer.getvalue()[:-3] + b"\x01",
+                     buffer.getvalue()[:-2] + b"\x5a\x00"):
+            with self.assertRaises(ValueError):
+                list(GameRecordReader(io.BytesIO(data)))
+
+    def test_4(self):
+        """
+        Test whether validating a file of game records counts games with an
+        illegal move or an unreadable FEN as invalid, and goes on to the
+        next game.
+        """
+        buffer = io.BytesIO()
+        writer = GameRecordWriter(buffer)
+        writer.write_game([('c4', 'c5'), ('e7', 'e6')])
+        writer.write_game([('c4', 'c6')])
+        writer.write_game([('d1', 'd2')], fen="not a fen")
+        writer.write_game([('d1', 'd2')],
+                          fen="4k4/9/9/9/9/9/9/9/9/3K5 w - - 0 1")
+        reader = GameRecordReader(io.BytesIO(buffer.getvalue()))
+        self.assertEqual(validate_records(reader), (4, 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
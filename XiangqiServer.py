@@ -0,0 +1,481 @@
+# Description: This file defines an asyncio game server for the XiangqiGame
+# class in XiangqiGame.py. A GameSessionManager hosts any number of games,
+# each under a game ID. Making a move (with its checks for legality and for
+# checkmate or stalemate) and reading a position from FEN are run in a pool of
+# worker threads, so the event loop is free to serve other games while a slow
+# position is worked out. Each game has its own lock, which is granted in the
+# order it was asked for, so the moves sent to one game are made in the order
+# they were sent, while moves in different games run side by side. A request
+# that is cancelled (say, by a timeout) keeps its game's lock until the work
+# it started on the game is done, so that work never overlaps the game's next
+# request. The games live in this process, so a thread pool is used rather
+# than a process pool, which would have to copy a game to and from a worker
+# for every move. New games in the starting position can be taken from a
+# GamePool, which closed games go back to.
+#
+# Requests and responses are JSON objects. A request has an "op" of "new"
+# (with an optional "fen" and "game"), "move" (with "game" and "move", e.g.
+# "c4-c5"), "state" (with "game"), or "close" (with "game"). A "fen" is a
+# string, and a "game" is a string or an integer. A response has "ok", which
+# is false (along with an "error") if the request could not be carried out;
+# an illegal move is not an error, but has "made" false and a "reason" (see
+# MoveResult in XiangqiGame.py). The server reads one request per line from
+# each connection and writes one response per line, in order. An
+# InProcessClient sends requests to a manager in the same process the same
+# way, without a network connection.
+#
+# Usage: python XiangqiServer.py [--host HOST] [--port PORT]
+#            [--workers WORKERS]
+
+import argparse
+import asyncio
+import itertools
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+from XiangqiGame import XiangqiGame, GamePool
+
+
+class NoSuchGameError(KeyError):
+    """
+    Raised when a game ID names no hosted game, or a game that was closed
+    while a request for it was waiting.
+    """
+
+
+class GameSession:
+    """
+    Represent one hosted game: its ID, the XiangqiGame object, the lock
+    that keeps its moves in order, and whether it has been closed. Has getter
+    methods for each, and a method to close it.
+    """
+    __slots__ = ("_game_id", "_game", "_lock", "_closed")
+
+    def __init__(self, game_id, game):
+        """
+        Take as parameters a game ID and a XiangqiGame object, and create a
+        GameSession object with a new lock.
+        """
+        self._game_id = game_id
+        self._game = game
+        self._lock = asyncio.Lock()
+        self._closed = False
+
+    def get_game_id(self):
+        """
+        Return the game ID.
+        """
+        return self._game_id
+
+    def get_game(self):
+        """
+        Return the game data member.
+        """
+        return self._game
+
+    def get_lock(self):
+        """
+        Return the lock held while the game is moved or read.
+        """
+        return self._lock
+
+    def is_closed(self):
+        """
+        Return True if the session has been closed, or False otherwise.
+        """
+        return self._closed
+
+    def set_closed(self):
+        """
+        Mark the session as closed, so that requests waiting on its lock are
+        not carried out on its game.
+        """
+        self._closed = True
+
+
+class GameSessionManager:
+    """
+    Represent a host of many games, each found by its game ID. The work of
+    making a move or reading FEN is run in an executor (by default, a pool of
+    worker threads owned by the manager), and each game's requests are
+    carried out one at a time, in the order they were made. Can be used as an
+    async context manager, which shuts down an owned pool on exit.
+    """
+    def __init__(self, executor=None, workers=None, game_pool=None):
+        """
+        Take as optional parameters an executor to run the work in, the
+        number of worker threads to start if none is given, and a GamePool
+        object to take new games from and give closed games back to, and
+        create a GameSessionManager object with no games.
+        """
+        self._game_pool = game_pool
+        self._owns_executor = executor is None
+        if executor is None:
+            executor = ThreadPoolExecutor(workers,
+                                          thread_name_prefix="xiangqi")
+        self._executor = executor
+        self._sessions = {}     # Game ID -> GameSession
+        self._next_ids = itertools.count(1)
+
+    async def __aenter__(self):
+        """
+        Return the manager itself.
+        """
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        """
+        Shut down the pool of worker threads, if the manager owns it.
+        """
+        self.close()
+
+    def get_game_pool(self):
+        """
+        Return the GamePool object, or None if the manager has none.
+        """
+        return self._game_pool
+
+    def get_executor(self):
+        """
+        Return the executor that the work is run in.
+        """
+        return self._executor
+
+    def get_game_ids(self):
+        """
+        Return a list of the IDs of the games being hosted.
+        """
+        return list(self._sessions)
+
+    def get_session(self, game_id):
+        """
+        Take as a parameter a game ID, and return its GameSession object.
+        Raise a NoSuchGameError if there is no such game.
+        """
+        session = self._sessions.get(game_id)
+        if session is None:
+            raise NoSuchGameError("No game with ID " + str(game_id))
+        return session
+
+    def add_game(self, game, game_id=None):
+        """
+        Take as parameters a XiangqiGame object and an optional game ID (by
+        default, the next unused number as a string), and host the game.
+        Return the game ID. Raise a ValueError if the ID is already in use.
+        """
+        if game_id is None:
+            game_id = str(next(self._next_ids))
+            while game_id in self._sessions:
+                game_id = str(next(self._next_ids))
+        elif game_id in self._sessions:
+            raise ValueError("Game ID already in use: " + str(game_id))
+        self._sessions[game_id] = GameSession(game_id, game)
+        return game_id
+
+    async def new_game(self, fen=None, game_id=None):
+        """
+        Take as optional parameters a position in FEN to start from and a
+        game ID, and host a new game. Return the game ID. Raise a ValueError
+        if the FEN cannot be read or the ID is already in use (in which case
+        a game taken from the GamePool is given back to it).
+        """
+        if game_id is not None and game_id in self._sessions:
+            raise ValueError("Game ID already in use: " + str(game_id))
+        if fen is None and self._game_pool is not None:
+            game = await self._run(self._game_pool.acquire)
+            try:
+                # The ID may have been taken while the game was acquired
+                return self.add_game(game, game_id)
+            except ValueError:
+                await self._run(self._game_pool.release, game)
+                raise
+        elif fen is None:
+            game = await self._run(XiangqiGame)
+        else:
+            game = await self._run(XiangqiGame.from_fen, fen)
+        return self.add_game(game, game_id)
+
+    async def make_move(self, game_id, move_from, move_to):
+        """
+        Take as parameters a game ID and the point moved from and the point
+        moved to (in any form that make_move_ex takes), and make the move on
+        the game once the game's earlier requests are done. Return the
+        MoveResult object. Raise a NoSuchGameError if there is no such game,
+        or if it is closed by an earlier request.
+        """
+        session = self.get_session(game_id)
+        async with session.get_lock():
+            self._check_session(game_id, session)
+            return await self._run_to_end(session.get_game().make_move_ex,
+                                          move_from, move_to)
+
+    async def get_state(self, game_id):
+        """
+        Take as a parameter a game ID, and return a dictionary of the game's
+        position in FEN ("fen"), whose turn it is ("turn"), whether either
+        general is in check ("red_in_check" and "black_in_check"), and the
+        game state ("state"), once the game's earlier requests are done.
+        Raise a NoSuchGameError if there is no such game, or if it is closed
+        by an earlier request.
+        """
+        session = self.get_session(game_id)
+        async with session.get_lock():
+            self._check_session(game_id, session)
+            game = session.get_game()
+            return {"fen": game.to_fen(), "turn": game.get_whose_turn(),
+                    "red_in_check": bool(game.is_in_check("red")),
+                    "black_in_check": bool(game.is_in_check("black")),
+                    "state": game.get_game_state()}
+
+    async def close_game(self, game_id):
+        """
+        Take as a parameter a game ID, and stop hosting the game once its
+        earlier requests are done. If the manager has a GamePool, give the
+        game back to it and return None; otherwise, return the XiangqiGame
+        object. Raise a NoSuchGameError if there is no such game, or if it
+        is closed by an earlier request.
+        """
+        session = self.get_session(game_id)
+        async with session.get_lock():
+            self._check_session(game_id, session)
+            session.set_closed()
+            del self._sessions[game_id]
+        if self._game_pool is not None:
+            await self._run_to_end(self._game_pool.release,
+                                   session.get_game())
+            return None
+        return session.get_game()
+
+    async def handle_request(self, request):
+        """
+        Take as a parameter a request (a dictionary, as described at the top
+        of this file), carry it out, and return the response as a dictionary.
+        """
+        try:
+            op = request.get("op")
+            if op == "new":
+                fen = request.get("fen")
+                if fen is not None and not isinstance(fen, str):
+                    raise ValueError("Bad FEN: " + json.dumps(fen))
+                game_id = request.get("game")
+                if game_id is not None:
+                    game_id = _game_id(request)
+                game_id = await self.new_game(fen, game_id)
+                return {"ok": True, "game": game_id}
+            if op == "move":
+                locations = str(_field(request, "move")).split("-")
+                if len(locations) != 2:
+                    raise ValueError("Bad move: " + str(request["move"]))
+                result = await self.make_move(_game_id(request),
+                                              locations[0], locations[1])
+                return {"ok": True, "made": result.get_made(),
+                        "reason": result.get_reason(),
+                        "captured": result.get_captured_type(),
+                        "red_in_check": result.is_in_check("red"),
+                        "black_in_check": result.is_in_check("black"),
+                        "state": result.get_game_state()}
+            if op == "state":
+                state = await self.get_state(_game_id(request))
+                state["ok"] = True
+                return state
+            if op == "close":
+                await self.close_game(_game_id(request))
+                return {"ok": True}
+            return {"ok": False, "error": "Unknown op: " + str(op)}
+        except NoSuchGameError as error:
+            return {"ok": False, "error": error.args[0]}
+        except ValueError as error:
+            return {"ok": False, "error": str(error)}
+
+    async def handle_line(self, line):
+        """
+        Take as a parameter one line of a request in JSON, carry it out, and
+        return the response as a line of JSON.
+        """
+        try:
+            request = json.loads(line)
+        except ValueError:
+            response = {"ok": False, "error": "Not JSON"}
+        else:
+            if isinstance(request, dict):
+                response = await self.handle_request(request)
+            else:
+                response = {"ok": False, "error": "Not a JSON object"}
+        return json.dumps(response) + "\n"
+
+    def close(self):
+        """
+        Shut down the pool of worker threads, if the manager owns it.
+        """
+        if self._owns_executor:
+            self._executor.shutdown(wait=True)
+
+    def _check_session(self, game_id, session):
+        """
+        Take as parameters a game ID and the GameSession object that was
+        found for it before waiting on its lock, and raise a NoSuchGameError
+        if the session has since been closed or the ID now names another
+        game.
+        """
+        if session.is_closed() or self._sessions.get(game_id) is not session:
+            raise NoSuchGameError("No game with ID " + str(game_id))
+
+    async def _run(self, function, *args):
+        """
+        Take as parameters a function and its arguments, run it in the
+        executor, and return its result.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, function, *args)
+
+    async def _run_to_end(self, function, *args):
+        """
+        Take as parameters a function and its arguments, run it in the
+        executor, and return its result. If the caller is cancelled, wait
+        for the function to finish before passing on the cancellation, so
+        that a lock held by the caller is not released while the function
+        is still running.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._executor, function, *args)
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            while not future.done():
+                try:
+                    await asyncio.wait([future])
+                except asyncio.CancelledError:
+                    pass
+            raise
+
+
+def _field(request, name):
+    """
+    Take as parameters a request and the name of a field, and return the
+    field's value. Raise a ValueError if the request has no such field.
+    """
+    if name not in request:
+        raise ValueError("Missing field: " + name)
+    return request[name]
+
+
+def _game_id(request):
+    """
+    Take as a parameter a request, and return the value of its "game" field.
+    Raise a ValueError if the request has no such field, or if the value is
+    not a string or an integer.
+    """
+    game_id = _field(request, "game")
+    if isinstance(game_id, bool) or not isinstance(game_id, (str, int)):
+        raise ValueError("Bad game ID: " + json.dumps(game_id))
+    return game_id
+
+
+class InProcessClient:
+    """
+    Represent a client of a GameSessionManager in the same process, which
+    sends requests as lines of JSON as a network client would, for testing
+    and for running games locally. Each method returns the response as a
+    dictionary.
+    """
+    def __init__(self, manager):
+        """
+        Take as a parameter a GameSessionManager object, and create an
+        InProcessClient object.
+        """
+        self._manager = manager
+
+    async def request(self, **request):
+        """
+        Take as keyword parameters the fields of a request, send it, and
+        return the response.
+        """
+        line = await self._manager.handle_line(json.dumps(request))
+        return json.loads(line)
+
+    async def new_game(self, fen=None):
+        """
+        Take as an optional parameter a position in FEN, and start a new
+        game.
+        """
+        if fen is None:
+            return await self.request(op="new")
+        return await self.request(op="new", fen=fen)
+
+    async def move(self, game_id, move):
+        """
+        Take as parameters a game ID and a move such as "c4-c5", and make
+        the move.
+        """
+        return await self.request(op="move", game=game_id, move=move)
+
+    async def state(self, game_id):
+        """
+        Take as a parameter a game ID, and get the game's state.
+        """
+        return await self.request(op="state", game=game_id)
+
+    async def close(self, game_id):
+        """
+        Take as a parameter a game ID, and stop hosting the game.
+        """
+        return await self.request(op="close", game=game_id)
+
+
+async def start_server(manager, host="127.0.0.1", port=0):
+    """
+    Take as parameters a GameSessionManager object, a host, and a port (0
+    for any free port), and start serving the manager's games over TCP, one
+    line of JSON per request and per response. Return the asyncio Server
+    object.
+    """
+    async def handle_connection(reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                writer.write((await manager.handle_line(line)).encode())
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle_connection, host, port)
+
+
+async def serve(host, port, workers):
+    """
+    Take as parameters a host, a port, and the number of worker threads, and
+    serve games until interrupted.
+    """
+    game_pool = GamePool()
+    game_pool.fill(game_pool.get_max_size())
+    async with GameSessionManager(workers=workers,
+                                  game_pool=game_pool) as manager:
+        server = await start_server(manager, host, port)
+        address = server.sockets[0].getsockname()
+        print("Serving xiangqi games on %s:%d" % (address[0], address[1]))
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    """
+    Serve games on the host and port given on the command line.
+    """
+    parser = argparse.ArgumentParser(description="Serve xiangqi games.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker threads")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
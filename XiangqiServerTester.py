@@ -0,0 +1,304 @@
+# Description: This test file tests the asyncio game server in
+# XiangqiServer.py.
+
+import asyncio
+import json
+import threading
+import unittest
+from XiangqiGame import XiangqiGame, STARTING_FEN, GamePool, SAMPLE_GAME
+from XiangqiServer import GameSessionManager, InProcessClient, \
+    start_server, NoSuchGameError
+
+
+class BlockingGame(XiangqiGame):
+    """
+    Represent a game whose moves wait until they are released, standing in
+    for a position that is slow to work out, and which counts the most moves
+    that were being made at once.
+    """
+    def __init__(self):
+        """
+        Create a BlockingGame object whose moves are not yet released.
+        """
+        super().__init__()
+        self.started = threading.Event()
+        self.released = threading.Event()
+        self.moving = 0
+        self.most_moving = 0
+        self._count_lock = threading.Lock()
+
+    def make_move_ex(self, move_from, move_to):
+        """
+        Wait until moves are released, and then make the move.
+        """
+        with self._count_lock:
+            self.moving += 1
+            self.most_moving = max(self.most_moving, self.moving)
+        self.started.set()
+        self.released.wait(10)
+        try:
+            return super().make_move_ex(move_from, move_to)
+        finally:
+            with self._count_lock:
+                self.moving -= 1
+
+
+class TestXiangqiServer(unittest.TestCase):
+    """
+    Test the asyncio game server in XiangqiServer.py.
+    """
+    def test_1(self):
+        """
+        Test whether moves sent to several games at once are made in the
+        order they were sent to each game.
+        """
+        async def play():
+            async with GameSessionManager(workers=4) as manager:
+                game_ids = [await manager.new_game() for _ in range(3)]
+                tasks = [asyncio.ensure_future(
+                    manager.make_move(game_id, move_from, move_to))
+                    for move_from, move_to in SAMPLE_GAME
+                    for game_id in game_ids]
+                results = await asyncio.gather(*tasks)
+                states = [await manager.get_state(game_id)
+                          for game_id in game_ids]
+                return results, states
+
+        results, states = asyncio.run(play())
+        reference = XiangqiGame()
+        expected = [reference.make_move(move_from, move_to)
+                    for move_from, move_to in SAMPLE_GAME]
+        for offset in range(3):
+            self.assertEqual([bool(result) for result in results[offset::3]],
+                             expected)
+        for state in states:
+            self.assertEqual(state["fen"], reference.to_fen())
+            self.assertEqual(state["state"], "BLACK_WON")
+            self.assertTrue(state["red_in_check"])
+
+    def test_2(self):
+        """
+        Test whether a game whose move is slow to work out holds up only its
+        own later requests, and not those of other games.
+        """
+        async def play():
+            async with GameSessionManager(workers=2) as manager:
+                slow_game = BlockingGame()
+                slow_id = manager.add_game(slow_game)
+                fast_id = await manager.new_game()
+                slow_move = asyncio.ensure_future(
+                    manager.make_move(slow_id, 'c4', 'c5'))
+                slow_state = asyncio.ensure_future(manager.get_state(slow_id))
+                loop = asyncio.get_running_loop()
+                await loop.run_in_executor(None, slow_game.started.wait, 10)
+
+                # The other game moves while the slow move is still waiting
+                fast_result = await manager.make_move(fast_id, 'h3', 'h10')
+                fast_state = await manager.get_state(fast_id)
+                slow_done = slow_move.done() or slow_state.done()
+
+                slow_game.released.set()
+                return (fast_result, fast_state, slow_done,
+                        await slow_move, await slow_state)
+
+        fast_result, fast_state, slow_done, slow_result, slow_state = \
+            asyncio.run(play())
+        self.assertFalse(slow_done)
+        self.assertEqual(fast_result.get_captured_type(), 'H')
+        self.assertEqual(fast_state["turn"], "black")
+        self.assertTrue(slow_result)
+        self.assertEqual(slow_state["turn"], "black")
+
+    def test_3(self):
+        """
+        Test whether requests sent by the in-process client and over TCP get
+        the right responses, including errors.
+        """
+        async def play():
+            async with GameSessionManager(workers=2) as manager:
+                client = InProcessClient(manager)
+                responses = [await client.new_game()]
+                game_id = responses[0]["game"]
+                responses.append(await client.move(game_id, "h3-h10"))
+                responses.append(await client.move(game_id, "h10-h9"))
+                responses.append(await client.move(game_id, "c4c5"))
+                responses.append(await client.state(game_id))
+                responses.append(await client.new_game("bad fen"))
+                responses.append(await client.request(op="fly"))
+                responses.append(await client.request(op="move",
+                                                      game=game_id))
+                for request in ({"op": "new", "fen": 7},
+                                {"op": "new", "game": [1]},
+                                {"op": "move", "game": {"id": 1},
+                                 "move": "c4-c5"},
+                                {"op": "state", "game": True},
+                                {"op": "close", "game": None}):
+                    responses.append(await client.request(**request))
+                responses.append(await client.close(game_id))
+                responses.append(await client.state(game_id))
+                responses.append(json.loads(await manager.handle_line("[")))
+
+                server = await start_server(manager)
+                port = server.sockets[0].getsockname()[1]
+                reader, writer = await asyncio.open_connection("127.0.0.1",
+                                                               port)
+                for request in ({"op": "new", "game": "tcp"},
+                                {"op": "move", "game": "tcp",
+                                 "move": "c4-c5"},
+                                {"op": "new", "game": "tcp"}):
+                    writer.write((json.dumps(request) + "\n").encode())
+                writer.write_eof()
+                for _ in range(3):
+                    responses.append(json.loads(await reader.readline()))
+                self.assertEqual(await reader.read(), b"")
+                writer.close()
+                server.close()
+                await server.wait_closed()
+                return responses
+
+        (new, capture, wrong_turn, bad_move, state, bad_fen, bad_op,
+         no_move, fen_type, new_id_type, move_id_type, state_id_type,
+         close_id_type, close, closed, not_json, tcp_new, tcp_move,
+         tcp_duplicate) = asyncio.run(play())
+        self.assertEqual(new, {"ok": True, "game": "1"})
+        self.assertTrue(capture["made"])
+        self.assertEqual(capture["captured"], 'H')
+        self.assertFalse(wrong_turn["made"])
+        self.assertEqual(wrong_turn["reason"], "NOT_YOUR_PIECE")
+        self.assertFalse(bad_move["ok"])
+        self.assertEqual(state["turn"], "black")
+        self.assertNotEqual(state["fen"], STARTING_FEN)
+        for response in (bad_fen, bad_op, no_move, fen_type, new_id_type,
+                         move_id_type, state_id_type, close_id_type, closed,
+                         not_json, tcp_duplicate):
+            self.assertFalse(response["ok"])
+            self.assertIn("error", response)
+        self.assertTrue(close["ok"])
+        self.assertIn("No game", closed["error"])
+        self.assertIn("Bad FEN", fen_type["error"])
+        self.assertIn("Bad game ID", close_id_type["error"])
+        self.assertEqual(tcp_new["game"], "tcp")
+        self.assertTrue(tcp_move["made"])
+
+    def test_4(self):
+        """
+        Test whether a manager with a GamePool takes new games from the pool
+        and gives closed games back to it, reset.
+        """
+        async def play():
+            pool = GamePool(max_size=4)
+            async with GameSessionManager(workers=2,
+                                          game_pool=pool) as manager:
+                first_id = await manager.new_game()
+                first = manager.get_session(first_id).get_game()
+                await manager.make_move(first_id, 'h3', 'h10')
+                closed = await manager.close_game(first_id)
+                free_count = pool.get_free_count()
+                second_id = await manager.new_game()
+                second = manager.get_session(second_id).get_game()
+                state = await manager.get_state(second_id)
+                fen_id = await manager.new_game(STARTING_FEN)
+                return (first, closed, free_count, second, state,
+                        manager.get_session(fen_id).get_game(), pool)
+
+        first, closed, free_count, second, state, fen_game, pool = \
+            asyncio.run(play())
+        self.assertIsNone(closed)
+        self.assertEqual(free_count, 1)
+        self.assertIs(second, first)
+        self.assertEqual(state["fen"], STARTING_FEN)
+        self.assertIsNot(fen_game, first)
+        self.assertEqual(pool.get_created_count(), 1)
+
+    def test_5(self):
+        """
+        Test whether requests queued behind a close are not carried out on
+        the closed game, which has been given back to the pool, and whether
+        they are not carried out on a new game given the same ID.
+        """
+        async def play():
+            pool = GamePool(max_size=4)
+            async with GameSessionManager(workers=2,
+                                          game_pool=pool) as manager:
+                slow_game = BlockingGame()
+                game_id = manager.add_game(slow_game, "slow")
+                slow_move = asyncio.ensure_future(
+                    manager.make_move(game_id, 'c4', 'c5'))
+                loop = asyncio.get_running_loop()
+                await loop.run_in_executor(None, slow_game.started.wait, 10)
+                close = asyncio.ensure_future(manager.close_game(game_id))
+                queued = [asyncio.ensure_future(
+                    manager.make_move(game_id, 'h3', 'h10')),
+                    asyncio.ensure_future(manager.get_state(game_id)),
+                    asyncio.ensure_future(manager.close_game(game_id))]
+                await asyncio.sleep(0)
+                slow_game.released.set()
+                await slow_move
+                closed = await close
+                replacement_id = await manager.new_game(game_id=game_id)
+                results = await asyncio.gather(*queued,
+                                               return_exceptions=True)
+                state = await manager.get_state(replacement_id)
+                return (closed, results, manager.get_session(game_id),
+                        state, pool)
+
+        closed, results, replacement, state, pool = asyncio.run(play())
+        self.assertIsNone(closed)
+        for result in results:
+            self.assertIsInstance(result, NoSuchGameError)
+        self.assertEqual(state["fen"], STARTING_FEN)
+        self.assertFalse(replacement.is_closed())
+        self.assertEqual(pool.get_free_count(), 0)
+
+    def test_6(self):
+        """
+        Test whether a move that is cancelled while it is being made keeps
+        its game's lock until it is done, so that the game's next move and
+        a close wait for it, and whether a new game given an ID in use gives
+        the game it took back to the pool.
+        """
+        async def play():
+            pool = GamePool(max_size=4)
+            async with GameSessionManager(workers=4,
+                                          game_pool=pool) as manager:
+                slow_game = BlockingGame()
+                game_id = manager.add_game(slow_game)
+                slow_move = asyncio.ensure_future(
+                    manager.make_move(game_id, 'c4', 'c5'))
+                loop = asyncio.get_running_loop()
+                await loop.run_in_executor(None, slow_game.started.wait, 10)
+                slow_move.cancel()
+                next_move = asyncio.ensure_future(
+                    manager.make_move(game_id, 'e7', 'e6'))
+                close = asyncio.ensure_future(manager.close_game(game_id))
+                await asyncio.sleep(0.05)
+                waiting = not (slow_move.done() or next_move.done() or
+                               close.done())
+
+                slow_game.released.set()
+                with self.assertRaises(asyncio.CancelledError):
+                    await slow_move
+                next_result = await next_move
+                await close
+
+                # Both requests find the ID free before taking a game
+                pool.fill(2)
+                results = await asyncio.gather(
+                    manager.new_game(game_id="taken"),
+                    manager.new_game(game_id="taken"),
+                    return_exceptions=True)
+                return (slow_game, waiting, next_result, results,
+                        pool.get_free_count())
+
+        slow_game, waiting, next_result, results, free_count = \
+            asyncio.run(play())
+        self.assertTrue(waiting)
+        self.assertEqual(slow_game.most_moving, 1)
+        self.assertTrue(next_result)
+        self.assertEqual(results[0], "taken")
+        self.assertIsInstance(results[1], ValueError)
+        self.assertEqual(free_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,178 @@
+# Description: This file defines a spectator feed for the XiangqiGame class in
+# XiangqiGame.py. A SpectatorFeed sends a game's board to any number of
+# viewers, each a text file object such as a socket file or a terminal. A new
+# viewer is sent a whole frame; after that, each update sends only ANSI
+# cursor-addressed updates for the points that changed since the last frame
+# the viewer was sent, which is usually the two points of a move. Each viewer
+# has its own BoardRenderer, which remembers that viewer's last frame, so
+# viewers that joined at different times are each brought up to date. Viewers
+# whose last frames (and render settings) are the same share one rendered
+# update, so the cost of a move does not grow with the number of viewers in
+# sync. A viewer whose file raises an OSError when written to (or a
+# ValueError, as a closed file does) is dropped.
+#
+# Usage: python XiangqiSpectator.py [--plain] [--delay DELAY]
+
+import argparse
+import sys
+import time
+
+from XiangqiGame import XiangqiGame, BoardRenderer, SAMPLE_GAME
+
+
+class SpectatorFeed:
+    """
+    Represent a feed of a game's board to a number of viewers, which are
+    added and removed by ID. Has getter methods for the game, the viewer IDs,
+    and the number of characters sent, and methods to make a move and send
+    it, or to send whatever has changed on the board.
+    """
+    def __init__(self, game):
+        """
+        Take as a parameter a XiangqiGame object, and create a SpectatorFeed
+        object with no viewers.
+        """
+        self._game = game
+        self._viewers = {}      # Viewer ID -> (file, BoardRenderer)
+        self._chars_sent = 0
+
+    def get_game(self):
+        """
+        Return the game data member.
+        """
+        return self._game
+
+    def get_viewer_ids(self):
+        """
+        Return a list of the IDs of the viewers.
+        """
+        return list(self._viewers)
+
+    def get_chars_sent(self):
+        """
+        Return the number of characters sent to all viewers so far.
+        """
+        return self._chars_sent
+
+    def add_viewer(self, viewer_id, file, mode="color", origin_row=1):
+        """
+        Take as parameters an ID for the viewer, a text file object to write
+        to, and the render mode and terminal row of the viewer's frames, and
+        add the viewer, sending it a whole frame that starts with a cursor
+        movement to the origin row. A viewer with the same ID is replaced.
+        Return True if the frame was sent, or False if the viewer was dropped.
+        """
+        self._viewers[viewer_id] = (file, BoardRenderer(mode, origin_row))
+        return self._send_frame(viewer_id)
+
+    def remove_viewer(self, viewer_id):
+        """
+        Take as a parameter the ID of a viewer, and remove the viewer. Return
+        True if there was such a viewer, or False otherwise.
+        """
+        return self._viewers.pop(viewer_id, None) is not None
+
+    def resend_frame(self, viewer_id):
+        """
+        Take as a parameter the ID of a viewer, and send it a whole frame, as
+        when its screen has been cleared. Return True if the frame was sent,
+        or False if there is no such viewer or it was dropped.
+        """
+        if viewer_id not in self._viewers:
+            return False
+        return self._send_frame(viewer_id)
+
+    def make_move(self, move_from, move_to):
+        """
+        Take as parameters the locations of the point moved from and the
+        point moved to, make the move on the game, and if it was made, send
+        the changes to every viewer. Return the result of the game's
+        make_move.
+        """
+        move_made = self._game.make_move(move_from, move_to)
+        if move_made:
+            self.update()
+        return move_made
+
+    def update(self):
+        """
+        Send every viewer the points that changed since the last frame it
+        was sent. Return the number of viewers that were sent anything.
+        """
+        board = self._game.get_game_board()
+        squares = bytes(board.get_squares())
+        changes = {}    # (mode, origin row, last squares) -> changes text
+        sent_count = 0
+        for viewer_id, (file, renderer) in list(self._viewers.items()):
+            key = (renderer.get_mode(), renderer.get_origin_row(),
+                   renderer.get_last_squares())
+            text = changes.get(key)
+            if text is None:
+                text = renderer.render_changes(board)
+                changes[key] = text
+            else:
+                renderer.set_last_squares(squares)
+            if text and self._write(viewer_id, file, text):
+                sent_count += 1
+        return sent_count
+
+    def _send_frame(self, viewer_id):
+        """
+        Take as a parameter the ID of a viewer, and send it a whole frame
+        that starts with a cursor movement to its origin row. Return True if
+        the frame was sent, or False if the viewer was dropped.
+        """
+        file, renderer = self._viewers[viewer_id]
+        text = ("\033[%d;1H" % renderer.get_origin_row() +
+                renderer.render(self._game.get_game_board()))
+        return self._write(viewer_id, file, text)
+
+    def _write(self, viewer_id, file, text):
+        """
+        Take as parameters the ID of a viewer, its file, and some text, and
+        write the text to the file with a single call. If the file raises an
+        OSError, or a ValueError because it has been closed, drop the viewer.
+        Return True if the text was written, or False otherwise.
+        """
+        try:
+            file.write(text)
+            file.flush()
+        except (OSError, ValueError):
+            self._viewers.pop(viewer_id, None)
+            return False
+        self._chars_sent += len(text)
+        return True
+
+
+def main():
+    """
+    Play the sample game (SAMPLE_GAME in XiangqiGame.py) to a viewer on
+    standard output, updating the board in place, and report how many
+    characters were sent per move made.
+    """
+    parser = argparse.ArgumentParser(description="Play the sample game to a "
+                                                 "terminal, sending only the "
+                                                 "changes.")
+    parser.add_argument("--plain", action="store_true",
+                        help="without colors")
+    parser.add_argument("--delay", type=float, default=0.2,
+                        help="seconds between moves")
+    args = parser.parse_args()
+
+    feed = SpectatorFeed(XiangqiGame())
+    sys.stdout.write("\033[2J")     # Clear the screen
+    feed.add_viewer("terminal", sys.stdout,
+                    "plain" if args.plain else "color")
+    frame_size = feed.get_chars_sent()
+    move_count = 0
+    for move_from, move_to in SAMPLE_GAME:
+        if feed.make_move(move_from, move_to):
+            move_count += 1
+            time.sleep(args.delay)
+    move_size = (feed.get_chars_sent() - frame_size) / move_count
+    print("%s: %d characters for the first frame, %.1f per move"
+          % (feed.get_game().get_game_state(), frame_size, move_size))
+
+
+if __name__ == '__main__':
+    main()
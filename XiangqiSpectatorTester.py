@@ -0,0 +1,134 @@
+# Description: This test file tests the spectator feed in XiangqiSpectator.py.
+
+import io
+import re
+import unittest
+from XiangqiGame import XiangqiGame, BoardRenderer, SAMPLE_GAME
+from XiangqiSpectator import SpectatorFeed
+
+
+def apply_to_screen(screen, text):
+    """
+    Take as parameters a screen (a list of lists of characters, one per
+    terminal row, starting at row 1) and text in plain mode with ANSI cursor
+    movements, and write the text to the screen as a terminal would.
+    """
+    line = 0
+    col = 0
+    for cursor, chars in re.findall(r"(\033\[\d+;\d+H)?([^\033]*)", text):
+        if cursor:
+            line, col = (int(number) - 1
+                         for number in cursor[2:-1].split(";"))
+        for char in chars:
+            if char == "\n":
+                line += 1
+                col = 0
+                continue
+            while len(screen) <= line:
+                screen.append([])
+            while len(screen[line]) <= col:
+                screen[line].append(" ")
+            screen[line][col] = char
+            col += 1
+
+
+class BrokenFile:
+    """
+    Represent a viewer's file that can no longer be written to.
+    """
+    def write(self, text):
+        """
+        Raise a BrokenPipeError.
+        """
+        raise BrokenPipeError()
+
+    def flush(self):
+        """
+        Do nothing.
+        """
+
+
+class TestXiangqiSpectator(unittest.TestCase):
+    """
+    Test the spectator feed in XiangqiSpectator.py.
+    """
+    def test_1(self):
+        """
+        Test whether a viewer's screen, updated with only the changes after
+        each move of the sample game, shows the same board as a whole frame,
+        and whether each move sends only the points it changed.
+        """
+        game = XiangqiGame()
+        feed = SpectatorFeed(game)
+        output = io.StringIO()
+        self.assertTrue(feed.add_viewer("a", output, "plain", origin_row=2))
+        screen = []
+        apply_to_screen(screen, output.getvalue())
+
+        for move_from, move_to in SAMPLE_GAME:
+            output.seek(0)
+            output.truncate()
+            if not feed.make_move(move_from, move_to):
+                self.assertEqual(output.getvalue(), "")
+                continue
+            changes = output.getvalue()
+            self.assertLessEqual(changes.count("H["), 2)
+            self.assertLess(len(changes), 50)
+            apply_to_screen(screen, changes)
+
+            expected = []
+            apply_to_screen(expected, "\033[2;1H" +
+                            BoardRenderer("plain").render(
+                                game.get_game_board()))
+            self.assertEqual(screen[:16], expected)
+        self.assertEqual(game.get_game_state(), "BLACK_WON")
+
+    def test_2(self):
+        """
+        Test whether viewers that join at different times are each sent what
+        they are missing, and whether viewers in sync are sent the same text.
+        """
+        game = XiangqiGame()
+        feed = SpectatorFeed(game)
+        first = io.StringIO()
+        second = io.StringIO()
+        feed.add_viewer("first", first)
+        feed.add_viewer("second", second)
+        self.assertEqual(first.getvalue(), second.getvalue())
+        self.assertTrue(feed.make_move('c4', 'c5'))
+        self.assertEqual(first.getvalue(), second.getvalue())
+
+        late = io.StringIO()
+        feed.add_viewer("late", late)
+        self.assertTrue(late.getvalue().startswith("\033[1;1H"))
+        late.seek(0)
+        late.truncate()
+        self.assertTrue(game.make_move('e7', 'e6'))
+        self.assertTrue(game.make_move('c5', 'c6'))
+        self.assertEqual(feed.update(), 3)
+        self.assertEqual(late.getvalue(),
+                         first.getvalue()[-len(late.getvalue()):])
+        self.assertEqual(late.getvalue().count("H\033[0;29;48m["), 4)
+        self.assertEqual(feed.update(), 0)
+
+        # A viewer that cannot be written to is dropped
+        self.assertFalse(feed.add_viewer("broken", BrokenFile()))
+        self.assertEqual(feed.get_viewer_ids(), ["first", "second", "late"])
+
+        # So is a viewer whose file is closed, without stopping the others
+        closed = io.StringIO()
+        feed.add_viewer("closed", closed)
+        closed.close()
+        first_size = len(first.getvalue())
+        self.assertTrue(feed.make_move('e6', 'e5'))
+        self.assertEqual(feed.get_viewer_ids(), ["first", "second", "late"])
+        self.assertGreater(len(first.getvalue()), first_size)
+        self.assertTrue(feed.remove_viewer("second"))
+        self.assertFalse(feed.remove_viewer("second"))
+        self.assertFalse(feed.resend_frame("second"))
+        self.assertTrue(feed.resend_frame("late"))
+        self.assertGreater(feed.get_chars_sent(), len(first.getvalue()))
+
+
+if __name__ == '__main__':
+    unittest.main()
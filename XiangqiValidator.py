@@ -0,0 +1,188 @@
+# Description: This file validates archives of xiangqi games with the
+# XiangqiGame class in XiangqiGame.py. An archive is a text file with one game
+# per line, each a sequence of moves separated by spaces, such as
+# "c4-c5 e7-e6 c5-c6". Blank lines and lines starting with "#" are skipped.
+# The games are read lazily and sent in chunks to a pool of worker processes,
+# which replay them with XiangqiGame.replay. The results come back in the
+# order of the archive and are written as they arrive, one JSON object per
+# line, with the game's line number, whether every move was legal, the index
+# of the first illegal (or unreadable) move, the final game state, and the
+# number of moves made. Only a bounded number of chunks are in flight at any
+# time, so memory use does not grow with the size of the archive.
+#
+# Usage: python XiangqiValidator.py ARCHIVE [--output OUTPUT]
+#            [--workers WORKERS] [--chunk-size CHUNK_SIZE]
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from XiangqiGame import XiangqiGame, LOCATION_COORDS
+
+
+def parse_move(move_str):
+    """
+    Take as a parameter a move in algebraic notation (e.g. 'c4-c5') and
+    return it as a tuple of the coordinates (tuples) of the point moved from
+    and the point moved to, or None if it cannot be read.
+    """
+    locations = move_str.split("-")
+    if len(locations) != 2:
+        return None
+    source_coord = LOCATION_COORDS.get(locations[0])
+    dest_coord = LOCATION_COORDS.get(locations[1])
+    if source_coord is None or dest_coord is None:
+        return None
+    return source_coord, dest_coord
+
+
+def validate_game(line_number, line):
+    """
+    Take as parameters a game's line number and its line of moves, replay
+    the moves on a new game, and return a dictionary of the results: the
+    line number ("line"), whether every move was legal ("legal"), the index
+    of the first illegal or unreadable move ("illegal_move", or None), the
+    final game state ("state"), and the number of moves made ("plies").
+    """
+    moves = []
+    unreadable_index = None
+    for index, move_str in enumerate(line.split()):
+        move = parse_move(move_str)
+        if move is None:
+            unreadable_index = index
+            break
+        moves.append(move)
+
+    game = XiangqiGame()
+    illegal_index, game_state = game.replay(moves)
+    if illegal_index is None:
+        illegal_index = unreadable_index
+
+    return {"line": line_number, "legal": illegal_index is None,
+            "illegal_move": illegal_index, "state": game_state,
+            "plies": len(game.get_move_stack())}
+
+
+def _validate_chunk(chunk):
+    """
+    Take as a parameter a list of (line number, line) tuples and return a
+    list of their results. Run in a worker process by validate_games.
+    """
+    return [validate_game(line_number, line) for line_number, line in chunk]
+
+
+def _read_chunks(lines, chunk_size):
+    """
+    Take as parameters an iterable of lines and a chunk size, and generate
+    lists of up to that many (line number, line) tuples of the games, with
+    line numbers starting at 1.
+    """
+    chunk = []
+    for line_number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        chunk.append((line_number, line))
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def validate_games(lines, workers=None, chunk_size=256, max_pending=None):
+    """
+    Take as parameters an iterable of lines (such as an open archive), the
+    number of worker processes (by default, the number of cores, or 0 to
+    validate in this process), the number of games per chunk, and the most
+    chunks to have in flight at once (by default, twice the number of
+    workers), and generate the results of validate_game for each game, in
+    the order of the lines.
+    """
+    chunks = _read_chunks(lines, chunk_size)
+    if workers == 0:
+        for chunk in chunks:
+            yield from _validate_chunk(chunk)
+        return
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if max_pending is None:
+        max_pending = 2 * workers
+
+    with ProcessPoolExecutor(workers) as executor:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(_validate_chunk, chunk))
+            if len(pending) >= max_pending:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def validate_file(archive, output, workers=None, chunk_size=256):
+    """
+    Take as parameters an open archive, an open output file, the number of
+    worker processes, and the number of games per chunk, and write the
+    results of every game in the archive to the output as JSON lines.
+    Return a tuple of the number of games and the number of illegal games.
+    """
+    game_count = 0
+    illegal_count = 0
+    for result in validate_games(archive, workers, chunk_size):
+        output.write(json.dumps(result) + "\n")
+        game_count += 1
+        if not result["legal"]:
+            illegal_count += 1
+    return game_count, illegal_count
+
+
+def main():
+    """
+    Validate the archive named on the command line, writing the results to
+    the output file (or to standard output) and a summary to standard error.
+    """
+    parser = argparse.ArgumentParser(description="Validate an archive of "
+                                                 "xiangqi games.")
+    parser.add_argument("archive", help="file of games, one per line, or - "
+                                        "for standard input")
+    parser.add_argument("--output", "-o", default="-",
+                        help="file of results (by default, standard output)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes (0 to validate in this "
+                             "process)")
+    parser.add_argument("--chunk-size", type=int, default=256)
+    args = parser.parse_args()
+
+    if args.archive == "-":
+        archive = sys.stdin
+    else:
+        archive = open(args.archive)
+    if args.output == "-":
+        output = sys.stdout
+    else:
+        output = open(args.output, "w")
+
+    start = time.perf_counter()
+    try:
+        game_count, illegal_count = validate_file(archive, output,
+                                                  args.workers,
+                                                  args.chunk_size)
+    finally:
+        if archive is not sys.stdin:
+            archive.close()
+        if output is not sys.stdout:
+            output.close()
+    elapsed = time.perf_counter() - start
+
+    print("%d games (%d illegal) in %.2f s: %.1f games per second"
+          % (game_count, illegal_count, elapsed,
+             game_count / elapsed if elapsed else 0.0), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
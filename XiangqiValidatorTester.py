@@ -0,0 +1,76 @@
+# Description: This test file tests the archive validator in
+# XiangqiValidator.py.
+
+import io
+import json
+import unittest
+from XiangqiValidator import parse_move, validate_game, validate_games, \
+    validate_file
+
+# The valid moves of the sample game in XiangqiGame.py's main function, the
+# last of which checkmates the red general
+SAMPLE_LINE = ("c4-c5 e7-e6 c5-c6 e6-e5 c6-d6 e5-e4 d6-d7 f10-e9 b1-c3 h8-h1 "
+               "c3-d5 h1-f1 d5-c7 f1-d1 d7-d8 d1-a1 e1-e2 i10-i8 d8-e8 i8-f8 "
+               "e8-e9 d10-e9 i1-i2 a10-a9 i2-f2 a9-d9 f2-f1 d9-d3 f1-e1 f8-f3 "
+               "c1-a3 a1-g1 b3-b5 g7-g6 h3-h5 e4-e3")
+
+
+class TestXiangqiValidator(unittest.TestCase):
+    """
+    Test the archive validator in XiangqiValidator.py.
+    """
+    def test_1(self):
+        """
+        Test whether moves are read, and whether unreadable moves are not.
+        """
+        self.assertEqual(parse_move("c4-c5"), ((3, 4), (3, 5)))
+        self.assertEqual(parse_move("i10-i9"), ((9, 10), (9, 9)))
+        for move_str in ("c4c5", "c4-c5-c6", "j1-j2", "a11-a10", "a0-a1"):
+            self.assertIsNone(parse_move(move_str))
+
+    def test_2(self):
+        """
+        Test whether a game's result records its legality, its final state,
+        and the number of moves made.
+        """
+        self.assertEqual(validate_game(1, SAMPLE_LINE),
+                         {"line": 1, "legal": True, "illegal_move": None,
+                          "state": "BLACK_WON", "plies": 36})
+        self.assertEqual(validate_game(2, "c4-c5 c5-c6"),
+                         {"line": 2, "legal": False, "illegal_move": 1,
+                          "state": "UNFINISHED", "plies": 1})
+        self.assertEqual(validate_game(3, "c4-c5 e7-e6 c5c6 c5-c6"),
+                         {"line": 3, "legal": False, "illegal_move": 2,
+                          "state": "UNFINISHED", "plies": 2})
+
+    def test_3(self):
+        """
+        Test whether worker processes give the same results, in the same
+        order, as validating in this process, with blank lines and comments
+        skipped.
+        """
+        lines = ["# archive", SAMPLE_LINE, "", "c4-c5 c5-c6", "h3-e3"] * 5
+        in_process = list(validate_games(lines, workers=0, chunk_size=3))
+        self.assertEqual(len(in_process), 15)
+        self.assertEqual([result["line"] for result in in_process][:3],
+                         [2, 4, 5])
+        pooled = list(validate_games(iter(lines), workers=2, chunk_size=2,
+                                     max_pending=2))
+        self.assertEqual(pooled, in_process)
+
+    def test_4(self):
+        """
+        Test whether validate_file writes one JSON line per game and counts
+        the illegal games.
+        """
+        archive = io.StringIO(SAMPLE_LINE + "\nc4-c5 c5-c6\n")
+        output = io.StringIO()
+        self.assertEqual(validate_file(archive, output, workers=0), (2, 1))
+        results = [json.loads(line)
+                   for line in output.getvalue().splitlines()]
+        self.assertEqual([result["legal"] for result in results],
+                         [True, False])
+
+
+if __name__ == '__main__':
+    unittest.main()